@@ -0,0 +1,122 @@
+"""
+Incrementally maintained dashboard aggregates for Code Inspector Pro
+
+Counters, per-model token/cost totals and a latency histogram are updated
+once when an analysis is recorded instead of being recomputed from the
+whole history on every rerun. Each update bumps ``version`` so rendered
+figures can be cached until the underlying numbers change.
+"""
+
+import bisect
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from inspector_core import calculate_cost
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60]
+
+def latency_bucket_labels() -> List[str]:
+    bounds = [0] + LATENCY_BUCKETS
+    labels = [f"{low:g}-{high:g}s" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f"{LATENCY_BUCKETS[-1]:g}s+"]
+
+def _item_cost(item: Dict) -> float:
+    if item.get("cached"):
+        return 0.0
+    if item.get("input_tokens") is None or item.get("output_tokens") is None:
+        # Legacy records only carry a combined token count
+        return calculate_cost(0, item.get("tokens_used") or 0, item["model_used"])
+    return calculate_cost(item["input_tokens"], item["output_tokens"], item["model_used"])
+
+class AnalysisAggregates:
+    """Running totals over every recorded analysis"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._figures: Dict[str, Tuple[int, Any]] = {}
+        self._reset()
+
+    def _reset(self):
+        self.version = 0
+        self.total = 0
+        self.requests = 0
+        self.tokens_saved = 0
+        self.actions: Counter = Counter()
+        self.languages: Counter = Counter()
+        self.models: Dict[str, Dict[str, float]] = {}
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def _add(self, item: Dict):
+        self.total += 1
+        self.actions[item["action"]] += 1
+        self.languages[item["language"]] += 1
+        if item.get("cached"):
+            return
+        self.requests += 1
+        self.tokens_saved += item.get("prompt_tokens_saved") or 0
+        model = self.models.setdefault(item["model_used"], {
+            "requests": 0, "input_tokens": 0, "output_tokens": 0, "tokens": 0, "cost": 0.0, "latency": 0.0
+        })
+        model["requests"] += 1
+        model["input_tokens"] += item.get("input_tokens") or 0
+        model["output_tokens"] += item.get("output_tokens") or 0
+        model["tokens"] += item.get("tokens_used") or 0
+        model["cost"] += _item_cost(item)
+        model["latency"] += item.get("execution_time") or 0.0
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS, item.get("execution_time") or 0.0)] += 1
+
+    def record(self, item: Dict):
+        """Fold one analysis (as a CodeAnalysis dict) into the totals"""
+        with self._lock:
+            self._add(item)
+            self.version += 1
+
+    def rebuild(self, items: Iterable[Dict]):
+        """Recompute from scratch, e.g. after history is deleted or imported"""
+        with self._lock:
+            version = self.version
+            self._reset()
+            for item in items:
+                self._add(item)
+            self.version = version + 1
+
+    def most_used_language(self) -> Optional[str]:
+        with self._lock:
+            most_common = self.languages.most_common(1)
+        return most_common[0][0] if most_common else None
+
+    def totals(self) -> Dict[str, float]:
+        """Overall request, token and cost totals"""
+        with self._lock:
+            return {
+                "analyses": self.total,
+                "requests": self.requests,
+                "tokens": sum(model["tokens"] for model in self.models.values()),
+                "cost": sum(model["cost"] for model in self.models.values()),
+                "tokens_saved": self.tokens_saved,
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of every aggregate plus the version it was taken at"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "actions": dict(self.actions),
+                "languages": dict(self.languages),
+                "models": {name: dict(model) for name, model in self.models.items()},
+                "latency_histogram": list(self.latency_histogram),
+            }
+
+    def figure(self, name: str, builder: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Return a figure built from the current snapshot, rebuilding only when the version changed"""
+        with self._lock:
+            cached = self._figures.get(name)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+        snapshot = self.snapshot()
+        figure = builder(snapshot)
+        with self._lock:
+            self._figures[name] = (snapshot["version"], figure)
+        return figure
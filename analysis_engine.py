@@ -0,0 +1,154 @@
+"""
+asyncio analysis engine for Code Inspector Pro
+
+Runs several (action, model) analyses of the same snippet concurrently on
+one event loop. Each stream reports its chunks through a callback as they
+arrive, so callers can render every job into its own container; the total
+wall-clock time is that of the slowest job rather than the sum.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from groq import AsyncGroq
+
+from inspector_core import Config, build_messages
+from llm_providers import GroqProvider, LLMProvider, OllamaProvider, provider_for_model
+from metrics import ACTIVE_STREAMS
+from model_router import get_model_router
+from prompt_compaction import compact_for_prompt
+from rate_limiter import get_rate_limiter, open_with_limit_async
+from request_timing import RequestTimer
+from retry_policy import RetryPolicy, RetryStats, call_with_retry_async, continuation_messages
+from token_accounting import TokenUsage, count_message_tokens, count_tokens, measure_usage
+
+ChunkCallback = Callable[[int, str], None]
+
+@dataclass
+class AnalysisJob:
+    action: str
+    language: str
+    code: str
+    model: str
+    temperature: float
+    max_tokens: int
+
+@dataclass
+class JobResult:
+    job: AnalysisJob
+    response: str
+    usage: Optional[TokenUsage]
+    execution_time: float
+    error: Optional[str] = None
+    retry_count: int = 0
+    backoff_time: float = 0.0
+    prompt_tokens_saved: int = 0
+    timings: Dict[str, Optional[float]] = field(default_factory=dict)  # RequestTimer.summary(), minus rendering
+
+class AsyncAnalysisEngine:
+    """Stream several analyses concurrently under a concurrency limit"""
+
+    def __init__(self, api_key: str, max_concurrency: int = 4, base_url: Optional[str] = Config.GROQ_POOL["base_url"],
+                 timeout: float = 60.0):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def _create_groq_client(self) -> AsyncGroq:
+        # Async HTTP clients are bound to the event loop, so one is created per run
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+        kwargs = {"api_key": self.api_key, "http_client": http_client, "max_retries": 0}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        return AsyncGroq(**kwargs)
+
+    def _create_providers(self, jobs: List[AnalysisJob]) -> Dict[str, LLMProvider]:
+        """One provider per backend the jobs need, created inside the running loop"""
+        providers: Dict[str, LLMProvider] = {}
+        for name in {provider_for_model(job.model) for job in jobs}:
+            if name == OllamaProvider.name:
+                providers[name] = OllamaProvider(**Config.OLLAMA)
+            else:
+                providers[name] = GroqProvider(async_client=self._create_groq_client())
+        return providers
+
+    async def _run_job(self, provider: LLMProvider, semaphore: asyncio.Semaphore, index: int,
+                       job: AnalysisJob, on_chunk: ChunkCallback) -> JobResult:
+        async with semaphore:
+            start_time = time.time()
+            compacted = compact_for_prompt(job.action, job.code, job.language)
+            messages = build_messages(job.action, compacted.text, job.language)
+            chunks: List[str] = []
+            limiter = get_rate_limiter()
+            retry_stats = RetryStats()
+            state = {"messages": messages, "prefix": "", "api_usage": None}
+            timer = RequestTimer()
+
+            async def stream_attempt():
+                # Resume after the chunks already delivered, or restart if there are none
+                state["prefix"] = "".join(chunks)
+                state["messages"] = continuation_messages(messages, state["prefix"])
+                state["api_usage"] = None
+                timer.begin_attempt()
+                permit, stream = await open_with_limit_async(
+                    limiter, job.model, count_message_tokens(state["messages"]) + job.max_tokens,
+                    lambda: provider.astream(state["messages"], job.model, job.temperature, job.max_tokens)
+                )
+                timer.stream_opened(permit.wait_time)
+                try:
+                    # Task cancellation closes the stream, so the backend stops generating too
+                    with ACTIVE_STREAMS.track(model=job.model):
+                        async with stream:
+                            async for content in stream:
+                                timer.chunk_received()
+                                chunks.append(content)
+                                on_chunk(index, content)
+                except BaseException:
+                    limiter.release(permit, succeeded=False)
+                    raise
+                state["api_usage"] = stream.usage
+                return permit
+
+            try:
+                permit = await call_with_retry_async(stream_attempt, RetryPolicy(**Config.RETRY), retry_stats)
+            except Exception as e:
+                get_model_router().record_failure(job.model)
+                return JobResult(job, compacted.remap_response("".join(chunks)), None, time.time() - start_time,
+                                 error=str(e), retry_count=retry_stats.retries, backoff_time=retry_stats.backoff_time)
+
+            response = "".join(chunks)
+            usage = measure_usage(state["messages"], response, state["api_usage"])
+            if usage.source == "api" and state["prefix"]:
+                # Provider usage only covers the final, resumed attempt
+                usage.output_tokens += count_tokens(state["prefix"])
+            limiter.release(permit, actual_tokens=usage.total_tokens)
+            attempt_tokens = usage.output_tokens - count_tokens(state["prefix"])
+            if timer.ttft is not None:
+                get_model_router().record_success(job.model, timer.ttft, attempt_tokens, timer.stream_time)
+            return JobResult(job, compacted.remap_response(response), usage, time.time() - start_time,
+                             retry_count=retry_stats.retries, backoff_time=retry_stats.backoff_time,
+                             prompt_tokens_saved=compacted.tokens_saved(), timings=timer.summary(attempt_tokens))
+
+    async def run(self, jobs: List[AnalysisJob], on_chunk: ChunkCallback) -> List[JobResult]:
+        """Run every job concurrently and return results in job order"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        providers = self._create_providers(jobs)
+        try:
+            return await asyncio.gather(*(
+                self._run_job(providers[provider_for_model(job.model)], semaphore, index, job, on_chunk)
+                for index, job in enumerate(jobs)
+            ))
+        finally:
+            for provider in providers.values():
+                await provider.aclose()
+
+    def run_sync(self, jobs: List[AnalysisJob], on_chunk: ChunkCallback) -> List[JobResult]:
+        """Blocking entry point for synchronous callers such as a Streamlit script"""
+        return asyncio.run(self.run(jobs, on_chunk))
@@ -2,17 +2,40 @@ import streamlit as st
 import os
 import json
 import time
-import base64
+import tempfile
+from array import array
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import asdict
+from itertools import islice
 from streamlit_ace import st_ace
-from groq import Groq
+from groq_pool import GroqClientPool
+from llm_providers import GroqProvider, LLMProvider, OllamaProvider, needs_api_key, provider_for_model
+from token_accounting import TokenUsage, count_message_tokens, count_tokens, measure_usage
+from rate_limiter import get_rate_limiter, open_with_limit
+from retry_policy import RetryPolicy, RetryStats, call_with_retry, continuation_messages
+from python_units import CodeUnit, split_python_units
+from static_checks import StaticReport, analyze_python
+from prompt_compaction import CompactedCode, compact_for_prompt
+from incremental_review import IncrementalPlan, plan_incremental_review
+from similarity_index import SimilarityIndex
+from analysis_engine import AnalysisJob, AsyncAnalysisEngine
+from model_router import get_model_router
+from metrics import ACTIVE_STREAMS, observe_analysis, observe_cache_lookup, observe_failure, start_metrics_server
+from request_timing import RequestTimer
 from streamlit_extras.colored_header import colored_header
 from streamlit_option_menu import option_menu
 import plotly.express as px
-import plotly.graph_objects as go
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from response_cache import ResponseCache, make_cache_key
+from history_store import HistoryStore
+from history_io import export_history, import_history
+from aggregates import AnalysisAggregates, latency_bucket_labels
+from static_assets import inject_stylesheet
+from blob_store import BlobRefs, BlobStore, content_hash
+from inspector_core import (
+    CodeAnalysis, Config, FavoriteCode, build_messages, calculate_cost
+)
 
 # Page Configuration
 st.set_page_config(
@@ -29,457 +52,87 @@ st.set_page_config(
 
 # Enhanced CSS with modern design
 def load_enhanced_css():
-    st.markdown("""
-    <style>
-    :root {
-        --bg-primary: #101010;
-        --bg-secondary: #181818;
-        --bg-tertiary: #1a1f1a;
-        --bg-card: #161d16;
-        --bg-input: #181f18;
-        --bg-sidebar: #131913;
-        --border-primary: #1f3a1f;
-        --border-accent: #00ff90;
-        --text-primary: #b8ffc8;
-        --text-secondary: #6affb7;
-        --text-muted: #3e4e3e;
-        --text-input: #e0ffe0;
-        --btn-primary-bg: #00ff90;
-        --btn-primary-text: #101010;
-        --btn-secondary-bg: #232d23;
-        --btn-secondary-text: #b8ffc8;
-        --hover-color: #1e2e1e;
-        --active-color: #39ff14;
-        --code-keyword: #39ff14;
-        --code-string: #00ffea;
-        --code-number: #ffb86c;
-        --code-func: #00ff90;
-        --code-var: #b8ffc8;
-        --code-comment: #4e8c4e;
-        --code-operator: #00ffea;
-        --output-bg: #101510;
-        --output-text: #b8ffc8;
-        --success-text: #00ff90;
-        --warning-text: #ffe066;
-        --error-text: #ff4b4b;
-        --shadow-glow: 0 0 16px #00ff90, 0 0 2px #39ff14;
-        --shadow-card: 0 2px 12px #003f1a44;
-        --radius-md: 8px;
-        --font-mono: 'Fira Mono', 'SF Mono', 'Consolas', 'Menlo', monospace;
-        --font-sans: 'Segoe UI', 'Noto Sans', Arial, sans-serif;
-        --transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-    }
-    body, .main, .block-container {
-        background: var(--bg-primary) !important;
-        color: var(--text-primary) !important;
-        font-family: var(--font-sans) !important;
-    }
-    h1, h2, h3, h4, h5, h6 {
-        color: var(--active-color);
-        font-family: var(--font-mono);
-        font-weight: 700;
-        letter-spacing: 1px;
-        text-shadow: 0 0 8px #00ff90cc;
-    }
-    p, span, div, label {
-        color: var(--text-primary) !important;
-        font-family: var(--font-sans) !important;
-    }
-    .enhanced-card, .stat-card, .result-container {
-        background: var(--bg-card);
-        border: 1.5px solid var(--border-primary);
-        border-radius: var(--radius-md);
-        box-shadow: var(--shadow-card);
-        padding: 1.5rem;
-        margin-bottom: 1.5rem;
-        transition: var(--transition);
-        position: relative;
-    }
-    .enhanced-card:hover, .stat-card:hover, .result-container:hover {
-        border-color: var(--border-accent);
-        box-shadow: var(--shadow-glow);
-        transform: translateY(-2px) scale(1.01);
-    }
-    .hero-header {
-        background: var(--bg-secondary);
-        border: 1.5px solid var(--border-accent);
-        color: var(--active-color);
-        padding: 2.5rem 2rem;
-        border-radius: var(--radius-md);
-        text-align: center;
-        margin-bottom: 2rem;
-        box-shadow: var(--shadow-glow);
-        position: relative;
-        font-family: var(--font-mono);
-    }
-    .hero-header::before {
-        content: '';
-        position: absolute;
-        top: 0; left: 0; right: 0;
-        height: 3px;
-        background: linear-gradient(90deg, #00ff90 0%, #39ff14 100%);
-        border-radius: var(--radius-md) var(--radius-md) 0 0;
-        box-shadow: 0 0 12px #00ff90cc;
-    }
-    .stat-number {
-        font-size: 2.2rem;
-        font-weight: 700;
-        color: var(--active-color);
-        font-family: var(--font-mono);
-        text-shadow: 0 0 8px #00ff9099;
-    }
-    .stat-label {
-        color: var(--text-secondary);
-        font-size: 0.95rem;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        font-weight: 500;
-    }
-    .ace-editor-container {
-        border: 1.5px solid var(--border-accent);
-        border-radius: var(--radius-md);
-        overflow: hidden;
-        box-shadow: var(--shadow-glow);
-        background: var(--bg-input);
-        transition: var(--transition);
-    }
-    .ace-editor-container:hover {
-        border-color: var(--active-color);
-        box-shadow: 0 0 16px #00ff90cc;
-    }
-    .stButton > button {
-        background: var(--btn-primary-bg) !important;
-        color: var(--btn-primary-text) !important;
-        border: none !important;
-        border-radius: var(--radius-md) !important;
-        font-weight: 700 !important;
-        font-size: 1rem !important;
-        padding: 0.6rem 1.2rem !important;
-        font-family: var(--font-mono) !important;
-        box-shadow: 0 0 8px #00ff9055;
-        transition: var(--transition) !important;
-        position: relative;
-        overflow: hidden;
-        outline: none !important;
-    }
-    .stButton > button:hover {
-        background: var(--active-color) !important;
-        color: #101010 !important;
-        box-shadow: 0 0 16px #00ff90cc, 0 0 2px #39ff14;
-        transform: scale(1.04);
-    }
-    .stButton > button:active {
-        background: #00cc70 !important;
-        color: #101010 !important;
-        box-shadow: 0 0 8px #00ff90cc;
-        transform: scale(0.98);
-    }
-    .stSelectbox, .stTextInput, .stNumberInput, .stSlider {
-        background: var(--bg-input) !important;
-        color: var(--text-input) !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-radius: var(--radius-md) !important;
-        font-family: var(--font-mono) !important;
-        font-size: 1.05rem !important;
-        transition: var(--transition) !important;
-        box-shadow: 0 0 8px #00ff9022;
-    }
-    .stSelectbox:hover, .stTextInput:hover, .stNumberInput:hover {
-        border-color: var(--active-color) !important;
-        box-shadow: 0 0 12px #00ff90cc !important;
-    }
-    .stSelectbox > div > div {
-        background: var(--bg-input) !important;
-        color: var(--text-input) !important;
-    }
-    .css-1d391kg, .stSidebar {
-        background: var(--bg-sidebar) !important;
-        border-right: 2px solid var(--border-accent) !important;
-        box-shadow: 0 0 16px #00ff9022;
-    }
-    pre {
-        background: #0d120d !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-radius: var(--radius-md) !important;
-        color: var(--code-var) !important;
-        font-family: var(--font-mono) !important;
-        padding: 1rem !important;
-        overflow-x: auto !important;
-        font-size: 1.05rem !important;
-        box-shadow: 0 0 8px #00ff9022;
-    }
-    code {
-        background: #101510 !important;
-        color: var(--code-var) !important;
-        font-family: var(--font-mono) !important;
-        border: 1px solid var(--border-accent) !important;
-        padding: 0.25rem 0.5rem !important;
-        border-radius: 4px !important;
-        font-size: 1rem !important;
-        transition: var(--transition) !important;
-    }
-    code:hover {
-        border-color: var(--active-color) !important;
-        background: #181f18 !important;
-    }
-    .notification {
-        padding: 1rem;
-        border-radius: var(--radius-md);
-        margin: 1rem 0;
-        border-left: 4px solid var(--border-accent);
-        font-family: var(--font-sans);
-        background: var(--bg-card);
-        border: 1.5px solid var(--border-accent);
-        color: var(--active-color);
-        box-shadow: 0 0 8px #00ff9022;
-        transition: var(--transition);
-    }
-    .notification.success { border-left-color: var(--success-text); color: var(--success-text); }
-    .notification.warning { border-left-color: var(--warning-text); color: var(--warning-text); }
-    .notification.error { border-left-color: var(--error-text); color: var(--error-text); }
-    .notification.info { border-left-color: var(--active-color); color: var(--active-color); }
-    ::-webkit-scrollbar {
-        width: 8px; height: 8px;
-    }
-    ::-webkit-scrollbar-track {
-        background: var(--bg-secondary); border-radius: 4px;
-    }
-    ::-webkit-scrollbar-thumb {
-        background: var(--border-accent); border-radius: 4px; transition: var(--transition);
-    }
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--active-color);
-    }
-    .stProgress > div > div > div {
-        background: var(--active-color) !important;
-        box-shadow: 0 0 8px #00ff90cc;
-    }
-    .streamlit-expanderHeader {
-        background: var(--bg-card) !important;
-        color: var(--active-color) !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-radius: var(--radius-md) !important;
-        font-family: var(--font-mono) !important;
-        font-weight: 700 !important;
-        transition: var(--transition) !important;
-        text-shadow: 0 0 8px #00ff90cc;
-    }
-    .streamlit-expanderHeader:hover {
-        border-color: var(--active-color) !important;
-        background: var(--hover-color) !important;
-    }
-    .streamlit-expanderContent {
-        background: var(--bg-card) !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-top: none !important;
-        border-radius: 0 0 var(--radius-md) var(--radius-md) !important;
-    }
-    .stTabs [data-baseweb="tab-list"] {
-        background: var(--bg-card) !important;
-        border-bottom: 1.5px solid var(--border-accent) !important;
-        border-radius: var(--radius-md) var(--radius-md) 0 0 !important;
-    }
-    .stTabs [data-baseweb="tab"] {
-        background: var(--bg-card) !important;
-        color: var(--text-secondary) !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-bottom: none !important;
-        font-family: var(--font-mono) !important;
-        font-weight: 600 !important;
-        transition: var(--transition) !important;
-    }
-    .stTabs [data-baseweb="tab"]:hover {
-        color: var(--active-color) !important;
-        background: var(--hover-color) !important;
-    }
-    .stTabs [aria-selected="true"] {
-        background: var(--active-color) !important;
-        color: #101010 !important;
-        border-color: var(--active-color) !important;
-        text-shadow: 0 0 8px #00ff90cc;
-    }
-    .stMetric {
-        background: var(--bg-card) !important;
-        border: 1.5px solid var(--border-accent) !important;
-        border-radius: var(--radius-md) !important;
-        padding: 1rem !important;
-        transition: var(--transition) !important;
-        color: var(--active-color) !important;
-        font-family: var(--font-mono) !important;
-    }
-    .stMetric > div > div > div {
-        color: var(--active-color) !important;
-        font-family: var(--font-mono) !important;
-        font-weight: 700 !important;
-    }
-    .stMetric > div > div > div:last-child {
-        color: var(--text-secondary) !important;
-        font-family: var(--font-sans) !important;
-        font-size: 0.95rem !important;
-    }
-    .language-badge {
-        display: inline-block;
-        padding: 0.25rem 0.75rem;
-        background: #101510;
-        color: var(--active-color);
-        border: 1.5px solid var(--border-accent);
-        border-radius: 12px;
-        font-size: 0.85rem;
-        font-weight: 600;
-        font-family: var(--font-mono);
-        transition: var(--transition);
-        box-shadow: 0 0 8px #00ff9022;
-    }
-    .language-badge:hover {
-        border-color: var(--active-color);
-        background: #181f18;
-        color: #39ff14;
-    }
-    .action-buttons {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(120px, 1fr));
-        gap: 0.75rem;
-        margin-top: 1rem;
-    }
-    .separator {
-        height: 1px;
-        background: var(--border-accent);
-        margin: 1.5rem 0;
-        box-shadow: 0 0 8px #00ff9022;
-    }
-    .status-indicator {
-        display: inline-block;
-        width: 8px; height: 8px;
-        border-radius: 50%;
-        margin-right: 0.5rem;
-    }
-    .status-indicator.success { background: var(--success-text); }
-    .status-indicator.warning { background: var(--warning-text); }
-    .status-indicator.error { background: var(--error-text); }
-    .status-indicator.info { background: var(--active-color); }
-    .code-keyword { color: var(--code-keyword) !important; }
-    .code-string { color: var(--code-string) !important; }
-    .code-number { color: var(--code-number) !important; }
-    .code-func { color: var(--code-func) !important; }
-    .code-var { color: var(--code-var) !important; }
-    .code-comment { color: var(--code-comment) !important; }
-    .code-operator { color: var(--code-operator) !important; }
-    ::selection {
-        background: var(--active-color);
-        color: #101010;
-    }
-    /* Animations */
-    @keyframes glow {
-        0% { box-shadow: 0 0 8px #00ff90cc; }
-        50% { box-shadow: 0 0 24px #00ff90cc, 0 0 8px #39ff14; }
-        100% { box-shadow: 0 0 8px #00ff90cc; }
-    }
-    .enhanced-card, .stat-card, .result-container, .stButton > button:hover {
-        animation: glow 2.5s infinite alternate;
-    }
-    .loading-spinner {
-        display: inline-block;
-        width: 24px; height: 24px;
-        border: 3px solid #232d23;
-        border-radius: 50%;
-        border-top-color: var(--active-color);
-        animation: spin 1s linear infinite;
-    }
-    @keyframes spin {
-        to { transform: rotate(360deg); }
-    }
-    /* Matrix-style background (optional, subtle) */
-    body::before {
-        content: '';
-        position: fixed;
-        top: 0; left: 0; width: 100vw; height: 100vh;
-        pointer-events: none;
-        z-index: 0;
-        background: repeating-linear-gradient(
-            to bottom,
-            rgba(0,255,144,0.04) 0px,
-            rgba(0,255,144,0.08) 2px,
-            transparent 4px, transparent 32px
-        );
-        opacity: 0.7;
-        animation: matrix-bg 8s linear infinite;
-    }
-    @keyframes matrix-bg {
-        0% { background-position-y: 0; }
-        100% { background-position-y: 32px; }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    inject_stylesheet("app.css")
 
-# Data structures
-@dataclass
-class CodeAnalysis:
-    action: str
-    language: str
-    code: str
-    response: str
-    timestamp: str
-    execution_time: float
-    model_used: str
-    tokens_used: Optional[int] = None
-
-@dataclass
-class FavoriteCode:
-    language: str
-    code: str
-    timestamp: str
-    description: str
-    tags: List[str]
-
-# Configuration class
-class Config:
-    LANGUAGES = {
-        "python": {"name": "🐍 Python", "color": "#3572A5", "extensions": [".py"]},
-        "javascript": {"name": "📜 JavaScript", "color": "#f7df1e", "extensions": [".js", ".jsx"]},
-        "java": {"name": "☕ Java", "color": "#b07219", "extensions": [".java"]},
-        "csharp": {"name": "🔷 C#", "color": "#178600", "extensions": [".cs"]},
-        "cpp": {"name": "⚙️ C++", "color": "#f34b7d", "extensions": [".cpp", ".cc", ".cxx"]},
-        "php": {"name": "🐘 PHP", "color": "#4F5D95", "extensions": [".php"]},
-        "ruby": {"name": "💎 Ruby", "color": "#701516", "extensions": [".rb"]},
-        "go": {"name": "🔹 Go", "color": "#00ADD8", "extensions": [".go"]},
-        "rust": {"name": "⚡ Rust", "color": "#dea584", "extensions": [".rs"]},
-        "swift": {"name": "🦅 Swift", "color": "#ffac45", "extensions": [".swift"]},
-        "kotlin": {"name": "🧩 Kotlin", "color": "#A97BFF", "extensions": [".kt"]},
-        "typescript": {"name": "🔷 TypeScript", "color": "#2b7489", "extensions": [".ts", ".tsx"]}
-    }
-    
-    CODE_THEMES = {
-        "Dark": "monokai",
-        "Light": "github",
-        "Solarized": "solarized_dark",
-        "Tomorrow": "tomorrow_night",
-        "Twilight": "twilight",
-        "Dracula": "dracula",
-        "Nord": "nord_dark",
-        "Material": "material",
-        "Oceanic": "oceanic_next"
-    }
-    
-    GROQ_MODELS = {
-        "llama-3.1-8b": {"name": "Llama 3.1 8B", "speed": "Fast", "quality": "Good"},
-        "llama-3.1-70b": {"name": "Llama 3.1 70B", "speed": "Medium", "quality": "Excellent"},
-        "llama-3.1-405b": {"name": "Llama 3.1 405B", "speed": "Slow", "quality": "Best"},
-        "llama-3.2-11b": {"name": "Llama 3.2 11B", "speed": "Fast", "quality": "Very Good"},
-        "llama-3.2-82b-online": {"name": "Llama 3.2 82B Online", "speed": "Medium", "quality": "Excellent"},
-        "llama-3.3-8b-versatile": {"name": "Llama 3.3 8B Versatile", "speed": "Fast", "quality": "Good"},
-        "llama-3.3-70b-versatile": {"name": "Llama 3.3 70B Versatile", "speed": "Medium", "quality": "Excellent"}
-    }
+# Process-wide Groq client pool shared by all sessions
+@st.cache_resource
+def get_groq_pool() -> GroqClientPool:
+    return GroqClientPool(**Config.GROQ_POOL)
+
+# Process-wide client for the local Ollama daemon
+@st.cache_resource
+def get_ollama_provider() -> OllamaProvider:
+    return OllamaProvider(**Config.OLLAMA)
+
+def get_provider(model_option: str, api_key: str) -> LLMProvider:
+    """Backend for a model: local models go to Ollama, the rest to Groq"""
+    if provider_for_model(model_option) == OllamaProvider.name:
+        return get_ollama_provider()
+    return GroqProvider(get_groq_pool().get(api_key))
+
+# Prometheus endpoint for this process, started once
+@st.cache_resource
+def start_metrics():
+    return start_metrics_server() if Config.METRICS["enabled"] else None
+
+# Persistent analysis history shared by all sessions
+@st.cache_resource
+def get_history_store() -> HistoryStore:
+    return HistoryStore()
+
+# Dashboard aggregates, bootstrapped once from the history store and updated per analysis
+@st.cache_resource
+def get_aggregates() -> AnalysisAggregates:
+    aggregates = AnalysisAggregates()
+    aggregates.rebuild(get_history_store().iter_summaries())
+    return aggregates
+
+# Near-duplicate index over stored analyses; signatures persist in the history store
+@st.cache_resource
+def get_similarity_index() -> SimilarityIndex:
+    index = SimilarityIndex()
+    for row in get_history_store().iter_signatures():
+        index.add_signature(row["id"], row["language"], row["action"], array("Q", row["signature"]))
+    index_unsigned_analyses(index)
+    return index
+
+def index_unsigned_analyses(index: SimilarityIndex):
+    """Sign and index analyses stored without a signature (older or imported rows)"""
+    store = get_history_store()
+    for row in store.iter_unsigned():
+        signature = index.add(row["id"], row["language"], row["action"], row["code"])
+        store.save_signature(row["id"], signature.tobytes())
+
+def refresh_history_indexes():
+    """Bring aggregates and the similarity index up to date after history rows are deleted, cleared or imported"""
+    store = get_history_store()
+    get_aggregates().rebuild(store.iter_summaries())
+    if store.count() == 0:
+        get_similarity_index().clear()
+    else:
+        # Deleted rows stay in the index until restart; lookups skip ids that no longer exist
+        index_unsigned_analyses(get_similarity_index())
+
+# Snippet text shared by every session's favorites, keyed by content hash
+@st.cache_resource
+def get_blob_store() -> BlobStore:
+    return BlobStore()
+
+# Process-wide response cache shared by all sessions
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(
+        max_entries=Config.RESPONSE_CACHE["max_entries"],
+        max_age=Config.RESPONSE_CACHE["max_age"]
+    )
 
 # Initialize session state
 def initialize_session_state():
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    if "language_stats" not in st.session_state:
-        st.session_state.language_stats = {lang: 0 for lang in Config.LANGUAGES.keys()}
-    if "code_processed" not in st.session_state:
-        st.session_state.code_processed = 0
     if "favorite_codes" not in st.session_state:
-        st.session_state.favorite_codes = []
+        st.session_state.favorite_codes = {}  # code_hash -> FavoriteCode dict, in insertion order
+    if "blob_refs" not in st.session_state:
+        # This session's references into the shared blob store, released when the session is dropped
+        st.session_state.blob_refs = BlobRefs(get_blob_store())
     if "user_preferences" not in st.session_state:
         st.session_state.user_preferences = {
             "theme": "Dark",
@@ -492,6 +145,8 @@ def initialize_session_state():
         st.session_state.api_usage = {
             "total_requests": 0,
             "total_tokens": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
             "total_cost": 0.0
         }
 
@@ -515,109 +170,268 @@ def format_execution_time(seconds: float) -> str:
         remaining_seconds = seconds % 60
         return f"{minutes}m {remaining_seconds:.1f}s"
 
-def estimate_tokens(text: str) -> int:
-    """Rough estimation of tokens (4 characters per token)"""
-    return len(text) // 4
-
-def calculate_cost(tokens: int, model: str) -> float:
-    """Calculate estimated cost based on tokens and model"""
-    # Groq pricing (approximate)
-    pricing = {
-        "llama-3.1-8b": 0.05 / 1000000,  # $0.05 per 1M tokens
-        "llama-3.1-70b": 0.59 / 1000000,  # $0.59 per 1M tokens
-        "llama-3.1-405b": 2.39 / 1000000,  # $2.39 per 1M tokens
-        "llama-3.2-11b": 0.10 / 1000000,  # $0.10 per 1M tokens
-        "llama-3.2-82b-online": 0.59 / 1000000,  # $0.59 per 1M tokens
-        "llama-3.3-8b-versatile": 0.05 / 1000000,  # $0.05 per 1M tokens
-        "llama-3.3-70b-versatile": 0.59 / 1000000,  # $0.59 per 1M tokens
-    }
-    return tokens * pricing.get(model, 0.05 / 1000000)
+def estimate_tokens_from_chars(chars: int) -> int:
+    """Rough estimation of tokens from a character count"""
+    return chars // 4
+
+class StreamRenderer:
+    """Buffer streamed chunks and repaint the result at a bounded frame rate"""
+    
+    def __init__(self, container, progress_bar=None, expected_tokens: int = 1000,
+                 frame_rate: float = Config.STREAMING["frame_rate"],
+                 flush_bytes: int = Config.STREAMING["flush_bytes"],
+                 transform: Optional[Callable[[str], str]] = None):
+        self.container = container
+        self.transform = transform  # Applied to the displayed text only, e.g. line-number remapping
+        self.progress_bar = progress_bar
+        self.expected_tokens = max(int(expected_tokens), 1)
+        self.frame_interval = 1.0 / frame_rate if frame_rate > 0 else 0.0
+        self.flush_bytes = flush_bytes
+        self.chunks: List[str] = []
+        self.received_chars = 0
+        self.pending_chars = 0
+        self.last_flush = 0.0
+        self.frames = 0
+        self.render_time = 0.0  # Seconds spent repainting, i.e. our own overhead while streaming
+    
+    def write(self, content: str):
+        """Queue a chunk, repainting only when a frame is due"""
+        self.chunks.append(content)
+        self.received_chars += len(content)
+        self.pending_chars += len(content)
+        now = time.monotonic()
+        if self.pending_chars >= self.flush_bytes or now - self.last_flush >= self.frame_interval:
+            self.flush(now)
+    
+    def flush(self, now: Optional[float] = None):
+        """Repaint the container with everything received so far"""
+        if not self.pending_chars and self.frames:
+            return
+        paint_start = time.perf_counter()
+        self.container.markdown(self.transform(self.text) if self.transform else self.text)
+        if self.progress_bar is not None:
+            self.progress_bar.progress(min(estimate_tokens_from_chars(self.received_chars) / self.expected_tokens, 1.0))
+        self.render_time += time.perf_counter() - paint_start
+        self.pending_chars = 0
+        self.last_flush = now if now is not None else time.monotonic()
+        self.frames += 1
+    
+    @property
+    def text(self) -> str:
+        if len(self.chunks) > 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+    
+    def finish(self) -> str:
+        """Flush the final frame, clear the progress bar and return the full response"""
+        self.flush()
+        if self.progress_bar is not None:
+            self.progress_bar.empty()
+        return self.text
 
 # Enhanced AI processing function
-def process_with_groq(prompt_type: str, code_snippet: str, language_key: str, 
-                     api_key: str, model_option: str, temperature: float, 
-                     max_tokens: int) -> Optional[CodeAnalysis]:
+def record_analysis(analysis: CodeAnalysis, cost: float):
+    """Persist an analysis to the history store and update usage counters"""
+    store = get_history_store()
+    analysis_id = store.add(analysis)
+    get_aggregates().record(asdict(analysis))
+    observe_analysis(analysis)
+    if Config.SIMILARITY["enabled"] and not analysis.cached and analysis.response:
+        signature = get_similarity_index().add(analysis_id, analysis.language, analysis.action, analysis.code)
+        store.save_signature(analysis_id, signature.tobytes())
+    if not analysis.cached:
+        st.session_state.api_usage["total_requests"] += 1
+        st.session_state.api_usage["total_tokens"] += analysis.tokens_used or 0
+        st.session_state.api_usage["input_tokens"] += analysis.input_tokens or 0
+        st.session_state.api_usage["output_tokens"] += analysis.output_tokens or 0
+        st.session_state.api_usage["total_cost"] += cost
+
+def replay_cached_analysis(cache_key: str, prompt_type: str, code_snippet: str, language_key: str,
+                           model_option: str, start_time: float) -> Optional[CodeAnalysis]:
+    """Render a cached response immediately instead of calling the API"""
+    entry = get_response_cache().get(cache_key)
+    observe_cache_lookup(entry is not None)
+    if entry is None:
+        return None
+    
+    st.markdown(entry["response"])
+    execution_time = time.time() - start_time
+    analysis = CodeAnalysis(
+        action=prompt_type,
+        language=language_key,
+        code=code_snippet,
+        response=entry["response"],
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        execution_time=execution_time,
+        model_used=model_option,
+        tokens_used=entry.get("tokens_used"),
+        cached=True,
+        input_tokens=entry.get("input_tokens"),
+        output_tokens=entry.get("output_tokens"),
+        token_source=entry.get("token_source", "tokenizer")
+    )
+    record_analysis(analysis, 0.0)
+    create_notification(
+        f"⚡ Served from cache in {format_execution_time(execution_time)} | "
+        f"Originally analyzed {datetime.fromtimestamp(entry['stored_at']).strftime('%Y-%m-%d %H:%M')}",
+        "success"
+    )
+    return analysis
+
+def replay_similar_analysis(prompt_type: str, code_snippet: str, language_key: str,
+                            start_time: float) -> Optional[CodeAnalysis]:
+    """Reuse, or just surface, the response for a near-duplicate snippet analyzed before"""
+    store = get_history_store()
+    for match in get_similarity_index().query(language_key, prompt_type, code_snippet):
+        entry = store.get(match.entry_id)
+        if entry is None:  # Deleted since it was indexed
+            continue
+        if Config.SIMILARITY["mode"] != "reuse":
+            with st.expander(f"♻️ A {match.similarity:.0%} similar snippet was analyzed on {entry['timestamp']}"):
+                st.markdown(entry["response"])
+            return None
+        
+        st.markdown(entry["response"])
+        execution_time = time.time() - start_time
+        analysis = CodeAnalysis(
+            action=prompt_type,
+            language=language_key,
+            code=code_snippet,
+            response=entry["response"],
+            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            execution_time=execution_time,
+            model_used=entry["model_used"],
+            tokens_used=entry["tokens_used"],
+            cached=True,
+            input_tokens=entry["input_tokens"],
+            output_tokens=entry["output_tokens"],
+            token_source=entry["token_source"] or "tokenizer",
+            base_analysis_id=entry["id"]
+        )
+        record_analysis(analysis, 0.0)
+        create_notification(
+            f"♻️ Reused the analysis of a {match.similarity:.0%} similar snippet from {entry['timestamp']} "
+            f"in {format_execution_time(execution_time)} | Untick 'Reuse cached responses' for a fresh one",
+            "success"
+        )
+        return analysis
+    return None
+
+def find_incremental_plan(prompt_type: str, code_snippet: str, language_key: str,
+                          static_report: Optional[StaticReport] = None) -> Optional[IncrementalPlan]:
+    """Diff-only re-review plan against a recent analysis of an earlier revision, if there is one"""
+    return plan_incremental_review(
+        get_history_store().query(language=language_key, action=prompt_type, limit=Config.INCREMENTAL["candidates"]),
+        prompt_type, code_snippet, language_key,
+        static_report.prompt_context() if static_report else None
+    )
+
+def process_with_llm(prompt_type: str, code_snippet: str, language_key: str, 
+                    api_key: str, model_option: str, temperature: float, 
+                    max_tokens: int, use_cache: bool = True,
+                    static_report: Optional[StaticReport] = None,
+                    incremental: bool = False) -> Optional[CodeAnalysis]:
     """Enhanced AI processing with better error handling and metrics"""
     
-    if not api_key:
+    start_time = time.time()
+    cache_key = make_cache_key(prompt_type, language_key, model_option, temperature, max_tokens, code_snippet)
+    
+    if use_cache:
+        cached_analysis = replay_cached_analysis(cache_key, prompt_type, code_snippet, language_key,
+                                                 model_option, start_time)
+        if cached_analysis is not None:
+            return cached_analysis
+        if Config.SIMILARITY["enabled"]:
+            similar_analysis = replay_similar_analysis(prompt_type, code_snippet, language_key, start_time)
+            if similar_analysis is not None:
+                return similar_analysis
+    
+    if needs_api_key(model_option) and not api_key:
         create_notification("Please provide a Groq API key to continue", "error")
         return None
     
-    start_time = time.time()
-    
     try:
-        client = Groq(api_key=api_key)
-        
-        # Enhanced system prompts
-        system_prompts = {
-            "review": f"""You are an expert {language_key.upper()} code reviewer with 10+ years of experience.
-Analyze the code for:
-1. **Syntax Errors**: Identify any syntax issues
-2. **Logic Errors**: Find logical problems and edge cases
-3. **Performance Issues**: Suggest optimizations
-4. **Security Vulnerabilities**: Identify potential security risks
-5. **Best Practices**: Recommend improvements for maintainability
-6. **Code Quality**: Assess readability and structure
-
-Format your response with clear sections and use markdown formatting.""",
-            
-            "explain": f"""You are a senior {language_key.upper()} developer explaining code to a junior developer.
-Provide a comprehensive explanation including:
-1. **Overview**: What the code does at a high level
-2. **Line-by-line Analysis**: Explain each important section
-3. **Key Concepts**: Highlight important programming concepts used
-4. **Flow Diagram**: Describe the execution flow
-5. **Common Pitfalls**: What to watch out for
-6. **Learning Resources**: Suggest further reading
-
-Use simple language and provide examples where helpful.""",
-            
-            "optimize": f"""You are a {language_key.upper()} performance optimization expert.
-Analyze the code and provide:
-1. **Performance Analysis**: Identify bottlenecks and inefficiencies
-2. **Optimization Suggestions**: Specific improvements with code examples
-3. **Memory Usage**: Analyze memory consumption patterns
-4. **Time Complexity**: Assess algorithmic efficiency
-5. **Alternative Approaches**: Suggest different solutions
-6. **Benchmarking Tips**: How to measure improvements
-
-Provide before/after code comparisons where relevant."""
-        }
-        
-        system_prompt = system_prompts.get(prompt_type, system_prompts["review"])
+        provider = get_provider(model_option, api_key)
         
         with st.spinner(f"🤖 {prompt_type.capitalize()}ing your {language_key} code..."):
             result_container = st.empty()
-            full_response = ""
             
-            # Make API call
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Here's the {language_key} code to {prompt_type}:\n\n```{language_key}\n{code_snippet}\n```"}
-                ],
-                model=model_option,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=True
-            )
+            # Send compacted code; line references in the answer are mapped back to the original
+            compacted = compact_for_prompt(prompt_type, code_snippet, language_key)
+            static_findings = static_report.prompt_context(compacted.compacted_line) if static_report else None
+            messages = build_messages(prompt_type, compacted.text, language_key, static_findings)
+            tokens_saved = compacted.tokens_saved()
             
-            # Process streaming response with progress
-            progress_bar = st.progress(0)
-            for i, chunk in enumerate(chat_completion):
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    result_container.markdown(full_response)
-                    progress_bar.progress(min((i + 1) / 100, 1.0))
-                    time.sleep(0.01)
+            # Send only the changed hunks when the code is a revision of a recent analysis
+            plan = find_incremental_plan(prompt_type, code_snippet, language_key, static_report) if incremental else None
+            if plan is not None:
+                full_messages = build_messages(prompt_type, code_snippet, language_key,
+                                               static_report.prompt_context() if static_report else None)
+                tokens_saved = max(count_message_tokens(full_messages) - count_message_tokens(plan.messages), 0)
+                messages = plan.messages
+                compacted = CompactedCode.identity(code_snippet)  # Diff hunks already use the new line numbers
+                st.caption(
+                    f"♻️ Incremental re-review of the analysis from {plan.base.timestamp}: "
+                    f"+{plan.added_lines}/-{plan.removed_lines} lines ({plan.base.similarity:.0%} similar)"
+                )
+            
+            limiter = get_rate_limiter()
+            renderer = StreamRenderer(result_container, st.progress(0), expected_tokens=max_tokens,
+                                      transform=compacted.remap_response)
+            retry_stats = RetryStats()
+            attempt_state = {"messages": messages, "prefix": "", "api_usage": None}
+            timer = RequestTimer()
             
-            progress_bar.empty()
+            def stream_attempt():
+                # Resume after whatever was already rendered, or restart if nothing was
+                attempt_state["prefix"] = renderer.text
+                attempt_state["messages"] = continuation_messages(messages, attempt_state["prefix"])
+                attempt_state["api_usage"] = None
+                timer.begin_attempt()
+                
+                # Make API call, queueing behind the shared rate limiter
+                permit, chat_stream = open_with_limit(
+                    limiter, model_option, count_message_tokens(attempt_state["messages"]) + max_tokens,
+                    lambda: provider.stream(attempt_state["messages"], model_option, temperature, max_tokens)
+                )
+                timer.stream_opened(permit.wait_time)
+                
+                # Process streaming response with frame-coalesced rendering. Leaving the block
+                # for any reason, including a Stop click or rerun, closes the stream upstream
+                try:
+                    with chat_stream, ACTIVE_STREAMS.track(model=model_option):
+                        for content in chat_stream:
+                            timer.chunk_received()
+                            renderer.write(content)
+                except BaseException:
+                    limiter.release(permit, succeeded=False)
+                    raise
+                attempt_state["api_usage"] = chat_stream.usage
+                return permit
+            
+            try:
+                permit = call_with_retry(
+                    stream_attempt, RetryPolicy(**Config.RETRY), retry_stats,
+                    on_retry=lambda retry, delay, error: st.toast(
+                        f"🔁 Retry {retry} in {format_execution_time(delay)}: {str(error)[:80]}"
+                    )
+                )
+            finally:
+                # Keep whatever arrived on screen, even if every attempt failed
+                full_response = compacted.remap_response(renderer.finish())
             
             # Calculate metrics
             execution_time = time.time() - start_time
-            estimated_tokens = estimate_tokens(full_response + code_snippet)
-            estimated_cost = calculate_cost(estimated_tokens, model_option)
+            usage = measure_usage(attempt_state["messages"], full_response, attempt_state["api_usage"])
+            if usage.source == "api" and attempt_state["prefix"]:
+                # Provider usage only covers the final, resumed attempt
+                usage.output_tokens += count_tokens(attempt_state["prefix"])
+            limiter.release(permit, actual_tokens=usage.total_tokens)
+            estimated_cost = calculate_cost(usage.input_tokens, usage.output_tokens, model_option)
+            attempt_tokens = usage.output_tokens - count_tokens(attempt_state["prefix"])  # Streamed by the final attempt
+            timings = timer.summary(attempt_tokens, renderer.render_time)
+            if timer.ttft is not None:
+                get_model_router().record_success(model_option, timer.ttft, attempt_tokens, timer.stream_time)
             
             # Create analysis object
             analysis = CodeAnalysis(
@@ -628,22 +442,36 @@ Provide before/after code comparisons where relevant."""
                 timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 execution_time=execution_time,
                 model_used=model_option,
-                tokens_used=estimated_tokens
+                tokens_used=usage.total_tokens,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                token_source=usage.source,
+                retry_count=retry_stats.retries,
+                backoff_time=retry_stats.backoff_time,
+                prompt_tokens_saved=tokens_saved,
+                base_analysis_id=plan.base.analysis_id if plan is not None else None,
+                **timings
             )
             
-            # Update session state
-            st.session_state.chat_history.append(asdict(analysis))
-            st.session_state.language_stats[language_key] += 1
-            st.session_state.code_processed += 1
-            st.session_state.api_usage["total_requests"] += 1
-            st.session_state.api_usage["total_tokens"] += estimated_tokens
-            st.session_state.api_usage["total_cost"] += estimated_cost
+            # Update session state and cache
+            record_analysis(analysis, estimated_cost)
+            if full_response:
+                get_response_cache().put(cache_key, {
+                    "response": full_response,
+                    "tokens_used": usage.total_tokens,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                    "token_source": usage.source
+                })
             
             # Show success notification
             create_notification(
                 f"✅ Analysis completed in {format_execution_time(execution_time)} | "
-                f"Tokens: {estimated_tokens:,} | "
-                f"Cost: ${estimated_cost:.4f}",
+                f"Tokens: {usage.input_tokens:,} in / {usage.output_tokens:,} out | "
+                f"Cost: ${estimated_cost:.4f}"
+                + (f" | {'Incremental re-review' if plan is not None else 'Compaction'} saved {tokens_saved:,} tokens" if tokens_saved else "")
+                + (f" | Queued {format_execution_time(permit.wait_time)} for rate limits" if permit.wait_time >= 0.1 else "")
+                + (f" | {retry_stats.retries} retries" if retry_stats.retries else ""),
                 "success"
             )
             
@@ -651,11 +479,305 @@ Provide before/after code comparisons where relevant."""
             
     except Exception as e:
         execution_time = time.time() - start_time
+        get_model_router().record_failure(model_option)
+        observe_failure(model_option, prompt_type, language_key)
         create_notification(f"❌ Error processing request: {str(e)}", "error")
         return None
 
+def analyze_unit(provider: LLMProvider, prompt_type: str, unit: CodeUnit, header: Optional[CodeUnit], language_key: str,
+                 model_option: str, temperature: float, max_tokens: int,
+                 static_report: Optional[StaticReport] = None) -> Tuple[str, TokenUsage]:
+    """Analyze a single code unit with a non-streaming request (runs on a worker thread)
+
+    The model numbers lines from the start of the unit; the response is
+    remapped to the module's line numbers.
+    """
+    static_findings = static_report.for_lines(unit.lines).prompt_context() if static_report else None
+    messages = build_messages(prompt_type, unit.source, language_key, static_findings)
+    if header is not None and unit is not header:
+        messages[1]["content"] += (
+            f"\n\nIt is the `{unit.name}` {unit.kind} of a larger module "
+            f"whose top-level imports and definitions are:\n\n```{language_key}\n{header.source}\n```"
+        )
+    limiter = get_rate_limiter()
+    permit, (response, api_usage) = call_with_retry(
+        lambda: open_with_limit(
+            limiter, model_option, count_message_tokens(messages) + max_tokens,
+            lambda: provider.complete(messages, model_option, temperature, max_tokens)
+        ),
+        RetryPolicy(**Config.RETRY)
+    )
+    usage = None
+    try:
+        usage = measure_usage(messages, response, api_usage)
+    finally:
+        limiter.release(permit, actual_tokens=usage.total_tokens if usage is not None else None,
+                        succeeded=usage is not None)
+    return CompactedCode(unit.source, unit.lines, unit.source).remap_response(response), usage
+
+def format_unit_heading(unit: CodeUnit) -> str:
+    """Markdown heading for a unit in a merged report"""
+    label = "Module header" if unit.kind == "header" else f"{unit.kind.capitalize()} `{unit.name}`"
+    return f"## {label} (lines {unit.start_line}-{unit.end_line})"
+
+def process_python_units(prompt_type: str, code_snippet: str, api_key: str, model_option: str,
+                         temperature: float, max_tokens: int, use_cache: bool = True,
+                         static_report: Optional[StaticReport] = None,
+                         incremental: bool = False) -> Optional[CodeAnalysis]:
+    """Analyze a large Python file per top-level function/class concurrently and merge the results"""
+    language_key = "python"
+    units = split_python_units(code_snippet)
+    if not units or len(units) < 2:
+        return process_with_llm(prompt_type, code_snippet, language_key, api_key, model_option,
+                                temperature, max_tokens, use_cache, static_report, incremental)
+    
+    start_time = time.time()
+    cache_key = make_cache_key(f"{prompt_type}:units", language_key, model_option, temperature, max_tokens, code_snippet)
+    
+    if use_cache:
+        cached_analysis = replay_cached_analysis(cache_key, prompt_type, code_snippet, language_key,
+                                                 model_option, start_time)
+        if cached_analysis is not None:
+            return cached_analysis
+        if Config.SIMILARITY["enabled"]:
+            similar_analysis = replay_similar_analysis(prompt_type, code_snippet, language_key, start_time)
+            if similar_analysis is not None:
+                return similar_analysis
+    
+    # A revision of a recent analysis is re-reviewed from its diff as a whole, which beats fanning out again
+    if incremental and find_incremental_plan(prompt_type, code_snippet, language_key, static_report) is not None:
+        return process_with_llm(prompt_type, code_snippet, language_key, api_key, model_option,
+                                temperature, max_tokens, False, static_report, incremental)
+    
+    if needs_api_key(model_option) and not api_key:
+        create_notification("Please provide a Groq API key to continue", "error")
+        return None
+    
+    provider = get_provider(model_option, api_key)
+    header = next((unit for unit in units if unit.kind == "header"), None)
+    results: Dict[int, Tuple[str, TokenUsage]] = {}
+    failures: List[str] = []
+    
+    with st.spinner(f"🤖 {prompt_type.capitalize()}ing {len(units)} units in parallel..."):
+        progress_bar = st.progress(0)
+        placeholders = [st.empty() for _ in units]
+        for placeholder, unit in zip(placeholders, units):
+            placeholder.markdown(f"{format_unit_heading(unit)}\n\n⏳ Waiting...")
+        
+        with ThreadPoolExecutor(max_workers=Config.FANOUT["max_concurrency"]) as executor:
+            futures = {
+                executor.submit(analyze_unit, provider, prompt_type, unit, header, language_key,
+                                model_option, temperature, max_tokens, static_report): index
+                for index, unit in enumerate(units)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                unit = units[index]
+                try:
+                    results[index] = future.result()
+                    placeholders[index].markdown(f"{format_unit_heading(unit)}\n\n{results[index][0]}")
+                except Exception as e:
+                    failures.append(unit.name)
+                    placeholders[index].markdown(f"{format_unit_heading(unit)}\n\n❌ Error processing unit: {str(e)}")
+                progress_bar.progress(done / len(units))
+        
+        progress_bar.empty()
+    
+    if not results:
+        get_model_router().record_failure(model_option)
+        observe_failure(model_option, prompt_type, language_key)
+        create_notification("❌ Error processing request: every unit failed", "error")
+        return None
+    
+    # Merge per-unit reports in source order
+    full_response = "\n\n".join(
+        f"{format_unit_heading(units[index])}\n\n{results[index][0]}" for index in sorted(results)
+    )
+    input_tokens = sum(usage.input_tokens for _, usage in results.values())
+    output_tokens = sum(usage.output_tokens for _, usage in results.values())
+    sources = {usage.source for _, usage in results.values()}
+    execution_time = time.time() - start_time
+    estimated_cost = calculate_cost(input_tokens, output_tokens, model_option)
+    
+    analysis = CodeAnalysis(
+        action=prompt_type,
+        language=language_key,
+        code=code_snippet,
+        response=full_response,
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        execution_time=execution_time,
+        model_used=model_option,
+        tokens_used=input_tokens + output_tokens,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        token_source=sources.pop() if len(sources) == 1 else "mixed"
+    )
+    record_analysis(analysis, estimated_cost)
+    if not failures:
+        get_response_cache().put(cache_key, {
+            "response": full_response,
+            "tokens_used": analysis.tokens_used,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "token_source": analysis.token_source
+        })
+    
+    message = (f"✅ Analyzed {len(results)}/{len(units)} units in {format_execution_time(execution_time)} | "
+               f"Tokens: {input_tokens:,} in / {output_tokens:,} out | Cost: ${estimated_cost:.4f}")
+    create_notification(message, "warning" if failures else "success")
+    return analysis
+
+def render_static_report(report: StaticReport):
+    """Show local checker findings before the AI response starts streaming"""
+    summary = f"🔎 Local checks: {len(report.findings)} finding{'s' if len(report.findings) != 1 else ''} in {format_execution_time(report.elapsed)}"
+    if not report.findings:
+        st.caption(summary + " ✅")
+        return
+    with st.expander(summary, expanded=True):
+        st.markdown(report.markdown())
+
+def routable_models(api_key: str) -> List[str]:
+    """Models automatic routing may pick: the hosted ones when a key is set, otherwise the local ones"""
+    return [model for model in Config.MODELS if needs_api_key(model) == bool(api_key)]
+
+def run_analysis(prompt_type: str, code_snippet: str, language_key: str, api_key: str, model_option: str,
+                 temperature: float, max_tokens: int, use_cache: bool = True,
+                 split_units: bool = False, static_checks: bool = True,
+                 skip_uncompilable: bool = True, incremental: bool = True,
+                 latency_target: Optional[float] = None) -> Optional[CodeAnalysis]:
+    """Dispatch an analysis: local checks first, then model routing with fallback and fan-out when enabled"""
+    report = None
+    if static_checks and language_key == "python":
+        report = analyze_python(code_snippet)
+        render_static_report(report)
+        if report.blocking and skip_uncompilable:
+            create_notification("⏭️ Skipped the AI call: fix the syntax error above first", "info")
+            return None
+    
+    models = [model_option]
+    candidates = routable_models(api_key) if latency_target is not None else []
+    if candidates:
+        decision = get_model_router().route(prompt_type, count_tokens(code_snippet), latency_target,
+                                            candidates, max_tokens)
+        st.caption(f"🧭 Model routing: {decision.reason}")
+        models = decision.ranking[:Config.ROUTER["max_fallbacks"] + 1]
+    
+    fan_out = split_units and language_key == "python" and code_snippet.count("\n") + 1 >= Config.FANOUT["min_lines"]
+    for attempt, model in enumerate(models):
+        if attempt:
+            create_notification(f"↪️ Falling back to {Config.MODELS[model]['name']}", "warning")
+        if fan_out:
+            analysis = process_python_units(prompt_type, code_snippet, api_key, model, temperature, max_tokens,
+                                            use_cache, report, incremental)
+        else:
+            analysis = process_with_llm(prompt_type, code_snippet, language_key, api_key, model,
+                                        temperature, max_tokens, use_cache, report, incremental)
+        if analysis is not None:
+            return analysis
+    return None
+
+def run_concurrent_analyses(actions: List[str], models: List[str], code_snippet: str, language_key: str,
+                            api_key: str, temperature: float, max_tokens: int,
+                            use_cache: bool = True) -> List[CodeAnalysis]:
+    """Run several actions and/or models for one snippet concurrently, each streaming into its own tab"""
+    jobs = [
+        AnalysisJob(action, language_key, code_snippet, model, temperature, max_tokens)
+        for action in actions for model in models
+    ]
+    if not jobs:
+        create_notification("Select at least one action and one model", "info")
+        return []
+    
+    start_time = time.time()
+    tabs = st.tabs([f"{job.action.capitalize()} · {Config.MODELS[job.model]['name']}" for job in jobs])
+    analyses: List[CodeAnalysis] = []
+    pending: List[int] = []
+    cache_keys = [make_cache_key(job.action, language_key, job.model, temperature, max_tokens, code_snippet) for job in jobs]
+    
+    # Serve cached jobs immediately; only the rest go to the engine
+    for index, job in enumerate(jobs):
+        with tabs[index]:
+            cached_analysis = None
+            if use_cache:
+                cached_analysis = replay_cached_analysis(cache_keys[index], job.action, code_snippet,
+                                                         language_key, job.model, start_time)
+            if cached_analysis is not None:
+                analyses.append(cached_analysis)
+            else:
+                pending.append(index)
+    
+    if not pending:
+        return analyses
+    if not api_key and any(needs_api_key(jobs[index].model) for index in pending):
+        create_notification("Please provide a Groq API key to continue", "error")
+        return analyses
+    
+    renderers = {}
+    for index in pending:
+        with tabs[index]:
+            renderers[index] = StreamRenderer(st.empty(), st.progress(0), expected_tokens=max_tokens)
+    
+    engine = AsyncAnalysisEngine(api_key, max_concurrency=Config.FANOUT["max_concurrency"])
+    pending_jobs = [jobs[index] for index in pending]
+    with st.spinner(f"🤖 Running {len(pending_jobs)} analyses concurrently..."):
+        results = engine.run_sync(pending_jobs, lambda i, content: renderers[pending[i]].write(content))
+    
+    for index, result in zip(pending, results):
+        if renderers[index].finish() != result.response:
+            renderers[index].container.markdown(result.response)  # Line references remapped to the original code
+        job = result.job
+        with tabs[index]:
+            if result.error is not None:
+                observe_failure(job.model, job.action, language_key)
+                create_notification(f"❌ Error processing request: {result.error}", "error")
+                continue
+            usage = result.usage
+            estimated_cost = calculate_cost(usage.input_tokens, usage.output_tokens, job.model)
+            analysis = CodeAnalysis(
+                action=job.action,
+                language=language_key,
+                code=code_snippet,
+                response=result.response,
+                timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                execution_time=result.execution_time,
+                model_used=job.model,
+                tokens_used=usage.total_tokens,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                token_source=usage.source,
+                retry_count=result.retry_count,
+                backoff_time=result.backoff_time,
+                prompt_tokens_saved=result.prompt_tokens_saved,
+                **dict(result.timings, render_time=renderers[index].render_time)
+            )
+            record_analysis(analysis, estimated_cost)
+            if result.response:
+                get_response_cache().put(cache_keys[index], {
+                    "response": result.response,
+                    "tokens_used": usage.total_tokens,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                    "token_source": usage.source
+                })
+            create_notification(
+                f"✅ Completed in {format_execution_time(result.execution_time)} | "
+                f"Tokens: {usage.input_tokens:,} in / {usage.output_tokens:,} out | Cost: ${estimated_cost:.4f}",
+                "success"
+            )
+            analyses.append(analysis)
+    
+    sequential_time = sum(result.execution_time for result in results)
+    create_notification(
+        f"⚡ {len(results)} analyses finished in {format_execution_time(time.time() - start_time)} "
+        f"(sequential would take ~{format_execution_time(sequential_time)})",
+        "info"
+    )
+    return analyses
+
 # Main application
 def main():
+    start_metrics()
+    
     # Load enhanced CSS
     load_enhanced_css()
     
@@ -667,6 +789,11 @@ def main():
     model_option = "llama-3.3-70b-versatile"
     temperature = 0.7
     max_tokens = 1000
+    use_cache = True
+    split_units = True
+    static_checks = True
+    skip_uncompilable = True
+    incremental = True
     theme_option = "Dark"
     font_size = 14
     wrap_text = True
@@ -725,17 +852,34 @@ def main():
             with st.expander("🤖 Model Settings", expanded=False):
                 model_option = st.selectbox(
                     "Select Model",
-                    list(Config.GROQ_MODELS.keys()),
-                    format_func=lambda x: f"{Config.GROQ_MODELS[x]['name']} ({Config.GROQ_MODELS[x]['speed']})",
+                    list(Config.MODELS.keys()),
+                    format_func=lambda x: f"{Config.MODELS[x]['name']} ({Config.MODELS[x]['speed']})",
                     index=6
                 )
                 
                 # Show model info
-                model_info = Config.GROQ_MODELS[model_option]
+                model_info = Config.MODELS[model_option]
                 st.info(f"**{model_info['name']}** - Speed: {model_info['speed']}, Quality: {model_info['quality']}")
                 
+                auto_route = st.checkbox("Pick the model automatically", value=False,
+                                         help="Route each request by code size, action and the measured speed of every model, "
+                                              "falling back to the next model when one fails")
+                latency_target = st.slider("Latency target (s)", 1.0, 60.0, float(Config.ROUTER["latency_target"]), 1.0,
+                                           disabled=not auto_route)
+                
                 temperature = st.slider("Temperature", 0.0, 1.0, 0.7, 0.1)
                 max_tokens = st.number_input("Max Tokens", 100, 4000, 1000, 100)
+                use_cache = st.checkbox("Reuse cached responses", value=True,
+                                        help="Replay a stored analysis when the same code, action and settings were analyzed before")
+                split_units = st.checkbox("Split large Python files by function", value=True,
+                                          help=f"Analyze each top-level function and class concurrently for files of {Config.FANOUT['min_lines']}+ lines; "
+                                               "revisions of a recent analysis are still re-reviewed from their diff")
+                static_checks = st.checkbox("Run local checks first", value=True,
+                                            help="Check Python code for syntax errors, undefined names and unused imports before calling the model")
+                skip_uncompilable = st.checkbox("Skip the AI call for code that does not compile", value=True,
+                                                disabled=not static_checks)
+                incremental = st.checkbox("Re-review only what changed", value=Config.INCREMENTAL["enabled"],
+                                          help="When the code is an edit of a recently reviewed snippet, send just the diff and the previous findings")
             
             # Editor Settings
             with st.expander("📝 Editor Settings", expanded=True):
@@ -748,18 +892,19 @@ def main():
             st.markdown("## 📊 Quick Stats")
             
             # Create statistics cards
+            aggregates = get_aggregates()
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown(f"""
                 <div class="stat-card">
-                    <div class="stat-number">{st.session_state.code_processed}</div>
+                    <div class="stat-number">{aggregates.total}</div>
                     <div class="stat-label">Codes Processed</div>
                 </div>
                 """, unsafe_allow_html=True)
             
             with col2:
-                most_used = max(st.session_state.language_stats, key=st.session_state.language_stats.get)
-                most_used_name = Config.LANGUAGES[most_used]['name'].split(' ')[1]  # Get just the language name without emoji
+                most_used = aggregates.most_used_language()
+                most_used_name = Config.LANGUAGES[most_used]['name'].split(' ')[1] if most_used else "—"  # Get just the language name without emoji
                 st.markdown(f"""
                 <div class="stat-card">
                     <div class="stat-number">{most_used_name}</div>
@@ -769,7 +914,9 @@ def main():
     
     # Main content routing
     if selected_menu == "Code Editor":
-        render_code_editor(api_key, model_option, temperature, max_tokens, theme_option, font_size, wrap_text)
+        render_code_editor(api_key, model_option, temperature, max_tokens, theme_option, font_size, wrap_text,
+                           use_cache, split_units, static_checks, skip_uncompilable, incremental,
+                           latency_target if auto_route else None)
     elif selected_menu == "Dashboard":
         render_dashboard()
     elif selected_menu == "History":
@@ -779,7 +926,9 @@ def main():
     elif selected_menu == "About":
         render_about()
 
-def render_code_editor(api_key, model_option, temperature, max_tokens, theme_option, font_size, wrap_text):
+def render_code_editor(api_key, model_option, temperature, max_tokens, theme_option, font_size, wrap_text,
+                       use_cache=True, split_units=False, static_checks=True, skip_uncompilable=True,
+                       incremental=True, latency_target=None):
     """Render the enhanced code editor interface"""
     col1, col2 = st.columns([3, 2])
     
@@ -834,6 +983,17 @@ def render_code_editor(api_key, model_option, temperature, max_tokens, theme_opt
         with btn_cols[3]:
             save_button = st.button("❤️ Save", use_container_width=True)
         
+        # Concurrent multi-action / multi-model runs
+        with st.expander("🚀 Run Multiple", expanded=False):
+            multi_actions = st.multiselect("Actions", ["review", "explain", "optimize"], default=["review", "optimize"])
+            multi_models = st.multiselect(
+                "Models",
+                list(Config.MODELS.keys()),
+                default=[model_option],
+                format_func=lambda x: Config.MODELS[x]['name']
+            )
+            multi_button = st.button("🚀 Run Together", use_container_width=True)
+        
         st.markdown("</div>", unsafe_allow_html=True)
     
     with col2:
@@ -843,11 +1003,17 @@ def render_code_editor(api_key, model_option, temperature, max_tokens, theme_opt
         # Handle button actions
         if code:
             if review_button:
-                process_with_groq("review", code, selected_lang_key, api_key, model_option, temperature, max_tokens)
+                run_analysis("review", code, selected_lang_key, api_key, model_option, temperature, max_tokens, use_cache, split_units,
+                             static_checks, skip_uncompilable, incremental, latency_target)
             elif explain_button:
-                process_with_groq("explain", code, selected_lang_key, api_key, model_option, temperature, max_tokens)
+                run_analysis("explain", code, selected_lang_key, api_key, model_option, temperature, max_tokens, use_cache, split_units,
+                             static_checks, skip_uncompilable, incremental, latency_target)
             elif optimize_button:
-                process_with_groq("optimize", code, selected_lang_key, api_key, model_option, temperature, max_tokens)
+                run_analysis("optimize", code, selected_lang_key, api_key, model_option, temperature, max_tokens, use_cache, split_units,
+                             static_checks, skip_uncompilable, incremental, latency_target)
+            elif multi_button:
+                run_concurrent_analyses(multi_actions, multi_models, code, selected_lang_key, api_key,
+                                        temperature, max_tokens, use_cache)
             elif save_button:
                 save_favorite_code(code, selected_lang_key)
         else:
@@ -1089,7 +1255,8 @@ int main() {
 
 def save_favorite_code(code: str, language: str):
     """Save code to favorites with description and tags"""
-    if code not in [item["code"] for item in st.session_state.favorite_codes]:
+    code_hash = content_hash(code)
+    if code_hash not in st.session_state.favorite_codes:
         # Create a simple dialog for description
         description = st.text_input("Add a description (optional):", key="fav_desc")
         tags = st.text_input("Add tags (comma-separated):", key="fav_tags")
@@ -1097,29 +1264,67 @@ def save_favorite_code(code: str, language: str):
         if st.button("Save to Favorites"):
             favorite = FavoriteCode(
                 language=language,
-                code=code,
+                code_hash=st.session_state.blob_refs.put(code),
                 timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 description=description or "No description",
                 tags=tags.split(",") if tags else []
             )
-            st.session_state.favorite_codes.append(asdict(favorite))
+            st.session_state.favorite_codes[code_hash] = asdict(favorite)
             create_notification("✅ Code saved to favorites!", "success")
             st.rerun()
     else:
         create_notification("ℹ️ This code is already in your favorites.", "info")
 
+# Dashboard figure builders, called by AnalysisAggregates.figure only when the data changed
+def style_figure(fig):
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#f0f6fc')
+    )
+    return fig
+
+def build_language_figure(snapshot: Dict):
+    languages = snapshot["languages"]
+    fig = px.pie(
+        values=list(languages.values()),
+        names=[Config.LANGUAGES[lang]["name"] if lang in Config.LANGUAGES else lang for lang in languages],
+        title="Code Analysis by Language"
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return style_figure(fig)
+
+def build_action_figure(snapshot: Dict):
+    actions = snapshot["actions"]
+    return style_figure(px.bar(
+        x=list(actions.keys()),
+        y=list(actions.values()),
+        title="Analysis Types Used",
+        labels={"x": "Analysis Type", "y": "Count"}
+    ))
+
+def build_latency_figure(snapshot: Dict):
+    return style_figure(px.bar(
+        x=latency_bucket_labels(),
+        y=snapshot["latency_histogram"],
+        title="Analysis Latency",
+        labels={"x": "Execution Time", "y": "Analyses"}
+    ))
+
 def render_dashboard():
     """Render the analytics dashboard"""
     st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
     colored_header(label="📊 Analytics Dashboard", description="Your coding insights and statistics", color_name="blue-70")
     
     # Overview statistics
+    aggregates = get_aggregates()
+    totals = aggregates.totals()
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.markdown(f"""
         <div class="stat-card">
-            <div class="stat-number">{st.session_state.code_processed}</div>
+            <div class="stat-number">{totals['analyses']}</div>
             <div class="stat-label">Total Analyses</div>
         </div>
         """, unsafe_allow_html=True)
@@ -1127,7 +1332,7 @@ def render_dashboard():
     with col2:
         st.markdown(f"""
         <div class="stat-card">
-            <div class="stat-number">{st.session_state.api_usage['total_requests']}</div>
+            <div class="stat-number">{totals['requests']}</div>
             <div class="stat-label">API Requests</div>
         </div>
         """, unsafe_allow_html=True)
@@ -1135,45 +1340,32 @@ def render_dashboard():
     with col3:
         st.markdown(f"""
         <div class="stat-card">
-            <div class="stat-number">{st.session_state.api_usage['total_tokens']:,}</div>
+            <div class="stat-number">{totals['tokens']:,}</div>
             <div class="stat-label">Tokens Used</div>
         </div>
         """, unsafe_allow_html=True)
+        if totals['tokens_saved']:
+            st.caption(f"✂️ {totals['tokens_saved']:,} input tokens saved by prompt compaction")
     
     with col4:
         st.markdown(f"""
         <div class="stat-card">
-            <div class="stat-number">${st.session_state.api_usage['total_cost']:.4f}</div>
+            <div class="stat-number">${totals['cost']:.4f}</div>
             <div class="stat-label">Total Cost</div>
         </div>
         """, unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
     
-    # Charts and visualizations
+    # Charts and visualizations (rebuilt only when the aggregates change)
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
         st.markdown("### Language Usage")
         
-        # Create language usage chart
-        languages = list(st.session_state.language_stats.keys())
-        counts = list(st.session_state.language_stats.values())
-        
-        if sum(counts) > 0:
-            fig = px.pie(
-                values=counts,
-                names=[Config.LANGUAGES[lang]["name"] for lang in languages],
-                title="Code Analysis by Language"
-            )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            fig.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#f0f6fc')
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if totals['analyses'] > 0:
+            st.plotly_chart(aggregates.figure("languages", build_language_figure), use_container_width=True)
         else:
             st.info("No data available yet. Start analyzing code to see statistics!")
         
@@ -1183,36 +1375,72 @@ def render_dashboard():
         st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
         st.markdown("### Analysis Types")
         
-        # Create analysis type chart
-        if st.session_state.chat_history:
-            analysis_types = [item["action"] for item in st.session_state.chat_history]
-            type_counts = Counter(analysis_types)
-            
-            fig = px.bar(
-                x=list(type_counts.keys()),
-                y=list(type_counts.values()),
-                title="Analysis Types Used",
-                labels={"x": "Analysis Type", "y": "Count"}
-            )
-            fig.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#f0f6fc')
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if totals['analyses'] > 0:
+            st.plotly_chart(aggregates.figure("actions", build_action_figure), use_container_width=True)
         else:
             st.info("No analysis history yet!")
         
         st.markdown("</div>", unsafe_allow_html=True)
     
+    if totals['requests'] > 0:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
+            st.markdown("### Latency Distribution")
+            st.plotly_chart(aggregates.figure("latency", build_latency_figure), use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
+            st.markdown("### Usage by Model")
+            models = aggregates.snapshot()["models"]
+            st.dataframe(
+                [
+                    {
+                        "Model": name,
+                        "Requests": model["requests"],
+                        "Input Tokens": model["input_tokens"],
+                        "Output Tokens": model["output_tokens"],
+                        "Cost ($)": round(model["cost"], 4),
+                        "Avg Latency": format_execution_time(model["latency"] / model["requests"])
+                    }
+                    for name, model in models.items()
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+            st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Rolling per-model measurements behind automatic routing
+    router_stats = get_model_router().snapshot()
+    if router_stats:
+        st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
+        st.markdown("### Measured Model Performance")
+        st.dataframe(
+            [
+                {
+                    "Model": Config.MODELS.get(stats["model"], {}).get("name", stats["model"]),
+                    "Time to First Token": format_execution_time(stats["ttft"]),
+                    "Tokens/s": round(stats["tokens_per_second"]),
+                    "Error Rate": f"{stats['error_rate']:.0%}",
+                    "Samples": stats["samples"],
+                    "Status": "⏸️ Benched" if stats["benched"] else "✅ Healthy"
+                }
+                for stats in router_stats
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        st.markdown("</div>", unsafe_allow_html=True)
+    
     # Recent activity
     st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
     st.markdown("### Recent Activity")
     
-    if st.session_state.chat_history:
-        recent_analyses = st.session_state.chat_history[-5:]  # Last 5 analyses
-        
-        for analysis in reversed(recent_analyses):
+    recent_analyses = get_history_store().query(limit=5)  # Last 5 analyses, newest first
+    if recent_analyses:
+        for analysis in recent_analyses:
             with st.expander(f"{analysis['action'].capitalize()} - {Config.LANGUAGES[analysis['language']]['name']} - {analysis['timestamp']}", expanded=False):
                 col1, col2 = st.columns([3, 1])
                 with col1:
@@ -1225,20 +1453,71 @@ def render_dashboard():
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+def current_page_cursor(key: str, signature) -> Optional[str]:
+    """Cursor of the page being shown for a paginated list, reset when its filters change"""
+    pager = st.session_state.setdefault(f"{key}_pager", {"signature": signature, "cursors": [None]})
+    if pager["signature"] != signature:
+        pager["signature"] = signature
+        pager["cursors"] = [None]
+    return pager["cursors"][-1]
+
+def render_pager(key: str, next_cursor: Optional[str]):
+    """Render Previous/Next controls for a list paginated with current_page_cursor"""
+    pager = st.session_state[f"{key}_pager"]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(pager["cursors"]) == 1, use_container_width=True):
+            pager["cursors"].pop()
+            st.rerun()
+    with col2:
+        st.markdown(f"<div style='text-align: center;'>Page {len(pager['cursors'])}</div>", unsafe_allow_html=True)
+    with col3:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None, use_container_width=True):
+            pager["cursors"].append(next_cursor)
+            st.rerun()
+
+def format_timing(item: Dict) -> Optional[str]:
+    """One-line breakdown of where a request's time went, if it was measured"""
+    if item.get("ttft") is None:
+        return None
+    parts = []
+    if item.get("queue_wait"):
+        parts.append(f"Queued {format_execution_time(item['queue_wait'])}")
+    if item.get("connect_time") is not None:
+        parts.append(f"Connect {format_execution_time(item['connect_time'])}")
+    parts.append(f"First token {format_execution_time(item['ttft'])}")
+    if item.get("stream_time") is not None:
+        streaming = f"Streaming {format_execution_time(item['stream_time'])}"
+        if item.get("tokens_per_second"):
+            streaming += f" at {item['tokens_per_second']:,.0f} tok/s"
+        parts.append(streaming)
+    if item.get("chunk_gap_p50") is not None:
+        parts.append(f"Chunk gaps p50 {format_execution_time(item['chunk_gap_p50'])} / "
+                     f"p95 {format_execution_time(item['chunk_gap_p95'])} / "
+                     f"max {format_execution_time(item['chunk_gap_max'])}")
+    if item.get("render_time") is not None:
+        parts.append(f"Rendering {format_execution_time(item['render_time'])}")
+    return "⏱️ " + " · ".join(parts)
+
 def render_history():
     """Render the enhanced history interface"""
     st.markdown('<div class="enhanced-card">', unsafe_allow_html=True)
     colored_header(label="📚 Analysis History", description="View and manage your previous analyses", color_name="blue-70")
     
     # Filter options
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns([2, 2, 3, 1])
     with col1:
         language_options = ["All"] + [lang_info["name"] for lang_info in Config.LANGUAGES.values()]
         filter_language = st.selectbox("Filter by Language", language_options)
     with col2:
         filter_action = st.selectbox("Filter by Action", ["All", "review", "explain", "optimize"])
     with col3:
-        search_term = st.text_input("Search in code or responses", placeholder="Enter search term...")
+        search_term = st.text_input("Search in code or responses", placeholder="Enter search term...",
+                                    help='Words match by prefix; use "double quotes" for exact phrases. Best matches are listed first.')
+    with col4:
+        page_size_options = Config.HISTORY["page_size_options"]
+        page_size = st.selectbox("Page Size", page_size_options,
+                                 index=page_size_options.index(Config.HISTORY["page_size"]))
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1246,26 +1525,25 @@ def render_history():
     tab1, tab2 = st.tabs(["📊 Analysis History", "❤️ Favorite Codes"])
     
     with tab1:
-        if st.session_state.chat_history:
+        history_store = get_history_store()
+        st.caption(f"🌐 History is shared by every session of this server and kept across restarts "
+                   f"in `{history_store.path}`.")
+        if history_store.count():
             # Filter history based on selections
-            filtered_history = st.session_state.chat_history
-            
-            if filter_language != "All":
+            filters = {
                 # Get the language key from the selected language name
-                selected_lang_key = next(key for key, value in Config.LANGUAGES.items() if value["name"] == filter_language)
-                filtered_history = [item for item in filtered_history if item["language"] == selected_lang_key]
-            
-            if filter_action != "All":
-                filtered_history = [item for item in filtered_history if item["action"] == filter_action]
-            
-            if search_term:
-                filtered_history = [
-                    item for item in filtered_history 
-                    if search_term.lower() in item["code"].lower() or search_term.lower() in item["response"].lower()
-                ]
+                "language": next(key for key, value in Config.LANGUAGES.items() if value["name"] == filter_language)
+                if filter_language != "All" else None,
+                "action": filter_action if filter_action != "All" else None,
+                "search": search_term or None
+            }
+            cursor = current_page_cursor("history", (tuple(filters.items()), page_size))
+            filtered_history, next_cursor = history_store.page(cursor=cursor, limit=page_size, **filters)
             
             if filtered_history:
-                for i, item in enumerate(filtered_history):
+                st.caption(f"{history_store.count(**filters):,} matching analyses")
+                for item in filtered_history:
+                    i = item["id"]
                     st.markdown(f"""
                     <div class="result-container">
                         <h3>{item['action'].capitalize()} - {Config.LANGUAGES[item['language']]['name']} - {item['timestamp']}</h3>
@@ -1281,34 +1559,41 @@ def render_history():
                     with col3:
                         st.metric("Model", item['model_used'])
                     with col4:
-                        st.metric("Code Length", f"{len(item['code'])} chars")
+                        st.metric("Code Length", f"{item['code_length']} chars")
                     
-                    # Code and analysis
+                    timing = format_timing(item)
+                    if timing:
+                        st.caption(timing)
+                    
+                    # Code and analysis bodies are only fetched and sent once opened
                     col1, col2 = st.columns(2)
                     with col1:
-                        with st.expander("View Code", expanded=False):
-                            st.code(item['code'], language=item['language'])
+                        if st.toggle("View Code", key=f"view_code_{i}"):
+                            st.code(history_store.get(i)['code'], language=item['language'])
                     with col2:
-                        with st.expander("View Analysis", expanded=False):
-                            st.markdown(item['response'])
+                        if st.toggle("View Analysis", key=f"view_analysis_{i}"):
+                            st.markdown(history_store.get(i)['response'])
                     
                     # Action buttons
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         if st.button(f"🔄 Re-run", key=f"rerun_{i}"):
-                            st.session_state.temp_code = item['code']
+                            st.session_state.temp_code = history_store.get(i)['code']
                             st.session_state.temp_lang = item['language']
                             st.session_state.temp_action = item['action']
                             st.rerun()
                     with col2:
                         if st.button(f"❤️ Save", key=f"save_{i}"):
-                            save_favorite_code(item['code'], item['language'])
+                            save_favorite_code(history_store.get(i)['code'], item['language'])
                     with col3:
                         if st.button(f"🗑️ Delete", key=f"delete_{i}"):
-                            st.session_state.chat_history.remove(item)
+                            history_store.delete(i)
+                            refresh_history_indexes()
                             st.rerun()
                     
                     st.markdown("---")
+                
+                render_pager("history", next_cursor)
             else:
                 st.info("No analyses match your current filters.")
         else:
@@ -1316,7 +1601,11 @@ def render_history():
     
     with tab2:
         if st.session_state.favorite_codes:
-            for i, item in enumerate(st.session_state.favorite_codes):
+            favorites = st.session_state.favorite_codes
+            blob_store = get_blob_store()
+            offset = int(current_page_cursor("favorites", page_size) or 0)
+            next_offset = offset + page_size
+            for i, item in enumerate(islice(favorites.values(), offset, next_offset), start=offset):
                 st.markdown(f"""
                 <div class="result-container">
                     <h3>{Config.LANGUAGES[item['language']]['name']} - {item['timestamp']}</h3>
@@ -1325,29 +1614,32 @@ def render_history():
                 </div>
                 """, unsafe_allow_html=True)
                 
-                with st.expander("View Code", expanded=False):
-                    st.code(item['code'], language=item['language'])
+                if st.toggle("View Code", key=f"view_fav_{i}"):
+                    st.code(blob_store.get(item['code_hash']), language=item['language'])
                 
                 # Action buttons
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button(f"🔍 Review", key=f"review_fav_{i}"):
-                        st.session_state.temp_code = item['code']
+                        st.session_state.temp_code = blob_store.get(item['code_hash'])
                         st.session_state.temp_lang = item['language']
                         st.session_state.temp_action = "review"
                         st.rerun()
                 with col2:
                     if st.button(f"📝 Explain", key=f"explain_fav_{i}"):
-                        st.session_state.temp_code = item['code']
+                        st.session_state.temp_code = blob_store.get(item['code_hash'])
                         st.session_state.temp_lang = item['language']
                         st.session_state.temp_action = "explain"
                         st.rerun()
                 with col3:
                     if st.button(f"🗑️ Delete", key=f"del_fav_{i}"):
-                        st.session_state.favorite_codes.remove(item)
+                        del st.session_state.favorite_codes[item['code_hash']]
+                        st.session_state.blob_refs.release(item['code_hash'])
                         st.rerun()
                 
                 st.markdown("---")
+            
+            render_pager("favorites", str(next_offset) if next_offset < len(favorites) else None)
         else:
             st.info("No favorite codes saved yet. Use the ❤️ Save button to add codes to your favorites.")
 
@@ -1382,17 +1674,31 @@ def render_settings():
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("### Export Data")
+            compress_export = st.checkbox("Compress export (gzip)", value=True)
             if st.button("📤 Export History"):
-                history_data = json.dumps(st.session_state.chat_history, indent=2)
+                # Stream the history to a temporary file in batches instead of building one JSON string
+                progress = st.progress(0.0, text="Exporting history...")
+                export_file = tempfile.TemporaryFile()
+                count = export_history(
+                    get_history_store(), export_file, compress=compress_export,
+                    on_progress=lambda done, total: progress.progress(min(done / total, 1.0) if total else 1.0)
+                )
+                export_file.seek(0)
+                progress.empty()
+                extension = "ndjson.gz" if compress_export else "ndjson"
                 st.download_button(
-                    label="Download History JSON",
-                    data=history_data,
-                    file_name=f"code_inspector_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
+                    label=f"Download History ({count} analyses)",
+                    data=export_file,
+                    file_name=f"code_inspector_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                    mime="application/gzip" if compress_export else "application/x-ndjson",
                 )
             
             if st.button("📤 Export Favorites"):
-                favorites_data = json.dumps(st.session_state.favorite_codes, indent=2)
+                blob_store = get_blob_store()
+                favorites_data = json.dumps([
+                    {**item, "code": blob_store.get(item["code_hash"])}
+                    for item in st.session_state.favorite_codes.values()
+                ], indent=2)
                 st.download_button(
                     label="Download Favorites JSON",
                     data=favorites_data,
@@ -1402,33 +1708,61 @@ def render_settings():
         
         with col2:
             st.markdown("### Import Data")
-            uploaded_history = st.file_uploader("Import History", type=["json"])
-            if uploaded_history:
+            uploaded_history = st.file_uploader("Import History", type=["ndjson", "jsonl", "gz", "json"])
+            replace_history = st.checkbox("Replace existing history", value=False,
+                                          help="History is shared: this replaces it for every user of this server")
+            if uploaded_history and st.button("Import History"):
+                progress = st.progress(0.0, text="Importing history...")
                 try:
-                    history_data = json.load(uploaded_history)
-                    if st.button("Import History"):
-                        st.session_state.chat_history = history_data
-                        create_notification("✅ History imported successfully!", "success")
-                except:
-                    create_notification("❌ Invalid JSON file", "error")
+                    stats = import_history(
+                        get_history_store(), uploaded_history, replace=replace_history,
+                        total_bytes=uploaded_history.size,
+                        on_progress=lambda done, total: progress.progress(min(done / total, 1.0) if total else 1.0)
+                    )
+                except (OSError, EOFError, ValueError) as e:
+                    create_notification(f"❌ Could not read archive: {str(e)}", "error")
+                else:
+                    create_notification(
+                        f"✅ Imported {stats.imported} analyses "
+                        f"({stats.duplicates} duplicates, {stats.invalid} invalid records skipped)", "success"
+                    )
+                    if stats.errors:
+                        with st.expander("Skipped records"):
+                            st.code("\n".join(stats.errors))
+                finally:
+                    progress.empty()
+                    refresh_history_indexes()
     
     # Data Management
     with st.expander("🗑️ Data Management", expanded=False):
-        st.warning("⚠️ These actions will clear your data and cannot be undone.")
+        st.warning("⚠️ These actions will clear your data and cannot be undone. "
+                   "History and the response cache are shared by every session of this server.")
+        confirm_shared = st.checkbox("I understand that clearing history affects every user of this server")
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            if st.button("Clear History", type="secondary"):
-                st.session_state.chat_history = []
+            if st.button("Clear History", type="secondary", disabled=not confirm_shared):
+                get_history_store().clear()
+                refresh_history_indexes()
                 create_notification("✅ History cleared!", "success")
         
         with col2:
             if st.button("Clear Favorites", type="secondary"):
-                st.session_state.favorite_codes = []
+                st.session_state.blob_refs.release_many(st.session_state.favorite_codes)
+                st.session_state.favorite_codes = {}
                 create_notification("✅ Favorites cleared!", "success")
         
         with col3:
-            if st.button("Reset All Data", type="primary"):
+            if st.button("Clear Response Cache", type="secondary"):
+                get_response_cache().clear()
+                create_notification("✅ Response cache cleared!", "success")
+        
+        with col4:
+            if st.button("Reset All Data", type="primary", disabled=not confirm_shared,
+                         help="Clears the shared history as well as this session's favorites and settings"):
+                get_history_store().clear()
+                refresh_history_indexes()
+                st.session_state.blob_refs.release_all()
                 for key in list(st.session_state.keys()):
                     del st.session_state[key]
                 initialize_session_state()
@@ -1444,19 +1778,18 @@ def render_settings():
             st.metric("Total Requests", st.session_state.api_usage["total_requests"])
         with col2:
             st.metric("Total Tokens", f"{st.session_state.api_usage['total_tokens']:,}")
+            st.caption(f"{st.session_state.api_usage['input_tokens']:,} in / {st.session_state.api_usage['output_tokens']:,} out")
         with col3:
             st.metric("Total Cost", f"${st.session_state.api_usage['total_cost']:.4f}")
         
         # Cost breakdown by model
-        if st.session_state.chat_history:
+        model_totals = get_history_store().model_token_totals()
+        if model_totals:
             st.markdown("### Cost Breakdown by Model")
-            model_costs = {}
-            for item in st.session_state.chat_history:
-                model = item['model_used']
-                cost = calculate_cost(item['tokens_used'], model)
-                model_costs[model] = model_costs.get(model, 0) + cost
-            
-            for model, cost in model_costs.items():
+            for totals in model_totals:
+                model = totals['model_used']
+                cost = (calculate_cost(totals['input_tokens'], totals['output_tokens'], model)
+                        + calculate_cost(0, totals['legacy_tokens'], model))
                 st.metric(model, f"${cost:.4f}")
     
     st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Headless batch analysis for Code Inspector Pro
+
+Walks a directory tree, maps files to languages by extension and runs
+review/explain/optimize over a bounded worker pool, writing one JSON record
+per (file, action) to a JSON Lines file.
+
+Usage:
+    python batch_inspect.py path/to/repo -o results.jsonl --actions review optimize --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from groq_pool import GroqClientPool
+from inspector_core import CodeAnalysis, Config, build_messages, calculate_cost
+from llm_providers import GroqProvider, LLMProvider, OllamaProvider, needs_api_key, provider_for_model
+from prompt_compaction import compact_for_prompt
+from response_cache import ResponseCache, make_cache_key
+from rate_limiter import get_rate_limiter, open_with_limit
+from retry_policy import RetryPolicy, RetryStats, call_with_retry
+from token_accounting import count_message_tokens, measure_usage
+
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", "venv", ".venv", "build", "dist", "target"}
+
+def extension_map() -> Dict[str, str]:
+    """Map file extensions to language keys from Config.LANGUAGES"""
+    return {
+        ext: lang_key
+        for lang_key, lang_info in Config.LANGUAGES.items()
+        for ext in lang_info["extensions"]
+    }
+
+def discover_files(root: Path, max_bytes: int) -> Iterator[Tuple[Path, str]]:
+    """Yield (path, language) for every supported source file under root"""
+    extensions = extension_map()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            language = extensions.get(path.suffix.lower())
+            if language is None:
+                continue
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            if 0 < size <= max_bytes:
+                yield path, language
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+def load_completed(output: Path) -> Set[Tuple[str, str, str]]:
+    """Collect (path, action, code_hash) triples that already succeeded in a previous run"""
+    completed = set()
+    if not output.exists():
+        return completed
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Truncated final line from an interrupted run
+            if "error" not in record:
+                completed.add((record["path"], record["action"], record["code_hash"]))
+    return completed
+
+def analyze_file(provider: LLMProvider, cache: Optional[ResponseCache], relative: str, language: str,
+                 action: str, code: str, model: str, temperature: float, max_tokens: int) -> Dict:
+    """Analyze one file for one action and return its JSON record (runs on a worker thread)"""
+    start_time = time.time()
+    record = {"path": relative, "action": action, "language": language, "code_hash": code_hash(code)}
+    cache_key = make_cache_key(action, language, model, temperature, max_tokens, code)
+    entry = cache.get(cache_key) if cache is not None else None
+    retry_stats = RetryStats()
+    tokens_saved = 0
+    queue_wait = None
+
+    try:
+        if entry is not None:
+            response = entry["response"]
+            input_tokens, output_tokens = entry.get("input_tokens") or 0, entry.get("output_tokens") or 0
+            token_source = entry.get("token_source", "tokenizer")
+        else:
+            compacted = compact_for_prompt(action, code, language)
+            tokens_saved = compacted.tokens_saved()
+            messages = build_messages(action, compacted.text, language)
+            limiter = get_rate_limiter()
+            request_start = time.time()
+            permit, (raw_response, api_usage) = call_with_retry(
+                lambda: open_with_limit(
+                    limiter, model, count_message_tokens(messages) + max_tokens,
+                    lambda: provider.complete(messages, model, temperature, max_tokens)
+                ),
+                RetryPolicy(**Config.RETRY),
+                retry_stats
+            )
+            record["request_time"] = time.time() - request_start
+            record["rate_limit_wait"] = queue_wait = permit.wait_time
+            usage = None
+            try:
+                usage = measure_usage(messages, raw_response, api_usage)
+                response = compacted.remap_response(raw_response)
+            finally:
+                # The slot goes back even if post-processing fails, so later jobs are not starved
+                limiter.release(permit, actual_tokens=usage.total_tokens if usage is not None else None,
+                                succeeded=usage is not None)
+            input_tokens, output_tokens, token_source = usage.input_tokens, usage.output_tokens, usage.source
+            if cache is not None and response:
+                cache.put(cache_key, {
+                    "response": response,
+                    "tokens_used": usage.total_tokens,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "token_source": token_source
+                })
+    except Exception as e:
+        record.update(error=str(e), execution_time=time.time() - start_time)
+        return record
+
+    analysis = CodeAnalysis(
+        action=action,
+        language=language,
+        code=code,
+        response=response,
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        execution_time=time.time() - start_time,
+        model_used=model,
+        tokens_used=input_tokens + output_tokens,
+        cached=entry is not None,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        token_source=token_source,
+        retry_count=retry_stats.retries,
+        backoff_time=retry_stats.backoff_time,
+        prompt_tokens_saved=tokens_saved,
+        queue_wait=queue_wait
+    )
+    record.update(asdict(analysis))
+    return record
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze a directory tree with Code Inspector Pro")
+    parser.add_argument("root", type=Path, help="Directory to analyze")
+    parser.add_argument("-o", "--output", type=Path, default=Path("code_inspector_results.jsonl"),
+                        help="JSON Lines file to write (appended to when resuming)")
+    parser.add_argument("--actions", nargs="+", choices=["review", "explain", "optimize"], default=["review"])
+    parser.add_argument("--model", choices=list(Config.MODELS.keys()), default="llama-3.3-70b-versatile")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--max-bytes", type=int, default=200_000, help="Skip files larger than this")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY", ""),
+                        help="Groq API key (defaults to GROQ_API_KEY)")
+    parser.add_argument("--no-resume", action="store_true", help="Re-analyze files already in the output")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the shared response cache")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.root.is_dir():
+        print(f"❌ Not a directory: {args.root}", file=sys.stderr)
+        return 2
+    if needs_api_key(args.model) and not args.api_key:
+        print("❌ Please provide a Groq API key (--api-key or GROQ_API_KEY)", file=sys.stderr)
+        return 2
+
+    pool = GroqClientPool(**dict(Config.GROQ_POOL, max_connections=max(args.workers, Config.GROQ_POOL["max_connections"])))
+    if provider_for_model(args.model) == OllamaProvider.name:
+        provider: LLMProvider = OllamaProvider(**Config.OLLAMA)
+    else:
+        provider = GroqProvider(pool.get(args.api_key))
+    cache = None if args.no_cache else ResponseCache(max_entries=Config.RESPONSE_CACHE["max_entries"],
+                                                     max_age=Config.RESPONSE_CACHE["max_age"])
+    completed = set() if args.no_resume else load_completed(args.output)
+
+    jobs = []
+    skipped = 0
+    for path, language in discover_files(args.root, args.max_bytes):
+        relative = path.relative_to(args.root).as_posix()
+        try:
+            code = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        for action in args.actions:
+            if (relative, action, code_hash(code)) in completed:
+                skipped += 1
+            else:
+                jobs.append((relative, language, action, code))
+
+    print(f"🔍 {len(jobs)} analyses queued ({skipped} already done) with {args.workers} workers", file=sys.stderr)
+
+    start_time = time.time()
+    files_done, errors, total_tokens, cached_tokens, total_cost = 0, 0, 0, 0, 0.0
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(analyze_file, provider, cache, relative, language, action, code,
+                            args.model, args.temperature, args.max_tokens)
+            for relative, language, action, code in jobs
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            files_done += 1
+            if "error" in record:
+                errors += 1
+                status = f"❌ {record['error']}"
+            else:
+                if record["cached"]:
+                    cached_tokens += record["tokens_used"]
+                else:
+                    total_tokens += record["tokens_used"]
+                    total_cost += calculate_cost(record["input_tokens"], record["output_tokens"], record["model_used"])
+                status = f"✅ {record['execution_time']:.2f}s, {record['tokens_used']:,} tokens"
+            print(f"[{files_done}/{len(jobs)}] {record['action']:<8} {record['path']} {status}", file=sys.stderr)
+
+    provider.close()
+    pool.close()
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(
+        f"\n📊 {files_done} analyses in {elapsed:.1f}s | {files_done / elapsed:.2f} analyses/s | "
+        f"{total_tokens / elapsed:,.0f} tokens/s | {total_tokens:,} tokens"
+        + (f" (+{cached_tokens:,} from cache)" if cached_tokens else "")
+        + f" | ${total_cost:.4f} | {errors} errors",
+        file=sys.stderr
+    )
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Content-addressed blob store for code snippets
+
+Snippets are interned by their SHA-256 digest so every session, favorite
+and history entry that refers to the same code shares one copy of the
+text. Callers keep only the digest and resolve it when the code is
+actually displayed or re-analyzed.
+
+Blobs are reference counted: each ``put`` takes a reference and each
+``release`` drops one, and a blob is freed with its last reference. A
+``BlobRefs`` tracks the references of one owner, such as a session, and
+releases whatever is left when the owner is garbage collected, so a
+long-running server does not keep the snippets of sessions that are gone.
+"""
+
+import hashlib
+import threading
+import weakref
+from typing import Dict, Iterable, Optional
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest identifying a snippet"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class BlobStore:
+    """Thread-safe, process-wide interned storage of snippet text by content hash"""
+
+    def __init__(self):
+        self._blobs: Dict[str, str] = {}
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """Store text if it is not already present, take a reference to it and return its hash"""
+        key = content_hash(text)
+        with self._lock:
+            self._blobs.setdefault(key, text)
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key
+
+    def release(self, key: str, count: int = 1):
+        """Drop references to a blob, freeing it when none are left"""
+        with self._lock:
+            remaining = self._refs.get(key, 0) - count
+            if remaining > 0:
+                self._refs[key] = remaining
+            else:
+                self._refs.pop(key, None)
+                self._blobs.pop(key, None)
+
+    def release_counts(self, counts: Dict[str, int]):
+        for key, count in list(counts.items()):
+            self.release(key, count)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._blobs.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._blobs
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"blobs": len(self._blobs), "bytes": sum(len(text) for text in self._blobs.values())}
+
+class BlobRefs:
+    """References one owner holds on a BlobStore, released together when the owner drops this object"""
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self._counts: Dict[str, int] = {}
+        # Holds the counts dict, not self, so collecting this object triggers the release
+        self._finalizer = weakref.finalize(self, store.release_counts, self._counts)
+
+    def put(self, text: str) -> str:
+        key = self.store.put(text)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def release(self, key: str):
+        count = self._counts.get(key, 0)
+        if not count:
+            return
+        if count == 1:
+            del self._counts[key]
+        else:
+            self._counts[key] = count - 1
+        self.store.release(key)
+
+    def release_many(self, keys: Iterable[str]):
+        for key in keys:
+            self.release(key)
+
+    def release_all(self):
+        self.store.release_counts(self._counts)
+        self._counts.clear()
@@ -0,0 +1,93 @@
+"""
+Long-lived Groq client pool for Code Inspector Pro
+
+Building a ``Groq`` client per request pays for HTTP client setup, DNS, TLS
+and connection establishment every time. The pool keeps one client per API
+key, each backed by a keep-alive ``httpx.Client``, and evicts clients that
+sit idle or exceed the pool size. Eviction only drops the pool's reference:
+a session may still be streaming on the client, so its connections are
+closed once the last user lets go of it and it is garbage collected.
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import httpx
+from groq import Groq
+
+class GroqClientPool:
+    """Process-wide pool of Groq clients keyed by API key"""
+
+    def __init__(self, max_clients: int = 16, idle_timeout: float = 600.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 120.0, timeout: float = 60.0,
+                 base_url: Optional[str] = None):
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=10.0)
+        self._clients: "OrderedDict[str, Tuple[Groq, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def _create(self, api_key: str) -> Groq:
+        http_client = httpx.Client(limits=self._limits, timeout=self._timeout)
+        # Retries are owned by open_with_limit (429s) and call_with_retry (other transient errors)
+        kwargs = {"api_key": api_key, "http_client": http_client, "max_retries": 0}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        client = Groq(**kwargs)
+        # Holds the httpx client, not the Groq one, so the Groq client can still be collected
+        weakref.finalize(client, self._close, http_client)
+        return client
+
+    @staticmethod
+    def _close(client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def _evict(self, now: float):
+        """Forget idle clients and trim the pool to its maximum size; closing waits until they are unused"""
+        for key, (client, last_used) in list(self._clients.items()):
+            if now - last_used > self.idle_timeout:
+                del self._clients[key]
+        while len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+
+    def get(self, api_key: str) -> Groq:
+        """Return a warm client for the API key, creating one if needed"""
+        key = self._key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._clients.get(key)
+            client = entry[0] if entry else self._create(api_key)
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            self._evict(now)
+            return client
+
+    def close(self):
+        """Close every pooled client, at shutdown when no request is running"""
+        with self._lock:
+            for client, _ in self._clients.values():
+                self._close(client)
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Streaming history export and import for Code Inspector Pro
+
+Archives are newline-delimited JSON, one ``CodeAnalysis`` record per line,
+optionally gzip-compressed. Export reads the history store in batches and
+import parses one line at a time, so memory stays flat regardless of the
+archive size. Imported records are validated against ``CodeAnalysis`` and
+skipped when they already exist in the store or earlier in the archive.
+They are staged in a temporary table and only published (replacing the
+history if asked) once the whole archive has been read, so a failed
+import leaves the history as it was. Legacy JSON array exports are still
+accepted.
+
+Usage:
+    python history_io.py export history.ndjson.gz
+    python history_io.py import history.ndjson.gz [--replace]
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import sys
+from dataclasses import dataclass, field, fields
+from itertools import chain
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Set, Tuple
+
+from history_store import DEFAULT_HISTORY_PATH, HistoryStore
+from inspector_core import CodeAnalysis, Config
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+@dataclass
+class ImportStats:
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)  # First few validation errors, for display
+
+    MAX_ERRORS = 10
+
+    def add_error(self, line_number: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"line {line_number}: {message}")
+
+def _accepts(field_type: Any, value: Any) -> bool:
+    """Check a JSON value against a CodeAnalysis field annotation"""
+    if value is None:
+        return "Optional" in str(field_type) or "None" in str(field_type)
+    if field_type is float or "float" in str(field_type):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if field_type is bool:
+        return isinstance(value, bool) or value in (0, 1)
+    if field_type is int or "int" in str(field_type):
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, str)
+
+def validate_record(raw: Any) -> CodeAnalysis:
+    """Build a CodeAnalysis from a decoded record, raising ValueError if it does not fit"""
+    if not isinstance(raw, dict):
+        raise ValueError("record is not an object")
+    values = {}
+    for f in fields(CodeAnalysis):
+        if f.name not in raw:
+            if f.default is f.default_factory:  # Both MISSING: the field is required
+                raise ValueError(f"missing field '{f.name}'")
+            continue
+        value = raw[f.name]
+        if not _accepts(f.type, value):
+            raise ValueError(f"invalid value for '{f.name}': {value!r:.40}")
+        if f.type is float and value is not None:
+            value = float(value)
+        elif f.type is bool:
+            value = bool(value)
+        values[f.name] = value
+    # The History page looks every language up in Config.LANGUAGES
+    language = values["language"].strip().lower()
+    if language not in Config.LANGUAGES:
+        raise ValueError(f"unknown language {values['language']!r:.40}")
+    values["language"] = language
+    return CodeAnalysis(**values)
+
+def record_fingerprint(analysis: CodeAnalysis) -> bytes:
+    """Digest identifying an analysis by what was asked, when, and what came back"""
+    digest = hashlib.sha256()
+    for part in (analysis.timestamp, analysis.action, analysis.language, analysis.model_used,
+                 analysis.code, analysis.response):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+# Export
+def export_lines(store: HistoryStore, batch_size: int = 500) -> Iterator[bytes]:
+    """Yield each stored analysis as one encoded NDJSON line, oldest first"""
+    names = [f.name for f in fields(CodeAnalysis)]
+    for item in store.iter_all(batch_size):
+        record = {name: item.get(name) for name in names}
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+def export_history(store: HistoryStore, out: BinaryIO, compress: bool = False,
+                   on_progress: Optional[ProgressCallback] = None) -> int:
+    """Write the whole history to out as (gzipped) NDJSON and return the record count"""
+    total = store.count()
+    target = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    written = 0
+    try:
+        for line in export_lines(store):
+            target.write(line)
+            written += 1
+            if on_progress is not None and written % 500 == 0:
+                on_progress(written, total)
+    finally:
+        if compress:
+            target.close()  # Writes the gzip trailer; leaves out open
+    if on_progress is not None:
+        on_progress(written, total)
+    return written
+
+# Import
+def _text_stream(source: BinaryIO) -> io.TextIOWrapper:
+    """Decode source as UTF-8 text, transparently gunzipping it"""
+    magic = source.read(2)
+    source.seek(0)
+    if magic == GZIP_MAGIC:
+        source = gzip.GzipFile(fileobj=source, mode="rb")
+    return io.TextIOWrapper(source, encoding="utf-8")
+
+def iter_records(source: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """Yield (line_number, decoded record or exception) from an NDJSON or legacy JSON archive"""
+    text = _text_stream(source)
+    try:
+        first = text.readline()
+        while first and not first.strip():
+            first = text.readline()
+        if first.lstrip().startswith("["):
+            # Legacy indented JSON array export: has to be loaded whole
+            records = json.loads(first + text.read())
+            for index, raw in enumerate(records if isinstance(records, list) else [], start=1):
+                yield index, raw
+            return
+        for line_number, line in enumerate(chain([first], text), start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+    finally:
+        # Keep source open for the caller (and for progress reporting via tell())
+        text.detach()
+
+def import_history(store: HistoryStore, source: BinaryIO, replace: bool = False, batch_size: int = 500,
+                   total_bytes: Optional[int] = None,
+                   on_progress: Optional[ProgressCallback] = None) -> ImportStats:
+    """Validate, deduplicate and stage every record from source, then publish them in one transaction
+
+    With replace, the existing history is cleared in that same transaction. An
+    archive with no valid records raises ValueError instead of wiping the history.
+    """
+    stats = ImportStats()
+    seen: Set[bytes] = set()
+    batch: List[CodeAnalysis] = []
+    staging = store.create_staging()
+
+    def flush():
+        stats.imported += store.add_many(batch, table=staging)
+        batch.clear()
+        if on_progress is not None:
+            on_progress(source.tell(), total_bytes)
+
+    try:
+        for line_number, raw in iter_records(source):
+            if isinstance(raw, Exception):
+                stats.add_error(line_number, f"invalid JSON ({raw})")
+                continue
+            try:
+                analysis = validate_record(raw)
+            except ValueError as e:
+                stats.add_error(line_number, str(e))
+                continue
+            fingerprint = record_fingerprint(analysis)
+            if fingerprint in seen or (not replace and store.contains(analysis)):
+                stats.duplicates += 1
+                continue
+            seen.add(fingerprint)
+            batch.append(analysis)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        if replace and not stats.imported and stats.invalid:
+            raise ValueError(f"no valid records ({stats.invalid} invalid); the history was left unchanged")
+        store.publish_staging(staging, replace=replace)
+    finally:
+        store.drop_staging(staging)
+    return stats
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export or import Code Inspector history as NDJSON")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", type=Path, help="Archive path; a .gz suffix enables gzip")
+    parser.add_argument("--db", type=Path, default=DEFAULT_HISTORY_PATH, help="History database")
+    parser.add_argument("--replace", action="store_true", help="Replace the history with the archive once it has been read")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    store = HistoryStore(args.db)
+
+    def report(done: int, total: Optional[int]):
+        unit = "records" if args.command == "export" else "bytes"
+        print(f"\r{done:,}/{total:,} {unit}" if total else f"\r{done:,} {unit}", end="", file=sys.stderr)
+
+    try:
+        if args.command == "export":
+            with open(args.path, "wb") as out:
+                count = export_history(store, out, compress=str(args.path).endswith(".gz"), on_progress=report)
+            print(f"\n📤 Exported {count} analyses to {args.path}", file=sys.stderr)
+            return 0
+        if not args.path.is_file():
+            print(f"❌ Not a file: {args.path}", file=sys.stderr)
+            return 2
+        with open(args.path, "rb") as source:
+            stats = import_history(store, source, replace=args.replace,
+                                   total_bytes=args.path.stat().st_size, on_progress=report)
+        print(f"\n📥 Imported {stats.imported} analyses "
+              f"({stats.duplicates} duplicates, {stats.invalid} invalid)", file=sys.stderr)
+        for error in stats.errors:
+            print(f"   ⚠️ {error}", file=sys.stderr)
+        return 0
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""
+SQLite-backed analysis history for Code Inspector Pro
+
+Rows follow the ``CodeAnalysis`` dataclass: one column per field, added
+automatically when the dataclass grows. The database runs in WAL mode so
+readers never block the writer, and the filter columns (language, action,
+model, timestamp) are indexed so history pages are cheap regardless of how
+many analyses are stored.
+
+Code and responses are also indexed in an FTS5 table kept in sync by
+triggers, giving ranked prefix and phrase search. Builds of SQLite without
+FTS5 fall back to ``LIKE`` scans.
+"""
+
+import itertools
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from inspector_core import CodeAnalysis
+from response_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_HISTORY_PATH = DEFAULT_CACHE_DIR / "history.db"
+
+INDEXED_COLUMNS = ["language", "action", "model_used", "timestamp"]
+
+# bm25 column weights: matches in code rank above matches in the response
+FTS_WEIGHTS = (2.0, 1.0)
+
+_SEARCH_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+def build_fts_query(search: str) -> Optional[str]:
+    """Translate search box text into an FTS5 query: "quoted phrases" match exactly, bare words by prefix"""
+    parts = []
+    for phrase, word in _SEARCH_TERM_PATTERN.findall(search):
+        if phrase.strip():
+            parts.append('"' + phrase.strip().replace('"', '""') + '"')
+        else:
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                # Prefix match so results update while typing
+                parts.append(f'"{word}"*')
+    return " ".join(parts) or None
+
+def _column_type(field_type: Any) -> str:
+    text = str(field_type)
+    if field_type is bool or "bool" in text:
+        return "INTEGER"
+    if field_type is int or "int" in text:
+        return "INTEGER"
+    if field_type is float or "float" in text:
+        return "REAL"
+    return "TEXT"
+
+ANALYSIS_COLUMNS: List[Tuple[str, str]] = [(f.name, _column_type(f.type)) for f in fields(CodeAnalysis)]
+BOOL_COLUMNS = {f.name for f in fields(CodeAnalysis) if f.type is bool}
+
+# Page listings leave the large text columns out; bodies are fetched with get() when opened
+SUMMARY_COLUMNS = ", ".join(
+    ["a.id"] + [f"a.{name}" for name, _ in ANALYSIS_COLUMNS if name not in ("code", "response")]
+    + ["LENGTH(a.code) AS code_length", "LENGTH(a.response) AS response_length"]
+)
+
+class HistoryStore:
+    """Persistent, paginated store of CodeAnalysis rows"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._staging_ids = itertools.count(1)
+        self.fts_enabled = False
+        self._migrate()
+
+    def _migrate(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS analyses (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(analyses)")}
+            for name, column_type in ANALYSIS_COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE analyses ADD COLUMN {name} {column_type}")
+            for name in INDEXED_COLUMNS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_analyses_{name} ON analyses ({name}, id)")
+            # Near-duplicate signatures (see similarity_index), removed together with their analysis
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS analysis_signatures (id INTEGER PRIMARY KEY, signature BLOB NOT NULL);
+                CREATE TRIGGER IF NOT EXISTS analyses_signature_delete AFTER DELETE ON analyses BEGIN
+                    DELETE FROM analysis_signatures WHERE id = old.id;
+                END;
+            """)
+            self._migrate_fts()
+
+    def _migrate_fts(self):
+        """Create the full-text index and its sync triggers, indexing existing rows once"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analyses_fts'"
+        ).fetchone()
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5("
+                "code, response, content='analyses', content_rowid='id', "
+                "tokenize=\"unicode61 tokenchars '_'\", prefix='2 3')"
+            )
+        except sqlite3.OperationalError:
+            return  # SQLite compiled without FTS5
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS analyses_fts_insert AFTER INSERT ON analyses BEGIN
+                INSERT INTO analyses_fts(rowid, code, response) VALUES (new.id, new.code, new.response);
+            END;
+            CREATE TRIGGER IF NOT EXISTS analyses_fts_delete AFTER DELETE ON analyses BEGIN
+                INSERT INTO analyses_fts(analyses_fts, rowid, code, response)
+                VALUES ('delete', old.id, old.code, old.response);
+            END;
+            CREATE TRIGGER IF NOT EXISTS analyses_fts_update AFTER UPDATE OF code, response ON analyses BEGIN
+                INSERT INTO analyses_fts(analyses_fts, rowid, code, response)
+                VALUES ('delete', old.id, old.code, old.response);
+                INSERT INTO analyses_fts(rowid, code, response) VALUES (new.id, new.code, new.response);
+            END;
+        """)
+        if not exists:
+            self._conn.execute("INSERT INTO analyses_fts(analyses_fts) VALUES ('rebuild')")
+        # Persist the ranking function so queries can ORDER BY rank
+        self._conn.execute(
+            "INSERT INTO analyses_fts(analyses_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]})",)
+        )
+        self.fts_enabled = True
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        item = dict(row)
+        for name in BOOL_COLUMNS:
+            if name in item and item[name] is not None:
+                item[name] = bool(item[name])
+        return item
+
+    def _select(self, columns: str, language: Optional[str] = None, action: Optional[str] = None,
+                model: Optional[str] = None, search: Optional[str] = None) -> Tuple[str, List, bool]:
+        """Build a SELECT over analyses (aliased a) with filters; returns (sql, params, ranked)"""
+        clauses, params = [], []
+        for column, value in (("language", language), ("action", action), ("model_used", model)):
+            if value is not None:
+                clauses.append(f"a.{column} = ?")
+                params.append(value)
+        fts_query = build_fts_query(search) if search and self.fts_enabled else None
+        if fts_query:
+            clauses.insert(0, "analyses_fts MATCH ?")
+            params.insert(0, fts_query)
+            source = "analyses_fts JOIN analyses a ON a.id = analyses_fts.rowid"
+        else:
+            source = "analyses a"
+        if search and not fts_query:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(a.code LIKE ? ESCAPE '\\' OR a.response LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return f"SELECT {columns} FROM {source}{where}", params, bool(fts_query)
+
+    def add(self, analysis: Union[CodeAnalysis, Dict], table: str = "analyses") -> int:
+        """Insert an analysis and return its row id"""
+        record = asdict(analysis) if isinstance(analysis, CodeAnalysis) else analysis
+        names = [name for name, _ in ANALYSIS_COLUMNS]
+        placeholders = ", ".join("?" for _ in names)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT INTO {table} ({', '.join(names)}) VALUES ({placeholders})",
+                [record.get(name) for name in names],
+            )
+            return cursor.lastrowid
+
+    def add_many(self, analyses: Iterable[Union[CodeAnalysis, Dict]], table: str = "analyses") -> int:
+        """Insert many analyses in one transaction and return how many were added"""
+        count = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for analysis in analyses:
+                    self.add(analysis, table)
+                    count += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def create_staging(self) -> str:
+        """Create an empty temporary table shaped like the history and return its name
+
+        Imports fill it with add_many(..., table=name) and then publish it in one
+        transaction, so a failed import never leaves the history half written.
+        """
+        name = f"temp.analyses_staging_{next(self._staging_ids)}"
+        with self._lock:
+            self._conn.execute(f"CREATE TABLE {name} AS SELECT * FROM analyses WHERE 0")
+        return name
+
+    def publish_staging(self, name: str, replace: bool = False) -> int:
+        """Move staged rows into the history atomically, first clearing it if replace, and drop the staging table"""
+        columns = ", ".join(column for column, _ in ANALYSIS_COLUMNS)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if replace:
+                    self._conn.execute("DELETE FROM analyses")
+                cursor = self._conn.execute(
+                    f"INSERT INTO analyses ({columns}) SELECT {columns} FROM {name} ORDER BY rowid"
+                )
+                self._conn.execute(f"DROP TABLE {name}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def drop_staging(self, name: str):
+        with self._lock:
+            self._conn.execute(f"DROP TABLE IF EXISTS {name}")
+
+    def get(self, analysis_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def contains(self, analysis: Union[CodeAnalysis, Dict]) -> bool:
+        """True if an analysis with the same timestamp, action, model, code and response is stored"""
+        record = asdict(analysis) if isinstance(analysis, CodeAnalysis) else analysis
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM analyses WHERE timestamp = ? AND action = ? AND language = ? AND model_used = ? "
+                "AND code = ? AND response = ? LIMIT 1",
+                (record["timestamp"], record["action"], record["language"], record["model_used"],
+                 record["code"], record["response"])
+            ).fetchone()
+        return row is not None
+
+    def query(self, language: Optional[str] = None, action: Optional[str] = None, model: Optional[str] = None,
+              search: Optional[str] = None, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Page of analyses matching the filters, best match first when searching, else newest first"""
+        sql, params, ranked = self._select("a.*", language, action, model, search)
+        order = "analyses_fts.rank, a.id DESC" if ranked else "a.id DESC"
+        with self._lock:
+            rows = self._conn.execute(f"{sql} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def page(self, language: Optional[str] = None, action: Optional[str] = None, model: Optional[str] = None,
+             search: Optional[str] = None, cursor: Optional[str] = None,
+             limit: int = 20) -> Tuple[List[Dict], Optional[str]]:
+        """One page of analysis summaries (no code/response) and the cursor for the next page"""
+        # Unranked listings use keyset pagination on id so every page costs the same;
+        # ranked search results carry their offset in the cursor instead
+        sql, params, ranked = self._select(SUMMARY_COLUMNS, language, action, model, search)
+        if ranked:
+            offset = int(cursor[4:]) if cursor and cursor.startswith("off:") else 0
+            sql += " ORDER BY analyses_fts.rank, a.id DESC LIMIT ? OFFSET ?"
+            params += [limit + 1, offset]
+            next_cursor = f"off:{offset + limit}"
+        else:
+            if cursor and cursor.startswith("id:"):
+                sql += (" AND" if " WHERE " in sql else " WHERE") + " a.id < ?"
+                params.append(int(cursor[3:]))
+            sql += " ORDER BY a.id DESC LIMIT ?"
+            params.append(limit + 1)
+            next_cursor = None
+        with self._lock:
+            rows = [self._row_to_dict(row) for row in self._conn.execute(sql, params).fetchall()]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, next_cursor or f"id:{rows[-1]['id']}"
+
+    def count(self, language: Optional[str] = None, action: Optional[str] = None,
+              model: Optional[str] = None, search: Optional[str] = None) -> int:
+        sql, params, _ = self._select("COUNT(*)", language, action, model, search)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def iter_all(self, batch_size: int = 500) -> Iterable[Dict]:
+        """Yield every analysis oldest-first without loading the table into memory"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM analyses WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_dict(row)
+            last_id = rows[-1]["id"]
+
+    def iter_summaries(self, batch_size: int = 2000) -> Iterable[Dict]:
+        """Yield every analysis summary (no code/response) oldest-first"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {SUMMARY_COLUMNS} FROM analyses a WHERE a.id > ? ORDER BY a.id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_dict(row)
+            last_id = rows[-1]["id"]
+
+    def group_counts(self, column: str) -> Dict[str, int]:
+        """Number of analyses per value of an indexed column"""
+        if column not in INDEXED_COLUMNS:
+            raise ValueError(f"Cannot group by {column}")
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {column}, COUNT(*) FROM analyses GROUP BY {column}").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def model_token_totals(self) -> List[Dict]:
+        """Summed token counts per model for non-cached analyses; legacy_tokens lack an input/output split"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model_used, SUM(COALESCE(input_tokens, 0)) AS input_tokens, "
+                "SUM(COALESCE(output_tokens, 0)) AS output_tokens, "
+                "SUM(CASE WHEN input_tokens IS NULL OR output_tokens IS NULL "
+                "THEN COALESCE(tokens_used, 0) ELSE 0 END) AS legacy_tokens "
+                "FROM analyses WHERE COALESCE(cached, 0) = 0 GROUP BY model_used"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_signature(self, analysis_id: int, signature: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_signatures (id, signature) VALUES (?, ?)", (analysis_id, signature)
+            )
+
+    def iter_signatures(self, batch_size: int = 5000) -> Iterable[Dict]:
+        """Yield id, language, action and signature of every signed analysis"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT s.id, a.language, a.action, s.signature FROM analysis_signatures s "
+                    "JOIN analyses a ON a.id = s.id WHERE s.id > ? ORDER BY s.id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+    def iter_unsigned(self, batch_size: int = 500) -> Iterable[Dict]:
+        """Yield id, language, action and code of answered, non-cached analyses without a signature"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT a.id, a.language, a.action, a.code FROM analyses a "
+                    "LEFT JOIN analysis_signatures s ON s.id = a.id "
+                    "WHERE s.id IS NULL AND a.id > ? AND COALESCE(a.cached, 0) = 0 AND a.response != '' "
+                    "ORDER BY a.id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+    def delete(self, analysis_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses WHERE id = ?", (analysis_id,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
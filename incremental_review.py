@@ -0,0 +1,93 @@
+"""
+Diff-based incremental re-review for Code Inspector Pro
+
+When a snippet is a revision of one reviewed recently, only the changed
+hunks are sent, together with a condensed copy of the previous findings,
+and the model returns an updated review of the whole snippet. Prompt size
+then follows the size of the edit instead of the size of the file.
+"""
+
+import difflib
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from inspector_core import Config, get_system_prompt
+from token_accounting import count_tokens
+
+_CODE_BLOCK_PATTERN = re.compile(r"```.*?```", re.DOTALL)
+
+@dataclass
+class RevisionBase:
+    analysis_id: int
+    timestamp: str
+    code: str
+    response: str
+    similarity: float
+
+@dataclass
+class IncrementalPlan:
+    base: RevisionBase
+    messages: List[Dict[str, str]]
+    diff: str
+    added_lines: int
+    removed_lines: int
+
+def find_revision_base(candidates: Iterable[Dict], code: str,
+                       min_similarity: float = Config.INCREMENTAL["min_similarity"]) -> Optional[RevisionBase]:
+    """Most similar earlier analysis of a different version of code, if any is similar enough"""
+    new_lines = code.splitlines()
+    best: Optional[RevisionBase] = None
+    for item in candidates:
+        if not item.get("response") or item["code"] == code:
+            continue
+        matcher = difflib.SequenceMatcher(None, item["code"].splitlines(), new_lines, autojunk=False)
+        # Cheap upper bounds first; the full ratio is only computed for plausible bases
+        if matcher.real_quick_ratio() < min_similarity or matcher.quick_ratio() < min_similarity:
+            continue
+        similarity = matcher.ratio()
+        if similarity >= min_similarity and (best is None or similarity > best.similarity):
+            best = RevisionBase(item["id"], item["timestamp"], item["code"], item["response"], similarity)
+    return best
+
+def unified_hunks(old: str, new: str, context_lines: int = Config.INCREMENTAL["context_lines"]) -> str:
+    """Unified diff of old -> new without file headers"""
+    diff = difflib.unified_diff(old.splitlines(), new.splitlines(), n=context_lines, lineterm="")
+    return "\n".join(line for line in diff if not line.startswith(("---", "+++")))
+
+def condense_findings(response: str, max_chars: int = Config.INCREMENTAL["max_findings_chars"]) -> str:
+    """Previous review without code blocks or blank lines, capped at max_chars"""
+    text = _CODE_BLOCK_PATTERN.sub("[code omitted]", response)
+    text = "\n".join(line.rstrip() for line in text.splitlines() if line.strip())
+    return text if len(text) <= max_chars else text[:max_chars].rsplit("\n", 1)[0] + "\n[...]"
+
+def plan_incremental_review(candidates: Iterable[Dict], prompt_type: str, code: str, language_key: str,
+                            static_findings: Optional[str] = None) -> Optional[IncrementalPlan]:
+    """Build diff-only messages against the closest earlier analysis, or None when a full run is cheaper"""
+    settings = Config.INCREMENTAL
+    if not settings["enabled"] or prompt_type not in settings["actions"]:
+        return None
+    base = find_revision_base(candidates, code)
+    if base is None:
+        return None
+    diff = unified_hunks(base.code, code)
+    if count_tokens(diff) > settings["max_diff_ratio"] * count_tokens(code):
+        return None  # The edit touches most of the file, so a fresh review is as cheap and more reliable
+
+    added = sum(1 for line in diff.splitlines() if line.startswith("+"))
+    removed = sum(1 for line in diff.splitlines() if line.startswith("-"))
+    user_message = (
+        f"You previously did a {prompt_type} of a {language_key} snippet. Your findings were:\n\n"
+        f"{condense_findings(base.response)}\n\n"
+        f"The code has since been edited. Here is the unified diff (the +N numbers in hunk headers are lines of the new code):\n\n"
+        f"```diff\n{diff}\n```\n\n"
+        f"Give an updated {prompt_type} of the whole new code: keep findings that still apply, "
+        f"drop the ones the edit fixed and add any the edit introduced."
+    )
+    if static_findings:
+        user_message += f"\n\nA local static checker reported these findings in the new code:\n{static_findings}"
+    messages = [
+        {"role": "system", "content": get_system_prompt(prompt_type, language_key)},
+        {"role": "user", "content": user_message}
+    ]
+    return IncrementalPlan(base, messages, diff, added, removed)
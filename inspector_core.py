@@ -0,0 +1,264 @@
+"""
+Shared, Streamlit-free core of Code Inspector Pro
+
+Data structures, configuration, prompts and pricing used by the Streamlit
+app as well as the headless batch tools.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Data structures
+@dataclass
+class CodeAnalysis:
+    action: str
+    language: str
+    code: str
+    response: str
+    timestamp: str
+    execution_time: float
+    model_used: str
+    tokens_used: Optional[int] = None
+    cached: bool = False
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    token_source: str = "tokenizer"  # "api" when counts come from the provider's usage block
+    retry_count: int = 0
+    backoff_time: float = 0.0
+    prompt_tokens_saved: int = 0  # Input tokens removed by prompt compaction or incremental re-review
+    base_analysis_id: Optional[int] = None  # History id this was derived from (incremental re-review or near-duplicate reuse)
+    # Request phases in seconds; None for cached, replayed or non-streamed analyses
+    queue_wait: Optional[float] = None  # Waiting on the shared rate limiter
+    connect_time: Optional[float] = None  # Request sent until the response stream opened
+    ttft: Optional[float] = None  # Request sent until the first token
+    stream_time: Optional[float] = None  # First token until the last
+    tokens_per_second: Optional[float] = None
+    chunk_gap_p50: Optional[float] = None  # Inter-chunk gap percentiles
+    chunk_gap_p95: Optional[float] = None
+    chunk_gap_max: Optional[float] = None
+    render_time: Optional[float] = None  # Repainting the result in the UI
+
+@dataclass
+class FavoriteCode:
+    language: str
+    code_hash: str  # Key of the snippet in the shared BlobStore
+    timestamp: str
+    description: str
+    tags: List[str]
+
+# Configuration class
+class Config:
+    LANGUAGES = {
+        "python": {"name": "🐍 Python", "color": "#3572A5", "extensions": [".py"]},
+        "javascript": {"name": "📜 JavaScript", "color": "#f7df1e", "extensions": [".js", ".jsx"]},
+        "java": {"name": "☕ Java", "color": "#b07219", "extensions": [".java"]},
+        "csharp": {"name": "🔷 C#", "color": "#178600", "extensions": [".cs"]},
+        "cpp": {"name": "⚙️ C++", "color": "#f34b7d", "extensions": [".cpp", ".cc", ".cxx"]},
+        "php": {"name": "🐘 PHP", "color": "#4F5D95", "extensions": [".php"]},
+        "ruby": {"name": "💎 Ruby", "color": "#701516", "extensions": [".rb"]},
+        "go": {"name": "🔹 Go", "color": "#00ADD8", "extensions": [".go"]},
+        "rust": {"name": "⚡ Rust", "color": "#dea584", "extensions": [".rs"]},
+        "swift": {"name": "🦅 Swift", "color": "#ffac45", "extensions": [".swift"]},
+        "kotlin": {"name": "🧩 Kotlin", "color": "#A97BFF", "extensions": [".kt"]},
+        "typescript": {"name": "🔷 TypeScript", "color": "#2b7489", "extensions": [".ts", ".tsx"]}
+    }
+    
+    CODE_THEMES = {
+        "Dark": "monokai",
+        "Light": "github",
+        "Solarized": "solarized_dark",
+        "Tomorrow": "tomorrow_night",
+        "Twilight": "twilight",
+        "Dracula": "dracula",
+        "Nord": "nord_dark",
+        "Material": "material",
+        "Oceanic": "oceanic_next"
+    }
+    
+    # rpm/tpm are per-model request and token quotas; adjust them to your Groq plan
+    GROQ_MODELS = {
+        "llama-3.1-8b": {"name": "Llama 3.1 8B", "speed": "Fast", "quality": "Good", "rpm": 30, "tpm": 20000},
+        "llama-3.1-70b": {"name": "Llama 3.1 70B", "speed": "Medium", "quality": "Excellent", "rpm": 30, "tpm": 6000},
+        "llama-3.1-405b": {"name": "Llama 3.1 405B", "speed": "Slow", "quality": "Best", "rpm": 30, "tpm": 6000},
+        "llama-3.2-11b": {"name": "Llama 3.2 11B", "speed": "Fast", "quality": "Very Good", "rpm": 30, "tpm": 7000},
+        "llama-3.2-82b-online": {"name": "Llama 3.2 82B Online", "speed": "Medium", "quality": "Excellent", "rpm": 30, "tpm": 6000},
+        "llama-3.3-8b-versatile": {"name": "Llama 3.3 8B Versatile", "speed": "Fast", "quality": "Good", "rpm": 30, "tpm": 20000},
+        "llama-3.3-70b-versatile": {"name": "Llama 3.3 70B Versatile", "speed": "Medium", "quality": "Excellent", "rpm": 30, "tpm": 6000}
+    }
+    
+    # Models served by a local Ollama daemon; limits are generous since there is no quota, only local hardware
+    OLLAMA_MODELS = {
+        "llama3.2": {"name": "Llama 3.2 3B (local)", "speed": "Local", "quality": "Good", "rpm": 600, "tpm": 1000000, "provider": "ollama"},
+        "qwen2.5-coder": {"name": "Qwen 2.5 Coder 7B (local)", "speed": "Local", "quality": "Very Good", "rpm": 600, "tpm": 1000000, "provider": "ollama"}
+    }
+    
+    MODELS = {**GROQ_MODELS, **OLLAMA_MODELS}
+    
+    OLLAMA = {
+        "host": os.environ.get("OLLAMA_HOST", "http://localhost:11434"),
+        "timeout": 300,  # Seconds; local models can be slow to load and generate
+        "keep_alive": "10m"  # How long the daemon keeps a model loaded after a request
+    }
+    
+    RESPONSE_CACHE = {
+        "max_entries": 256,  # In-memory LRU tier size
+        "max_age": 7 * 24 * 3600  # Seconds before a cached response is re-fetched
+    }
+    
+    GROQ_POOL = {
+        "max_clients": 16,  # Distinct API keys kept warm
+        "idle_timeout": 600,  # Seconds before an unused client is closed
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 120,
+        "base_url": os.environ.get("GROQ_BASE_URL") or None  # e.g. a mock_llm_server.py instance for offline runs
+    }
+    
+    FANOUT = {
+        "min_lines": 80,  # Python files at least this long are split per function/class
+        "max_concurrency": 4  # Units analyzed in parallel
+    }
+    
+    HISTORY = {
+        "page_size": 20,  # Default entries shown per History/Favorites page
+        "page_size_options": [10, 20, 50, 100]
+    }
+    
+    RETRY = {
+        "max_attempts": 4,
+        "base_delay": 0.5,  # Seconds before the first retry, doubled each time (full jitter)
+        "max_delay": 8.0,
+        "deadline": 120.0  # Give up once attempts and backoff exceed this many seconds
+    }
+    
+    STREAMING = {
+        "frame_rate": 10,  # Maximum result repaints per second
+        "flush_bytes": 2048  # Repaint early once this much text is pending
+    }
+    
+    COMPACTION = {
+        "enabled": True,  # Strip comments, blank lines and long docstrings before sending code
+        "keep_comments_for": ["explain"],  # Actions where comments explain intent and are sent as-is
+        "max_docstring_lines": 3
+    }
+    
+    INCREMENTAL = {
+        "enabled": True,  # Re-review only the diff when code is a revision of a recent analysis
+        "actions": ["review"],
+        "candidates": 10,  # Recent analyses of the same language and action considered as the base
+        "min_similarity": 0.6,  # Line-level similarity needed to treat code as a revision
+        "max_diff_ratio": 0.5,  # Fall back to a full run when the diff is larger than this share of the code
+        "context_lines": 3,
+        "max_findings_chars": 4000  # Cap on the previous review carried as context
+    }
+    
+    SIMILARITY = {
+        "enabled": True,
+        "mode": "surface",  # "reuse" replays a near-duplicate's response, "surface" only shows it
+        "threshold": 0.9,  # Estimated Jaccard similarity of normalized token shingles
+        "num_bins": 64,  # MinHash signature length (power of two)
+        "bands": 8,  # LSH bands of num_bins / bands rows each
+        "shingle_size": 4
+    }
+    
+    METRICS = {
+        "enabled": True,  # Serve Prometheus metrics at http://host:port/metrics
+        "host": "127.0.0.1",
+        "port": int(os.environ.get("CODE_INSPECTOR_METRICS_PORT", "9464"))  # Give each app instance its own port
+    }
+    
+    ROUTER = {
+        "latency_target": 10.0,  # Default seconds the user is willing to wait for a whole answer
+        "quality_ranks": ["Good", "Very Good", "Excellent", "Best"],
+        "min_quality": {"review": "Excellent", "optimize": "Excellent", "explain": "Very Good"},
+        "small_snippet_tokens": 300,  # Below this, any "Good" model answers well enough
+        "small_snippet_quality": "Good",
+        "output_ratio": {"review": 0.8, "explain": 1.2, "optimize": 1.0},  # Expected answer tokens per code token
+        "base_output_tokens": 200,
+        # Starting estimates per speed label until a model has been measured
+        "priors": {
+            "Fast": {"ttft": 0.3, "tokens_per_second": 700},
+            "Medium": {"ttft": 0.6, "tokens_per_second": 250},
+            "Slow": {"ttft": 1.5, "tokens_per_second": 80},
+            "Local": {"ttft": 1.0, "tokens_per_second": 30}
+        },
+        "smoothing": 0.2,  # Weight of the newest measurement in the rolling averages
+        "max_error_rate": 0.5,
+        "max_consecutive_failures": 3,
+        "cooldown": 60,  # Seconds a degraded model is skipped before it is tried again
+        "max_fallbacks": 2  # Further models tried when the routed one fails
+    }
+
+# Pricing
+def calculate_cost(input_tokens: int, output_tokens: int, model: str) -> float:
+    """Calculate estimated cost based on input/output tokens and model"""
+    # Groq pricing (approximate), USD per 1M (input, output) tokens
+    pricing = {
+        "llama-3.1-8b": (0.05, 0.08),
+        "llama-3.1-70b": (0.59, 0.79),
+        "llama-3.1-405b": (2.39, 2.39),
+        "llama-3.2-11b": (0.10, 0.10),
+        "llama-3.2-82b-online": (0.59, 0.79),
+        "llama-3.3-8b-versatile": (0.05, 0.08),
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+    }
+    if model in Config.OLLAMA_MODELS:
+        return 0.0  # Local models cost nothing per token
+    input_price, output_price = pricing.get(model, (0.05, 0.08))
+    return (input_tokens * input_price + output_tokens * output_price) / 1000000
+
+# Prompt construction
+def get_system_prompt(prompt_type: str, language_key: str) -> str:
+    """Return the system prompt for an action and language"""
+    # Enhanced system prompts
+    system_prompts = {
+        "review": f"""You are an expert {language_key.upper()} code reviewer with 10+ years of experience.
+Analyze the code for:
+1. **Syntax Errors**: Identify any syntax issues
+2. **Logic Errors**: Find logical problems and edge cases
+3. **Performance Issues**: Suggest optimizations
+4. **Security Vulnerabilities**: Identify potential security risks
+5. **Best Practices**: Recommend improvements for maintainability
+6. **Code Quality**: Assess readability and structure
+
+Format your response with clear sections and use markdown formatting.""",
+        
+        "explain": f"""You are a senior {language_key.upper()} developer explaining code to a junior developer.
+Provide a comprehensive explanation including:
+1. **Overview**: What the code does at a high level
+2. **Line-by-line Analysis**: Explain each important section
+3. **Key Concepts**: Highlight important programming concepts used
+4. **Flow Diagram**: Describe the execution flow
+5. **Common Pitfalls**: What to watch out for
+6. **Learning Resources**: Suggest further reading
+
+Use simple language and provide examples where helpful.""",
+        
+        "optimize": f"""You are a {language_key.upper()} performance optimization expert.
+Analyze the code and provide:
+1. **Performance Analysis**: Identify bottlenecks and inefficiencies
+2. **Optimization Suggestions**: Specific improvements with code examples
+3. **Memory Usage**: Analyze memory consumption patterns
+4. **Time Complexity**: Assess algorithmic efficiency
+5. **Alternative Approaches**: Suggest different solutions
+6. **Benchmarking Tips**: How to measure improvements
+
+Provide before/after code comparisons where relevant."""
+    }
+    
+    return system_prompts.get(prompt_type, system_prompts["review"])
+
+def build_messages(prompt_type: str, code_snippet: str, language_key: str,
+                   static_findings: Optional[str] = None) -> List[Dict[str, str]]:
+    """Build the chat messages for an analysis request, optionally with local checker findings"""
+    user_message = f"Here's the {language_key} code to {prompt_type}:\n\n```{language_key}\n{code_snippet}\n```"
+    if static_findings:
+        user_message += (
+            "\n\nA local static checker already reported these findings. Take them into account "
+            f"and do not repeat them verbatim:\n{static_findings}"
+        )
+    return [
+        {"role": "system", "content": get_system_prompt(prompt_type, language_key)},
+        {"role": "user", "content": user_message}
+    ]
@@ -0,0 +1,331 @@
+"""
+LLM provider layer for Code Inspector Pro
+
+Every backend exposes the same interface. ``stream`` returns a
+``ChatStream`` that yields text deltas, picks up token usage when the
+backend reports it, and can be cancelled: closing it closes the HTTP
+response, so the backend stops generating instead of finishing an answer
+nobody reads. ``complete`` runs a non-streaming request and ``astream`` is
+the asyncio variant used by the analysis engine.
+
+Groq serves the hosted models; Ollama serves local models through its
+HTTP API. The backend is chosen per request from the model key, see
+``provider_for_model``.
+"""
+
+import inspect
+import json
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+from inspector_core import Config
+from token_accounting import TokenUsage, extract_usage
+
+Messages = List[Dict[str, str]]
+Delta = Union[str, TokenUsage]  # Backends yield text deltas and, once known, the usage
+
+class ProviderError(Exception):
+    """Error response from a backend; status_code feeds the retry and rate-limit classifiers"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+class ChatStream:
+    """Text deltas of one streamed completion; usage is set when the backend reports it"""
+
+    def __init__(self, deltas: Iterator[Delta], close: Callable[[], None]):
+        self._deltas = deltas
+        self._close = close
+        self._closed = False
+        self.usage: Optional[TokenUsage] = None
+        self.cancelled = False
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for delta in self._deltas:
+                if isinstance(delta, TokenUsage):
+                    self.usage = delta
+                elif delta:
+                    yield delta
+                if self.cancelled:
+                    return
+        except Exception:
+            if not self.cancelled:
+                raise  # A cancel() from another thread surfaces as a read error on a closed response
+        finally:
+            self.close()
+
+    def __enter__(self) -> "ChatStream":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def cancel(self):
+        """Stop the stream, from any thread"""
+        self.cancelled = True
+        self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            try:
+                self._close()
+            except Exception:
+                pass
+
+class AsyncChatStream:
+    """asyncio counterpart of ChatStream"""
+
+    def __init__(self, deltas: AsyncIterator[Delta], close: Callable[[], Awaitable[None]]):
+        self._deltas = deltas
+        self._close = close
+        self._closed = False
+        self.usage: Optional[TokenUsage] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            async for delta in self._deltas:
+                if isinstance(delta, TokenUsage):
+                    self.usage = delta
+                elif delta:
+                    yield delta
+        finally:
+            await self.aclose()
+
+    async def __aenter__(self) -> "AsyncChatStream":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            try:
+                await self._close()
+            except Exception:
+                pass
+
+class LLMProvider:
+    """Interface shared by every backend"""
+
+    name = "base"
+    requires_api_key = False
+
+    def stream(self, messages: Messages, model: str, temperature: float, max_tokens: int) -> ChatStream:
+        raise NotImplementedError
+
+    async def astream(self, messages: Messages, model: str, temperature: float,
+                      max_tokens: int) -> AsyncChatStream:
+        raise NotImplementedError
+
+    def complete(self, messages: Messages, model: str, temperature: float,
+                 max_tokens: int) -> Tuple[str, Optional[TokenUsage]]:
+        """Whole response and usage of a non-streaming request"""
+        with self.stream(messages, model, temperature, max_tokens) as chat_stream:
+            response = "".join(chat_stream)
+        return response, chat_stream.usage
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+# Groq
+def _close_sdk_stream(stream: Any):
+    close = getattr(stream, "close", None) or getattr(getattr(stream, "response", None), "close", None)
+    if close is not None:
+        close()
+
+async def _aclose_sdk_stream(stream: Any):
+    close = getattr(stream, "close", None) or getattr(getattr(stream, "response", None), "aclose", None)
+    if close is not None:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+def _groq_deltas(chunk: Any) -> Iterator[Delta]:
+    if chunk.choices and chunk.choices[0].delta.content is not None:
+        yield chunk.choices[0].delta.content
+    usage = extract_usage(chunk)
+    if usage is not None:
+        yield usage
+
+class GroqProvider(LLMProvider):
+    """Hosted models through a (pooled) Groq SDK client"""
+
+    name = "groq"
+    requires_api_key = True
+
+    def __init__(self, client: Any = None, async_client: Any = None):
+        self.client = client
+        self.async_client = async_client
+
+    def _request(self, messages: Messages, model: str, temperature: float, max_tokens: int,
+                 stream: bool) -> Dict[str, Any]:
+        return {"messages": messages, "model": model, "temperature": temperature,
+                "max_tokens": max_tokens, "stream": stream}
+
+    def stream(self, messages: Messages, model: str, temperature: float, max_tokens: int) -> ChatStream:
+        response = self.client.chat.completions.create(**self._request(messages, model, temperature, max_tokens, True))
+
+        def deltas() -> Iterator[Delta]:
+            for chunk in response:
+                yield from _groq_deltas(chunk)
+
+        return ChatStream(deltas(), lambda: _close_sdk_stream(response))
+
+    async def astream(self, messages: Messages, model: str, temperature: float,
+                      max_tokens: int) -> AsyncChatStream:
+        response = await self.async_client.chat.completions.create(
+            **self._request(messages, model, temperature, max_tokens, True)
+        )
+
+        async def deltas() -> AsyncIterator[Delta]:
+            async for chunk in response:
+                for delta in _groq_deltas(chunk):
+                    yield delta
+
+        return AsyncChatStream(deltas(), lambda: _aclose_sdk_stream(response))
+
+    def complete(self, messages: Messages, model: str, temperature: float,
+                 max_tokens: int) -> Tuple[str, Optional[TokenUsage]]:
+        completion = self.client.chat.completions.create(**self._request(messages, model, temperature, max_tokens, False))
+        return completion.choices[0].message.content or "", extract_usage(completion)
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.close()
+
+# Ollama
+def _ollama_usage(data: Dict[str, Any]) -> Optional[TokenUsage]:
+    """Usage from a final Ollama message; prompt_eval_count is omitted when the prompt was cached"""
+    if "prompt_eval_count" not in data or "eval_count" not in data:
+        return None
+    return TokenUsage(int(data["prompt_eval_count"]), int(data["eval_count"]), "api")
+
+def _ollama_deltas(line: str) -> Iterator[Delta]:
+    """Deltas of one NDJSON line of an Ollama /api/chat stream"""
+    if not line.strip():
+        return
+    data = json.loads(line)
+    if data.get("error"):
+        raise ProviderError(f"Ollama error: {data['error']}")
+    content = (data.get("message") or {}).get("content")
+    if content:
+        yield content
+    if data.get("done"):
+        usage = _ollama_usage(data)
+        if usage is not None:
+            yield usage
+
+def _ollama_error(response: httpx.Response) -> ProviderError:
+    try:
+        detail = response.json().get("error") or response.text
+    except ValueError:
+        detail = response.text
+    return ProviderError(f"Ollama returned {response.status_code}: {detail}", response.status_code, response)
+
+class OllamaProvider(LLMProvider):
+    """Local models served by an Ollama daemon"""
+
+    name = "ollama"
+
+    def __init__(self, host: str = Config.OLLAMA["host"], timeout: float = Config.OLLAMA["timeout"],
+                 keep_alive: str = Config.OLLAMA["keep_alive"]):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self._timeout = httpx.Timeout(timeout, connect=5.0)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(base_url=self.host, timeout=self._timeout)
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Bound to the event loop that first uses it, so one provider serves one engine run
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.host, timeout=self._timeout)
+        return self._async_client
+
+    def _payload(self, messages: Messages, model: str, temperature: float, max_tokens: int,
+                 stream: bool) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": temperature, "num_predict": max_tokens}
+        }
+
+    def stream(self, messages: Messages, model: str, temperature: float, max_tokens: int) -> ChatStream:
+        request = self.client.build_request("POST", "/api/chat",
+                                            json=self._payload(messages, model, temperature, max_tokens, True))
+        response = self.client.send(request, stream=True)
+        if response.status_code >= 400:
+            response.read()
+            response.close()
+            raise _ollama_error(response)
+
+        def deltas() -> Iterator[Delta]:
+            for line in response.iter_lines():
+                yield from _ollama_deltas(line)
+
+        return ChatStream(deltas(), response.close)
+
+    async def astream(self, messages: Messages, model: str, temperature: float,
+                      max_tokens: int) -> AsyncChatStream:
+        client = self.async_client
+        request = client.build_request("POST", "/api/chat",
+                                       json=self._payload(messages, model, temperature, max_tokens, True))
+        response = await client.send(request, stream=True)
+        if response.status_code >= 400:
+            await response.aread()
+            await response.aclose()
+            raise _ollama_error(response)
+
+        async def deltas() -> AsyncIterator[Delta]:
+            async for line in response.aiter_lines():
+                for delta in _ollama_deltas(line):
+                    yield delta
+
+        return AsyncChatStream(deltas(), response.aclose)
+
+    def complete(self, messages: Messages, model: str, temperature: float,
+                 max_tokens: int) -> Tuple[str, Optional[TokenUsage]]:
+        response = self.client.post("/api/chat", json=self._payload(messages, model, temperature, max_tokens, False))
+        if response.status_code >= 400:
+            raise _ollama_error(response)
+        data = response.json()
+        return (data.get("message") or {}).get("content") or "", _ollama_usage(data)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+# Selection
+def provider_for_model(model: str) -> str:
+    """Name of the backend serving a model key from Config.MODELS"""
+    return Config.MODELS.get(model, {}).get("provider", GroqProvider.name)
+
+def needs_api_key(model: str) -> bool:
+    return provider_for_model(model) == GroqProvider.name
@@ -0,0 +1,226 @@
+"""
+Prometheus metrics for Code Inspector Pro
+
+Counters, gauges and histograms aggregated across every session in the
+process and served in the Prometheus text format by a small
+``http.server`` thread (``GET /metrics``). Recording a value is a dict
+update under a per-metric lock, so it costs microseconds and never waits
+on a scrape: the exposition copies each metric's values before
+formatting them.
+
+Run one port per app instance (``CODE_INSPECTOR_METRICS_PORT``) and point
+the scraper at each of them.
+"""
+
+import bisect
+import math
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from inspector_core import CodeAnalysis, Config
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+WAIT_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last one is +Inf), sum and count
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "code_inspector_requests_total", "Analyses by outcome (success, cached, error)",
+    ["model", "action", "language", "outcome"]))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "code_inspector_request_duration_seconds", "Wall-clock time of analyses that called a model",
+    ["model", "action", "language"], LATENCY_BUCKETS))
+TTFT = REGISTRY.register(Histogram(
+    "code_inspector_time_to_first_token_seconds", "Time from sending a request to its first streamed token",
+    ["model"], TTFT_BUCKETS))
+TOKENS = REGISTRY.register(Counter(
+    "code_inspector_tokens_total", "Tokens sent to and received from models", ["model", "direction"]))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "code_inspector_cache_lookups_total", "Response cache lookups by result (hit, miss)", ["result"]))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "code_inspector_cache_hit_ratio", "Share of response cache lookups served from the cache"))
+RETRIES = REGISTRY.register(Counter(
+    "code_inspector_retries_total", "Request attempts retried after transient failures", ["model"]))
+RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "code_inspector_rate_limit_wait_seconds", "Time requests spent queued behind the shared rate limiter",
+    ["model"], WAIT_BUCKETS))
+ACTIVE_STREAMS = REGISTRY.register(Gauge(
+    "code_inspector_active_streams", "Responses currently streaming", ["model"]))
+
+def observe_cache_lookup(hit: bool):
+    CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
+    hits, total = CACHE_LOOKUPS.value(result="hit"), CACHE_LOOKUPS.total()
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0)
+
+def observe_analysis(analysis: CodeAnalysis):
+    """Count a finished analysis; only those that called a model add latency and token samples"""
+    labels = {"model": analysis.model_used, "action": analysis.action, "language": analysis.language}
+    REQUESTS.inc(outcome="cached" if analysis.cached else "success", **labels)
+    if analysis.cached:
+        return
+    REQUEST_DURATION.observe(analysis.execution_time, **labels)
+    TOKENS.inc(analysis.input_tokens or 0, model=analysis.model_used, direction="input")
+    TOKENS.inc(analysis.output_tokens or 0, model=analysis.model_used, direction="output")
+    if analysis.retry_count:
+        RETRIES.inc(analysis.retry_count, model=analysis.model_used)
+    if analysis.ttft is not None:
+        TTFT.observe(analysis.ttft, model=analysis.model_used)
+    if analysis.queue_wait is not None:
+        RATE_LIMIT_WAIT.observe(analysis.queue_wait, model=analysis.model_used)
+
+def observe_failure(model: str, action: str, language: str):
+    REQUESTS.inc(model=model, action=action, language=language, outcome="error")
+
+# Exposition
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the app's log
+
+def start_metrics_server(host: str = Config.METRICS["host"],
+                         port: int = Config.METRICS["port"]) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread; None if the port is taken (e.g. by another instance)"""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
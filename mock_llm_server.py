@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Mock streaming LLM server for Code Inspector Pro
+
+A local stand-in for the providers that speaks the Groq/OpenAI chat
+completions API (``/openai/v1/chat/completions`` and
+``/v1/chat/completions``, streamed as server-sent events) and Ollama's
+``/api/chat`` (streamed as NDJSON). Responses come from a corpus and are
+paced by a configurable time-to-first-token and token rate. Failures can
+be injected: 500s, 429s with ``retry-after``, and streams cut off midway.
+A fixed seed makes a run reproducible, so our side of the pipeline can be
+benchmarked on a laptop with no network.
+
+Usage:
+    python mock_llm_server.py --port 8800 --ttft 0.4 --tokens-per-second 250 --rate-limit-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8800 OLLAMA_HOST=http://127.0.0.1:8800 GROQ_API_KEY=mock streamlit run app.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from token_accounting import count_message_tokens, count_tokens
+
+OPENAI_PATHS = {"/openai/v1/chat/completions", "/v1/chat/completions"}
+OLLAMA_PATH = "/api/chat"
+
+_PIECE_PATTERN = re.compile(r"\S+\s*|\s+")
+
+DEFAULT_CORPUS = [
+    "## Code Review\n\n"
+    "### ✅ Strengths\n- Clear function names and a single responsibility per function\n"
+    "- Inputs are validated before use\n\n"
+    "### ⚠️ Issues\n1. **Line 3**: the loop recomputes `len(items)` on every iteration.\n"
+    "2. **Line 7**: a bare `except` hides real errors; catch the specific exception instead.\n\n"
+    "### 💡 Suggestions\n```python\nfor index, item in enumerate(items):\n    process(index, item)\n```\n",
+    "## Explanation\n\n"
+    "The snippet defines a helper that walks the input once and collects matching entries. "
+    "The first block sets up the accumulator, the loop filters each element, and the final "
+    "statement returns the collected values. Lines 4-6 handle the empty input case early, "
+    "which keeps the main path free of special cases.\n",
+    "## Optimization\n\n"
+    "The main cost is the nested loop on lines 5-9, which makes the function O(n²). "
+    "Building a set of the lookup keys first brings it down to O(n):\n\n"
+    "```python\nseen = set(keys)\nresult = [value for value in values if value in seen]\n```\n\n"
+    "This also removes the repeated attribute lookups inside the loop.\n",
+]
+
+@dataclass
+class MockSettings:
+    ttft: float = 0.3  # Seconds before the first chunk
+    tokens_per_second: float = 300.0
+    chunk_tokens: int = 3  # Tokens per streamed chunk
+    jitter: float = 0.0  # Relative random variation of every delay
+    error_rate: float = 0.0  # Share of requests answered with a 500
+    rate_limit_rate: float = 0.0  # Share of requests answered with a 429
+    retry_after: float = 1.0
+    stream_error_rate: float = 0.0  # Share of streams cut off before they finish
+    seed: Optional[int] = None
+
+def load_corpus(path: Optional[Path]) -> List[str]:
+    """Responses from a directory of text files, a JSONL file of {"response": ...} lines, or one text file"""
+    if path is None:
+        return list(DEFAULT_CORPUS)
+    if path.is_dir():
+        responses = [file.read_text(encoding="utf-8") for file in sorted(path.iterdir()) if file.is_file()]
+    elif path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            responses = [json.loads(line)["response"] for line in f if line.strip()]
+    else:
+        responses = [path.read_text(encoding="utf-8")]
+    if not responses:
+        raise ValueError(f"empty corpus: {path}")
+    return responses
+
+def split_tokens(text: str) -> List[str]:
+    """Word-sized pieces to stream; close enough to model tokens for pacing"""
+    return _PIECE_PATTERN.findall(text)
+
+class MockLLM:
+    """Response selection, pacing and failure injection shared by both wire formats"""
+
+    def __init__(self, settings: MockSettings, corpus: List[str]):
+        self.settings = settings
+        self.corpus = corpus
+        self._random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def _delay(self, seconds: float) -> float:
+        if self.settings.jitter:
+            seconds *= 1 + self.settings.jitter * (2 * self._roll() - 1)
+        return max(seconds, 0.0)
+
+    def injected_failure(self) -> Optional[Tuple[int, str]]:
+        """(status, message) for a request that should fail up front, or None"""
+        with self._lock:
+            self.requests += 1
+        roll = self._roll()
+        if roll < self.settings.rate_limit_rate:
+            return 429, "Rate limit reached (injected by mock server)"
+        if roll < self.settings.rate_limit_rate + self.settings.error_rate:
+            return 500, "Internal server error (injected by mock server)"
+        return None
+
+    def response_for(self, messages: List[Dict[str, str]], max_tokens: Optional[int]) -> Tuple[List[str], str]:
+        """Corpus response chosen by prompt hash, cut to max_tokens, with its finish reason"""
+        prompt = messages[-1].get("content", "") if messages else ""
+        digest = hashlib.sha256(f"{self.settings.seed}:{prompt}".encode("utf-8")).digest()
+        pieces = split_tokens(self.corpus[int.from_bytes(digest[:4], "big") % len(self.corpus)])
+        if max_tokens is not None and len(pieces) > max_tokens:
+            return pieces[:max_tokens], "length"
+        return pieces, "stop"
+
+    def paced_chunks(self, pieces: List[str]) -> Iterator[Optional[str]]:
+        """Chunks of text on the configured schedule; None marks an injected mid-stream cut"""
+        cut_at = None
+        if self._roll() < self.settings.stream_error_rate:
+            cut_at = max(len(pieces) // 2, 1)
+        start = time.perf_counter()
+        due = self._delay(self.settings.ttft)
+        interval = self.settings.chunk_tokens / max(self.settings.tokens_per_second, 1e-6)
+        for index in range(0, len(pieces), self.settings.chunk_tokens):
+            if cut_at is not None and index >= cut_at:
+                yield None
+                return
+            # Sleep to an absolute schedule so time spent writing does not accumulate as drift
+            remaining = start + due - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            yield "".join(pieces[index:index + self.settings.chunk_tokens])
+            due += self._delay(interval)
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive and chunked streaming, like the real APIs
+    llm: MockLLM  # Set on the subclass built by create_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+    def _write_chunk(self, data: str):
+        body = data.encode("utf-8")
+        self.wfile.write(f"{len(body):x}\r\n".encode("ascii") + body + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _abort_stream(self):
+        """Drop the connection without the terminating chunk, like a reset upstream"""
+        self.close_connection = True
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path in ("/", "/health"):
+            self._send_json(200, {"status": "ok", "requests": self.llm.requests})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path not in OPENAI_PATHS and path != OLLAMA_PATH:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+            return
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        failure = self.llm.injected_failure()
+        if path == OLLAMA_PATH:
+            self._handle_ollama(request, failure)
+        else:
+            self._handle_openai(request, failure)
+
+    # Groq / OpenAI
+    def _handle_openai(self, request: Dict, failure: Optional[Tuple[int, str]]):
+        if failure is not None:
+            status, message = failure
+            headers = {"retry-after": f"{self.llm.settings.retry_after:g}"} if status == 429 else None
+            error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+            return
+        messages = request.get("messages") or []
+        model = request.get("model", "mock")
+        pieces, finish_reason = self.llm.response_for(messages, request.get("max_tokens"))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage = {"prompt_tokens": count_message_tokens(messages)}
+        if not request.get("stream"):
+            chunks = list(self.llm.paced_chunks(pieces))
+            if None in chunks:
+                self._send_json(502, {"error": {"message": "Upstream connection reset (injected by mock server)",
+                                                "type": "server_error"}})
+                return
+            text = "".join(chunks)
+            usage.update(completion_tokens=count_tokens(text))
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": finish_reason}],
+                "usage": usage
+            })
+            return
+
+        def event(delta: Dict, finish: Optional[str] = None, extra: Optional[Dict] = None) -> str:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            chunk.update(extra or {})
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        self._start_stream("text/event-stream")
+        self._write_chunk(event({"role": "assistant", "content": ""}))
+        streamed: List[str] = []
+        for text in self.llm.paced_chunks(pieces):
+            if text is None:
+                self._abort_stream()
+                return
+            streamed.append(text)
+            self._write_chunk(event({"content": text}))
+        usage.update(completion_tokens=count_tokens("".join(streamed)))
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        # Groq reports usage on the final chunk under x_groq
+        self._write_chunk(event({}, finish_reason, {"x_groq": {"id": completion_id, "usage": usage}}))
+        self._write_chunk("data: [DONE]\n\n")
+        self._end_stream()
+
+    # Ollama
+    def _handle_ollama(self, request: Dict, failure: Optional[Tuple[int, str]]):
+        if failure is not None:
+            self._send_json(failure[0], {"error": failure[1]})
+            return
+        messages = request.get("messages") or []
+        model = request.get("model", "mock")
+        options = request.get("options") or {}
+        pieces, finish_reason = self.llm.response_for(messages, options.get("num_predict"))
+
+        def message(content: str, done: bool) -> Dict:
+            return {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "message": {"role": "assistant", "content": content}, "done": done}
+
+        if not request.get("stream", True):
+            chunks = list(self.llm.paced_chunks(pieces))
+            if None in chunks:
+                self._send_json(502, {"error": "upstream connection reset (injected by mock server)"})
+                return
+            text = "".join(chunks)
+            final = message(text, True)
+            final.update(done_reason=finish_reason, prompt_eval_count=count_message_tokens(messages),
+                         eval_count=count_tokens(text))
+            self._send_json(200, final)
+            return
+
+        self._start_stream("application/x-ndjson")
+        streamed: List[str] = []
+        for text in self.llm.paced_chunks(pieces):
+            if text is None:
+                self._abort_stream()
+                return
+            streamed.append(text)
+            self._write_chunk(json.dumps(message(text, False)) + "\n")
+        final = message("", True)
+        final.update(done_reason=finish_reason, prompt_eval_count=count_message_tokens(messages),
+                     eval_count=count_tokens("".join(streamed)))
+        self._write_chunk(json.dumps(final) + "\n")
+        self._end_stream()
+
+def create_server(host: str, port: int, settings: MockSettings, corpus: List[str]) -> ThreadingHTTPServer:
+    handler = type("BoundMockHandler", (MockHandler,), {"llm": MockLLM(settings, corpus)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve mock Groq/OpenAI and Ollama streaming chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds before the first chunk")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--chunk-tokens", type=int, default=3, help="Tokens per streamed chunk")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative random variation of delays, e.g. 0.2")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Share of streams cut off midway")
+    parser.add_argument("--corpus", type=Path, help="Directory of responses, a .jsonl file or one text file")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible response choice and failure injection")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    settings = MockSettings(
+        ttft=args.ttft, tokens_per_second=args.tokens_per_second, chunk_tokens=max(args.chunk_tokens, 1),
+        jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, stream_error_rate=args.stream_error_rate, seed=args.seed
+    )
+    try:
+        corpus = load_corpus(args.corpus)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not load corpus: {e}", file=sys.stderr)
+        return 2
+    server = create_server(args.host, args.port, settings, corpus)
+    print(f"🧪 Mock LLM server on http://{args.host}:{args.port} ({len(corpus)} responses)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Latency-aware model routing for Code Inspector Pro
+
+Keeps rolling (exponentially weighted) per-model statistics for
+time-to-first-token, streaming throughput and error rate, starting from
+priors derived from the static speed labels in ``Config.MODELS``. A
+request is routed by estimating each model's total latency for the
+expected answer length: among the models that meet the user's latency
+target, the one with enough quality for the action and snippet size wins,
+and ties go to the fastest. Models that keep failing are skipped for a
+cooldown period and then probed again.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from inspector_core import Config
+
+@dataclass
+class ModelStats:
+    ttft: float  # Seconds to the first streamed token, excluding rate-limit queueing
+    tokens_per_second: float
+    error_rate: float = 0.0
+    samples: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+
+    def estimate(self, output_tokens: int) -> float:
+        """Expected seconds to stream an answer of output_tokens"""
+        return self.ttft + output_tokens / max(self.tokens_per_second, 1e-6)
+
+@dataclass
+class RouteDecision:
+    model: str
+    ranking: List[str]  # Every candidate, best first; later entries are fallbacks
+    estimated_latency: float
+    expected_tokens: int
+    reason: str
+
+def quality_rank(label: str) -> int:
+    ranks = Config.ROUTER["quality_ranks"]
+    return ranks.index(label) if label in ranks else 0
+
+class ModelRouter:
+    """Per-model rolling performance statistics and the routing decision built on them"""
+
+    def __init__(self, models: Dict[str, Dict] = Config.MODELS, settings: Dict = Config.ROUTER):
+        self._models = models
+        self._settings = settings
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            speed = self._models.get(model, {}).get("speed", "Medium")
+            prior = self._settings["priors"].get(speed, self._settings["priors"]["Medium"])
+            stats = ModelStats(prior["ttft"], prior["tokens_per_second"])
+            self._stats[model] = stats
+        return stats
+
+    def _blend(self, old: float, new: float, samples: int) -> float:
+        if samples == 0:
+            return new  # The first measurement replaces the prior outright
+        weight = self._settings["smoothing"]
+        return old + weight * (new - old)
+
+    def record_success(self, model: str, ttft: float, output_tokens: int, stream_time: float):
+        """Fold one completed stream into the model's statistics"""
+        with self._lock:
+            stats = self._state(model)
+            stats.ttft = self._blend(stats.ttft, max(ttft, 0.0), stats.samples)
+            if output_tokens > 1 and stream_time > 0:
+                stats.tokens_per_second = self._blend(stats.tokens_per_second, output_tokens / stream_time,
+                                                      stats.samples)
+            stats.error_rate = self._blend(stats.error_rate, 0.0, 1)
+            stats.samples += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+
+    def record_failure(self, model: str):
+        """Count a request that failed after retries; a degraded model is benched for a while"""
+        with self._lock:
+            stats = self._state(model)
+            stats.error_rate = self._blend(stats.error_rate, 1.0, 1)
+            stats.consecutive_failures += 1
+            if stats.error_rate > self._settings["max_error_rate"] or \
+                    stats.consecutive_failures >= self._settings["max_consecutive_failures"]:
+                stats.cooldown_until = time.monotonic() + self._settings["cooldown"]
+
+    def expected_tokens(self, action: str, code_tokens: int, max_tokens: int) -> int:
+        """Answer length to plan for: grows with the code, capped by max_tokens"""
+        ratio = self._settings["output_ratio"].get(action, 1.0)
+        return int(min(max_tokens, self._settings["base_output_tokens"] + ratio * code_tokens))
+
+    def required_quality(self, action: str, code_tokens: int) -> int:
+        """Quality rank beyond which a better model is not worth extra latency"""
+        if code_tokens < self._settings["small_snippet_tokens"]:
+            return quality_rank(self._settings["small_snippet_quality"])
+        return quality_rank(self._settings["min_quality"].get(action, "Excellent"))
+
+    def route(self, action: str, code_tokens: int, latency_target: float, candidates: Iterable[str],
+              max_tokens: int) -> RouteDecision:
+        """Rank candidate models for a request and explain the choice"""
+        candidates = list(candidates)
+        if not candidates:
+            raise ValueError("no candidate models to route between")
+        expected = self.expected_tokens(action, code_tokens, max_tokens)
+        needed = self.required_quality(action, code_tokens)
+        now = time.monotonic()
+        with self._lock:
+            estimates = {model: self._state(model).estimate(expected) for model in candidates}
+            benched = {model for model in candidates if self._state(model).cooldown_until > now}
+
+        def preference(model: str):
+            meets_target = estimates[model] <= latency_target
+            capped_quality = min(quality_rank(self._models.get(model, {}).get("quality", "")), needed)
+            # Healthy first, then within target, then good enough, then fastest
+            return (model not in benched, meets_target, capped_quality if meets_target else 0, -estimates[model])
+
+        ranking = sorted(candidates, key=preference, reverse=True)
+        best = ranking[0]
+        name = self._models.get(best, {}).get("name", best)
+        if best in benched:
+            reason = f"every candidate is degraded; trying {name}"
+        elif estimates[best] <= latency_target:
+            reason = f"{name}: ~{estimates[best]:.1f}s for ~{expected:,} output tokens (target {latency_target:.0f}s)"
+        else:
+            reason = f"no model meets the {latency_target:.0f}s target; {name} is fastest at ~{estimates[best]:.1f}s"
+        return RouteDecision(best, ranking, estimates[best], expected, reason)
+
+    def snapshot(self) -> List[Dict]:
+        """Current statistics of every model seen so far, for display"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "ttft": stats.ttft,
+                    "tokens_per_second": stats.tokens_per_second,
+                    "error_rate": stats.error_rate,
+                    "samples": stats.samples,
+                    "benched": stats.cooldown_until > now
+                }
+                for model, stats in self._stats.items()
+            ]
+
+_shared_router: Optional[ModelRouter] = None
+_shared_lock = threading.Lock()
+
+def get_model_router() -> ModelRouter:
+    """Process-wide router whose statistics every session and engine run feed"""
+    global _shared_router
+    with _shared_lock:
+        if _shared_router is None:
+            _shared_router = ModelRouter()
+        return _shared_router
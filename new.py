@@ -1,7 +1,9 @@
 import streamlit as st
 import os
 from streamlit_ace import st_ace
-from groq import Groq
+from groq_pool import GroqClientPool
+from blob_store import BlobRefs, BlobStore, content_hash
+from static_assets import inject_stylesheet
 import time
 from streamlit_extras.colored_header import colored_header
 from streamlit_extras.switch_page_button import switch_page
@@ -18,175 +20,20 @@ st.set_page_config(
 
 # Custom CSS to enhance the UI
 def local_css():
-    st.markdown("""
-    <style>
-    /* Main theme colors and fonts */
-    :root {
-        --primary-color: #4527a0;
-        --secondary-color: #7c4dff;
-        --background-color: #f5f5f7;
-        --card-background: #ffffff;
-        --text-color: #333333;
-        --accent-color: #ff5722;
-    }
-    
-    /* Main page styling */
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }
-    
-    /* Custom card styling */
-    .card {
-        border-radius: 10px;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-        padding: 1.5rem;
-        background-color: var(--card-background);
-        margin-bottom: 1rem;
-        border-left: 4px solid var(--primary-color);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 16px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        border-radius: 6px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Code block styling */
-    pre {
-        border-radius: 8px;
-        padding: 1rem;
-    }
-    
-    /* Header styling */
-    h1, h2, h3 {
-        color: var(--primary-color);
-        font-weight: 700;
-    }
-    
-    /* Custom header with gradient */
-    .gradient-header {
-        background: linear-gradient(90deg, var(--primary-color), var(--secondary-color));
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1.5rem;
-        text-align: center;
-    }
-    
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: var(--primary-color);
-    }
-    
-    /* Result cards */
-    .result-card {
-        background-color: #f8f9fa;
-        border-radius: 8px;
-        padding: 15px;
-        border-left: 5px solid var(--secondary-color);
-        margin-bottom: 15px;
-    }
-    
-    /* Language icons */
-    .language-icon {
-        font-size: 24px;
-        margin-right: 10px;
-        vertical-align: middle;
-    }
-    
-    /* Statistics counter boxes */
-    .stat-box {
-        background-color: var(--primary-color);
-        color: white;
-        border-radius: 8px;
-        padding: 15px;
-        text-align: center;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    }
-    
-    .stat-box h3 {
-        color: white;
-        margin: 0;
-        font-size: 28px;
-    }
-    
-    .stat-box p {
-        margin: 5px 0 0 0;
-        opacity: 0.8;
-        font-size: 14px;
-    }
-    
-    /* Toggle switch styling */
-    .switch-label {
-        display: flex;
-        align-items: center;
-        cursor: pointer;
-        margin: 8px 0;
-    }
-    
-    /* Animation for loading */
-    @keyframes pulse {
-        0% { opacity: 0.6; }
-        50% { opacity: 1; }
-        100% { opacity: 0.6; }
-    }
-    
-    .loading-pulse {
-        animation: pulse 1.5s infinite ease-in-out;
-    }
-    
-    /* Main title with fancy gradient */
-    .main-title {
-        background: linear-gradient(90deg, #4527a0, #7c4dff, #4527a0);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-size: 2.5rem;
-        font-weight: 800;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    
-    /* Tabs styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background-color: #f0f2f6;
-        border-radius: 4px 4px 0 0;
-        padding: 10px 16px;
-        border: none;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: var(--primary-color) !important;
-        color: white !important;
-    }
-    
-    /* Responsive adjustments */
-    @media (max-width: 768px) {
-        .main-title {
-            font-size: 1.8rem;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    inject_stylesheet("new.css")
 
 local_css()
 
+# Keep-alive Groq clients shared across sessions
+@st.cache_resource
+def get_groq_pool():
+    return GroqClientPool()
+
+# Snippet text shared by history and favorites of every session, keyed by content hash
+@st.cache_resource
+def get_blob_store():
+    return BlobStore()
+
 # Function to encode image to base64
 def get_base64_of_image(image_path):
     with open(image_path, "rb") as img_file:
@@ -236,7 +83,10 @@ if "language_stats" not in st.session_state:
 if "code_processed" not in st.session_state:
     st.session_state.code_processed = 0
 if "favorite_codes" not in st.session_state:
-    st.session_state.favorite_codes = []
+    st.session_state.favorite_codes = {}  # code_hash -> favorite, in insertion order
+if "blob_refs" not in st.session_state:
+    # This session's references into the shared blob store, released when the session is dropped
+    st.session_state.blob_refs = BlobRefs(get_blob_store())
 
 # Define available languages with icons
 LANGUAGES = {
@@ -433,7 +283,7 @@ if selected_menu == "Code Editor":
                 return None
             
             try:
-                client = Groq(api_key=api_key)
+                client = get_groq_pool().get(api_key)
                 
                 # Different system prompts based on action and language
                 if prompt_type == "review":
@@ -472,7 +322,7 @@ if selected_menu == "Code Editor":
                     st.session_state.chat_history.append({
                         "action": prompt_type,
                         "language": language_key,
-                        "code": code_snippet,
+                        "code_hash": st.session_state.blob_refs.put(code_snippet),
                         "response": full_response,
                         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
                     })
@@ -498,12 +348,13 @@ if selected_menu == "Code Editor":
             elif optimize_button:
                 process_with_groq("optimize", code, selected_lang_key)
             elif save_button:
-                if code not in [item["code"] for item in st.session_state.favorite_codes]:
-                    st.session_state.favorite_codes.append({
+                code_hash = content_hash(code)
+                if code_hash not in st.session_state.favorite_codes:
+                    st.session_state.favorite_codes[code_hash] = {
                         "language": selected_lang_key,
-                        "code": code,
+                        "code_hash": st.session_state.blob_refs.put(code),
                         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
+                    }
                     st.success("Code saved to favorites!")
                 else:
                     st.info("This code is already in your favorites.")
@@ -528,7 +379,7 @@ elif selected_menu == "History":
                 """, unsafe_allow_html=True)
                 
                 with st.expander("View Code", expanded=False):
-                    st.code(item['code'], language=item['language'])
+                    st.code(get_blob_store().get(item['code_hash']), language=item['language'])
                 
                 with st.expander("View Analysis", expanded=False):
                     st.markdown(item['response'])
@@ -544,7 +395,7 @@ elif selected_menu == "History":
     
     with tab2:
         if st.session_state.favorite_codes:
-            for i, item in enumerate(reversed(st.session_state.favorite_codes)):
+            for i, item in enumerate(reversed(st.session_state.favorite_codes.values())):
                 st.markdown(f"""
                 <div class="result-card">
                     <h3>{LANGUAGES.get(item['language'], item['language'])} - {item['timestamp']}</h3>
@@ -552,21 +403,22 @@ elif selected_menu == "History":
                 """, unsafe_allow_html=True)
                 
                 with st.expander("View Code", expanded=False):
-                    st.code(item['code'], language=item['language'])
+                    st.code(get_blob_store().get(item['code_hash']), language=item['language'])
                 
                 # Option to run analysis on this saved code
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button(f"Review", key=f"review_fav_{i}"):
                         # Redirect to code editor with this code loaded
-                        st.session_state.temp_code = item['code']
+                        st.session_state.temp_code = get_blob_store().get(item['code_hash'])
                         st.session_state.temp_lang = item['language']
                         st.session_state.temp_action = "review"
                         # Would need to implement state management to run this directly
                 
                 with col2:
                     if st.button(f"Delete", key=f"del_fav_{i}"):
-                        st.session_state.favorite_codes.remove(item)
+                        del st.session_state.favorite_codes[item['code_hash']]
+                        st.session_state.blob_refs.release(item['code_hash'])
                         st.rerun()
                 
                 st.markdown("---")
@@ -588,7 +440,10 @@ elif selected_menu == "Settings":
         with col1:
             st.download_button(
                 label="Export History",
-                data=str(st.session_state.chat_history),
+                data=str([
+                    {**item, "code": get_blob_store().get(item["code_hash"])}
+                    for item in st.session_state.chat_history
+                ]),
                 file_name="code_inspector_history.json",
                 mime="application/json",
             )
@@ -600,14 +455,17 @@ elif selected_menu == "Settings":
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Clear History"):
+                st.session_state.blob_refs.release_many(item["code_hash"] for item in st.session_state.chat_history)
                 st.session_state.chat_history = []
                 st.success("History cleared!")
         with col2:
             if st.button("Clear Favorites"):
-                st.session_state.favorite_codes = []
+                st.session_state.blob_refs.release_many(st.session_state.favorite_codes)
+                st.session_state.favorite_codes = {}
                 st.success("Favorites cleared!")
         
         if st.button("Reset All Data", type="primary"):
+            st.session_state.blob_refs.release_all()
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.success("All data has been reset!")
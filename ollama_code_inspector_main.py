@@ -1,25 +1,21 @@
 import streamlit as st
 from streamlit_ace import st_ace
 
-import ollama
+from inspector_core import Config, build_messages
+from llm_providers import OllamaProvider
 
-def process_response(prompt):
-    messages = [
-        {"role": "system", "content": f"You are an AI python code inspector who helps the people in coding by reviewing their code this is the code of the user{prompt}  and analyse their code and explain them the code in a simplified manner"},
-        {"role": "system", "content": f"if you find any error  in their code that is {prompt} solve those error and explain them how they can improve their code"},
-        {"role": "system", "content": f"you are a python code inspector you can help only in python you are not familiar with other languages"}
-        
-    ]
+@st.cache_resource
+def get_ollama_provider() -> OllamaProvider:
+    return OllamaProvider(**Config.OLLAMA)
 
-    response = ollama.chat(model="llama3.2", messages=messages  ,stream=True
-                           )
-    
-    
-    return response
+def process_response(prompt):
+    # Same prompts and streaming layer as the main app, served by the local model
+    messages = build_messages("review", prompt, "python")
+    return get_ollama_provider().stream(messages, "llama3.2", temperature=0.7, max_tokens=1000)
 # 
 def stream_parser(stream):
-    for chunk in stream:
-        yield chunk['message']['content']
+    # ChatStream already yields plain text deltas
+    yield from stream
 
 
 # Center-align an image
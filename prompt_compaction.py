@@ -0,0 +1,257 @@
+"""
+Prompt compaction for Code Inspector Pro
+
+Shrinks a snippet before it is embedded in the prompt: comments (including
+license headers), blank lines and trailing whitespace are dropped and long
+Python docstrings are cut to their first lines. Lines inside multi-line
+string literals are kept verbatim, since their whitespace is part of the
+value. Every kept line remembers its original line number, so line
+references in the model's answer ("line 12", "lines 3-5", "#L7") are
+translated back to the code the user sees.
+"""
+
+import ast
+import bisect
+import io
+import re
+import tokenize
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from inspector_core import Config
+from token_accounting import count_tokens
+
+# Comment syntax per language key: (line comment markers, has /* */ block comments)
+COMMENT_SYNTAX: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "python": (("#",), False),
+    "ruby": (("#",), False),
+    "php": (("//", "#"), True),
+    "javascript": (("//",), True),
+    "typescript": (("//",), True),
+    "java": (("//",), True),
+    "csharp": (("//",), True),
+    "cpp": (("//",), True),
+    "go": (("//",), True),
+    "rust": (("//",), True),
+    "swift": (("//",), True),
+    "kotlin": (("//",), True),
+}
+
+# Prefixes that start with a line comment marker but are code (PHP 8 attributes)
+NOT_COMMENTS: Dict[str, Tuple[str, ...]] = {
+    "php": ("#[",),
+}
+
+# Languages where a ' may open a lifetime or label rather than a literal; elsewhere it always opens one
+APOSTROPHE_NOT_QUOTE = frozenset({"rust"})
+
+# Comments that change how code is built, checked or run are kept
+DIRECTIVE_PATTERN = re.compile(
+    r"^(#!|#\s*-\*-|#\s*(type|noqa|pragma|pylint|fmt)\b|//\s*(go:|\+build|eslint|@ts-|nolint|#region|#endregion)|/\*\s*eslint)"
+)
+
+# "line 12", "Lines 3-5", "lines 3 to 5" and GitHub-style "#L7" or "#L7-L9"; a bare "L1" is left alone
+# because it is as likely to be prose ("L1 cache")
+LINE_REFERENCE_PATTERN = re.compile(r"(\b(?i:lines?)\s+|#L)(\d+)(?:(\s*(?:-|–|to|and)\s*|-L)(\d+))?")
+
+@dataclass
+class CompactedCode:
+    text: str
+    line_map: List[int]  # line_map[i] is the original line number of compacted line i + 1
+    original: str
+
+    @classmethod
+    def identity(cls, code: str) -> "CompactedCode":
+        """Uncompacted code with a one-to-one line map"""
+        return cls(code, list(range(1, code.count("\n") + 2)), code)
+
+    @property
+    def changed(self) -> bool:
+        return self.text != self.original
+
+    def original_line(self, line: int) -> int:
+        """Original line number for a compacted line number"""
+        if not self.line_map:
+            return line
+        return self.line_map[min(max(line, 1), len(self.line_map)) - 1]
+
+    def compacted_line(self, line: int) -> int:
+        """Compacted line number showing an original line, or the next kept line if it was dropped"""
+        return min(bisect.bisect_left(self.line_map, line), max(len(self.line_map) - 1, 0)) + 1
+
+    def remap_response(self, response: str) -> str:
+        """Rewrite "line N" references in a model answer to original line numbers"""
+        if self.line_map == list(range(1, len(self.line_map) + 1)):
+            return response
+
+        def replace(match: re.Match) -> str:
+            text = match.group(1) + str(self.original_line(int(match.group(2))))
+            if match.group(4):
+                text += match.group(3) + str(self.original_line(int(match.group(4))))
+            return text
+
+        return LINE_REFERENCE_PATTERN.sub(replace, response)
+
+    def tokens_saved(self) -> int:
+        return max(count_tokens(self.original) - count_tokens(self.text), 0)
+
+def _python_tokens(code: str) -> Optional[List[tokenize.TokenInfo]]:
+    try:
+        return list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+
+def _strip_python_comments(lines: List[str], tokens: List[tokenize.TokenInfo]) -> List[str]:
+    stripped = list(lines)
+    for token in tokens:
+        if token.type == tokenize.COMMENT and not DIRECTIVE_PATTERN.match(token.string):
+            row, column = token.start
+            stripped[row - 1] = stripped[row - 1][:column]
+    return stripped
+
+def _python_string_lines(tokens: List[tokenize.TokenInfo]) -> Set[int]:
+    """Line numbers whose line break is inside a string literal (f-strings are several tokens on 3.12+)"""
+    fstring_start, fstring_end = getattr(tokenize, "FSTRING_START", None), getattr(tokenize, "FSTRING_END", None)
+    lines: Set[int] = set()
+    open_fstrings: List[int] = []
+    for token in tokens:
+        if token.type == tokenize.STRING:
+            start, end = token.start[0], token.end[0]
+        elif token.type == fstring_start:
+            open_fstrings.append(token.start[0])
+            continue
+        elif token.type == fstring_end and open_fstrings:
+            start, end = open_fstrings.pop(), token.end[0]
+        else:
+            continue
+        if end > start:
+            lines.update(range(start, end))
+    return lines
+
+def _strip_c_style_comments(code: str, line_markers: Tuple[str, ...], block_comments: bool,
+                            not_comments: Tuple[str, ...] = (),
+                            short_single_quotes: bool = False) -> Tuple[List[str], Set[int]]:
+    """Remove comments outside string literals; block comments keep their newlines so lines stay aligned
+
+    With short_single_quotes a ' only opens a literal when another one closes it
+    within a few characters, so Rust lifetimes are not read as strings.
+    Also returns the line numbers whose line break is inside a (backtick) literal.
+    """
+    out: List[str] = []
+    string_lines: Set[int] = set()
+    line = 1
+    i, length = 0, len(code)
+    quote: Optional[str] = None
+    while i < length:
+        char = code[i]
+        if char == "\n":
+            line += 1
+        if quote:
+            out.append(char)
+            if char == "\n" and quote != "`":
+                quote = None  # Unterminated literal, or a lifetime/char we misread as one
+            elif char == "\n":
+                string_lines.add(line - 1)
+            elif char == "\\" and i + 1 < length:
+                out.append(code[i + 1])
+                if code[i + 1] == "\n":
+                    line += 1
+                    if quote == "`":
+                        string_lines.add(line - 1)
+                i += 2
+                continue
+            if char == quote:
+                quote = None
+            i += 1
+            continue
+        if char in "\"`" or (char == "'" and (not short_single_quotes
+                                             or "'" in code[i + 1:i + 12].split("\n")[0])):
+            quote = char
+            out.append(char)
+            i += 1
+            continue
+        if block_comments and code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            comment = code[i:end]
+            out.append(comment if DIRECTIVE_PATTERN.match(comment) else "\n" * comment.count("\n"))
+            line += comment.count("\n")
+            i = end
+            continue
+        marker = next((m for m in line_markers if code.startswith(m, i)), None)
+        if marker is not None and any(code.startswith(prefix, i) for prefix in not_comments):
+            marker = None
+        if marker is not None:
+            end = code.find("\n", i)
+            end = length if end == -1 else end
+            comment = code[i:end]
+            if DIRECTIVE_PATTERN.match(comment):
+                out.append(comment)
+            i = end
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out).split("\n"), string_lines
+
+def _docstring_lines_to_drop(code: str, max_lines: int) -> Set[int]:
+    """Line numbers inside long Python docstrings beyond their first max_lines lines"""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return set()
+    drop: Set[int] = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            start, end = body[0].lineno, body[0].end_lineno
+            # Keep the opening lines and the closing line so the string stays terminated
+            drop.update(range(start + max_lines, end))
+    return drop
+
+def compact_code(code: str, language_key: str, strip_comments: bool = True,
+                 max_docstring_lines: int = 3) -> CompactedCode:
+    """Strip non-semantic content from a snippet, keeping a map back to the original lines"""
+    lines = code.split("\n")
+    string_lines: Set[int] = set()
+    drop: Set[int] = set()
+    if language_key == "python":
+        tokens = _python_tokens(code)
+        if tokens is not None:
+            string_lines = _python_string_lines(tokens)
+            if strip_comments:
+                lines = _strip_python_comments(lines, tokens)
+        drop = _docstring_lines_to_drop(code, max_docstring_lines)
+    elif language_key in COMMENT_SYNTAX:
+        markers, block_comments = COMMENT_SYNTAX[language_key]
+        stripped, string_lines = _strip_c_style_comments(code, markers, block_comments,
+                                                         NOT_COMMENTS.get(language_key, ()),
+                                                         language_key in APOSTROPHE_NOT_QUOTE)
+        if strip_comments and len(stripped) == len(lines):
+            lines = stripped
+
+    kept: List[str] = []
+    line_map: List[int] = []
+    for number, line in enumerate(lines, start=1):
+        if number in drop:
+            continue
+        # Whitespace that ends or follows a line break inside a string literal is part of its value
+        if number not in string_lines:
+            line = line.rstrip()
+        if not line.strip() and number not in string_lines and number - 1 not in string_lines:
+            continue
+        kept.append(line)
+        line_map.append(number)
+    if not kept:
+        return CompactedCode.identity(code)
+    return CompactedCode("\n".join(kept), line_map, code)
+
+def compact_for_prompt(prompt_type: str, code: str, language_key: str) -> CompactedCode:
+    """Compact code for an analysis prompt according to Config.COMPACTION"""
+    settings = Config.COMPACTION
+    if not settings["enabled"]:
+        return CompactedCode.identity(code)
+    return compact_code(code, language_key, strip_comments=prompt_type not in settings["keep_comments_for"],
+                        max_docstring_lines=settings["max_docstring_lines"])
@@ -0,0 +1,72 @@
+"""
+Split Python source into analysis units
+
+A module is broken into its top-level functions and classes plus a module
+header holding everything else (docstring, imports, constants, script
+code). Units keep their 1-based source line ranges so per-unit results can
+be merged back in source order.
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+@dataclass
+class CodeUnit:
+    name: str
+    kind: str  # "header", "function" or "class"
+    start_line: int
+    end_line: int
+    source: str
+    lines: List[int] = field(default_factory=list)  # Module line number of each line of source
+
+def _node_start(node: ast.AST) -> int:
+    """First line of a definition, including its decorators"""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+def _node_end(node: ast.AST, next_start: int) -> int:
+    end = getattr(node, "end_lineno", None)  # Python 3.8+
+    return end if end is not None else next_start - 1
+
+def split_python_units(code: str) -> Optional[List[CodeUnit]]:
+    """Split a module into header, function and class units; None if it does not parse"""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = code.splitlines()
+    definitions = [
+        node for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+
+    units: List[CodeUnit] = []
+    covered = set()
+    for index, node in enumerate(definitions):
+        next_start = _node_start(definitions[index + 1]) if index + 1 < len(definitions) else len(lines) + 1
+        start, end = _node_start(node), _node_end(node, next_start)
+        covered.update(range(start, end + 1))
+        units.append(CodeUnit(
+            name=node.name,
+            kind="class" if isinstance(node, ast.ClassDef) else "function",
+            start_line=start,
+            end_line=end,
+            source="\n".join(lines[start - 1:end]),
+            lines=list(range(start, end + 1)),
+        ))
+
+    header_lines = [number for number in range(1, len(lines) + 1)
+                    if number not in covered and lines[number - 1].strip()]
+    if header_lines:
+        units.append(CodeUnit(
+            name="module",
+            kind="header",
+            start_line=header_lines[0],
+            end_line=header_lines[-1],
+            source="\n".join(lines[number - 1] for number in header_lines),
+            lines=header_lines,
+        ))
+
+    return sorted(units, key=lambda unit: unit.start_line)
@@ -0,0 +1,226 @@
+"""
+Shared model rate limiter for Code Inspector Pro
+
+Each model gets a requests-per-minute and a tokens-per-minute token bucket
+(limits from ``Config.MODELS``) plus an AIMD concurrency limit: it
+grows by roughly one slot per window of successful requests, halves on
+every 429, honouring ``retry-after``, and holds still on other failures. Callers over the limit are queued
+rather than failed. One limiter is shared by every session and batch path
+in the process.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from inspector_core import Config
+
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited longer than its timeout for a slot"""
+
+@dataclass
+class Permit:
+    model: str
+    tokens: int  # Charged to the token bucket: the estimate, capped at the bucket's capacity
+    wait_time: float
+
+class _Bucket:
+    """Classic token bucket refilled continuously at capacity per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until amount is available (0 if it already is)"""
+        deficit = min(amount, self.capacity) - self.level
+        return 0.0 if deficit <= 0 else deficit / self.rate
+
+class _ModelState:
+    def __init__(self, rpm: int, tpm: int, initial_concurrency: float, max_concurrency: float):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.rate_limited = 0
+
+class RateLimiter:
+    """Per-model RPM/TPM buckets with AIMD concurrency control"""
+
+    def __init__(self, models: Dict[str, Dict] = Config.MODELS,
+                 initial_concurrency: float = 4.0, max_concurrency: float = 16.0):
+        self._models = models
+        self._initial_concurrency = initial_concurrency
+        self._max_concurrency = max_concurrency
+        self._states: Dict[str, _ModelState] = {}
+        self._condition = threading.Condition()
+        self.total_wait_time = 0.0
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            info = self._models.get(model, {})
+            state = _ModelState(info.get("rpm", DEFAULT_RPM), info.get("tpm", DEFAULT_TPM),
+                                self._initial_concurrency, self._max_concurrency)
+            self._states[model] = state
+        return state
+
+    def _charge(self, model: str, tokens: int) -> int:
+        return int(min(tokens, self._state(model).tokens.capacity))
+
+    def _try_acquire(self, model: str, tokens: int) -> float:
+        """Take a slot if possible; otherwise return how long to wait. Caller holds the lock."""
+        state = self._state(model)
+        now = time.monotonic()
+        state.requests.refill(now)
+        state.tokens.refill(now)
+        wait = max(state.blocked_until - now, state.requests.wait_for(1), state.tokens.wait_for(tokens))
+        if state.in_flight >= int(state.concurrency):
+            wait = max(wait, 0.05)  # Woken by release(); the timeout is only a safety net
+        if wait > 0:
+            return wait
+        state.requests.level -= 1
+        state.tokens.level -= self._charge(model, tokens)
+        state.in_flight += 1
+        return 0.0
+
+    def acquire(self, model: str, tokens: int, timeout: Optional[float] = None) -> Permit:
+        """Block until the model has request, token and concurrency budget"""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                wait = self._try_acquire(model, tokens)
+                if wait == 0:
+                    waited = time.monotonic() - start
+                    self.total_wait_time += waited
+                    return Permit(model, self._charge(model, tokens), waited)
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"Timed out waiting for {model} rate limit")
+                    wait = min(wait, remaining)
+                self._condition.wait(wait)
+
+    async def acquire_async(self, model: str, tokens: int, timeout: Optional[float] = None) -> Permit:
+        """Event-loop friendly acquire that sleeps instead of blocking the thread"""
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                wait = self._try_acquire(model, tokens)
+                charged = self._charge(model, tokens)
+            if wait == 0:
+                waited = time.monotonic() - start
+                with self._condition:
+                    self.total_wait_time += waited
+                return Permit(model, charged, waited)
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise RateLimitTimeout(f"Timed out waiting for {model} rate limit")
+            await asyncio.sleep(min(wait, 0.25))
+
+    def release(self, permit: Permit, actual_tokens: Optional[int] = None,
+                rate_limited: bool = False, retry_after: Optional[float] = None, succeeded: bool = True):
+        """Return a slot, reconcile token usage and adapt the concurrency limit
+
+        Only successful requests grow the limit, so failing ones (timeouts,
+        5xx, cancellations) cannot push concurrency up while the model struggles.
+        """
+        with self._condition:
+            state = self._state(permit.model)
+            state.in_flight = max(0, state.in_flight - 1)
+            if actual_tokens is not None:
+                # Refund (or charge) the difference between the estimate and real usage
+                state.tokens.level = min(state.tokens.capacity, state.tokens.level + permit.tokens - actual_tokens)
+            if rate_limited:
+                state.rate_limited += 1
+                state.concurrency = max(1.0, state.concurrency / 2)
+                state.blocked_until = max(state.blocked_until, time.monotonic() + (retry_after or 1.0))
+            elif succeeded:
+                state.concurrency = min(state.max_concurrency, state.concurrency + 1.0 / state.concurrency)
+            self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Current limiter state per model, for dashboards and metrics"""
+        with self._condition:
+            return {
+                model: {
+                    "concurrency": state.concurrency,
+                    "in_flight": state.in_flight,
+                    "rate_limited": state.rate_limited,
+                    "tokens_available": state.tokens.level,
+                    "requests_available": state.requests.level,
+                }
+                for model, state in self._states.items()
+            }
+
+def rate_limit_details(error: Exception) -> Tuple[bool, Optional[float]]:
+    """Return (is_rate_limit, retry_after_seconds) for a provider exception"""
+    status = getattr(error, "status_code", None)
+    if status != 429 and type(error).__name__ != "RateLimitError":
+        return False, None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return True, float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return True, None
+
+def open_with_limit(limiter: RateLimiter, model: str, tokens: int, create: Callable[[], Any],
+                    max_attempts: int = 5) -> Tuple[Permit, Any]:
+    """Acquire a slot and call create(), re-queueing on 429s; the caller must release the permit
+
+    The permit's wait_time covers every attempt: the time queued behind the
+    limiter plus the round trips rejected with 429, i.e. everything before the
+    request that went through was sent.
+    """
+    start = time.monotonic()
+    for attempt in range(1, max_attempts + 1):
+        permit = limiter.acquire(model, tokens)
+        permit.wait_time = time.monotonic() - start
+        try:
+            return permit, create()
+        except Exception as e:
+            rate_limited, retry_after = rate_limit_details(e)
+            limiter.release(permit, actual_tokens=0, rate_limited=rate_limited, retry_after=retry_after,
+                            succeeded=False)
+            if not rate_limited or attempt == max_attempts:
+                raise
+
+async def open_with_limit_async(limiter: RateLimiter, model: str, tokens: int, create: Callable[[], Any],
+                                max_attempts: int = 5) -> Tuple[Permit, Any]:
+    """Async variant of open_with_limit; create() must return an awaitable"""
+    start = time.monotonic()
+    for attempt in range(1, max_attempts + 1):
+        permit = await limiter.acquire_async(model, tokens)
+        permit.wait_time = time.monotonic() - start
+        try:
+            return permit, await create()
+        except Exception as e:
+            rate_limited, retry_after = rate_limit_details(e)
+            limiter.release(permit, actual_tokens=0, rate_limited=rate_limited, retry_after=retry_after,
+                            succeeded=False)
+            if not rate_limited or attempt == max_attempts:
+                raise
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by all Streamlit sessions and batch runs"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
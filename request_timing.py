@@ -0,0 +1,90 @@
+"""
+Per-request phase timing for Code Inspector Pro
+
+A ``RequestTimer`` follows one streamed request and records when each phase
+ends: waiting on the rate limiter, opening the response stream, the first
+token and the last one. Gaps between chunks are kept so their percentiles
+reveal stalls that an average hides, and time spent repainting the UI is
+reported on its own, so provider latency and our own overhead can be told
+apart.
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, Optional
+
+def percentile(sorted_values: array, q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(q * len(sorted_values)) - 1, 0)]
+
+class RequestTimer:
+    """Phase timestamps of one request on the perf_counter clock; retries report their final attempt"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queue_wait = 0.0
+        self.sent: Optional[float] = None
+        self.opened: Optional[float] = None
+        self.first_chunk: Optional[float] = None
+        self.last_chunk: Optional[float] = None
+        self.chunks = 0
+        self._gaps = array("d")
+
+    def begin_attempt(self):
+        """Reset the stream phases before a (re)try; queue wait keeps accumulating"""
+        self.sent = time.perf_counter()
+        self.opened = self.first_chunk = self.last_chunk = None
+        self.chunks = 0
+        self._gaps = array("d")
+
+    def stream_opened(self, queue_wait: float):
+        """The provider accepted the request after queue_wait seconds behind the rate limiter"""
+        self.opened = time.perf_counter()
+        self.queue_wait += queue_wait
+        self.sent = (self.sent if self.sent is not None else self.started) + queue_wait
+
+    def chunk_received(self):
+        now = time.perf_counter()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        else:
+            self._gaps.append(now - self.last_chunk)
+        self.last_chunk = now
+        self.chunks += 1
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from sending the request (after queueing) to the first token"""
+        if self.first_chunk is None or self.sent is None:
+            return None
+        return max(self.first_chunk - self.sent, 0.0)
+
+    @property
+    def stream_time(self) -> Optional[float]:
+        """Seconds from the first token to the last"""
+        if self.first_chunk is None:
+            return None
+        return self.last_chunk - self.first_chunk
+
+    def summary(self, output_tokens: Optional[int] = None,
+                render_time: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Timing values keyed by their CodeAnalysis field names"""
+        gaps = array("d", sorted(self._gaps))
+        stream_time = self.stream_time
+        tokens_per_second = None
+        if output_tokens and stream_time:
+            tokens_per_second = output_tokens / stream_time
+        return {
+            "queue_wait": self.queue_wait,
+            "connect_time": self.opened - self.sent if self.opened is not None and self.sent is not None else None,
+            "ttft": self.ttft,
+            "stream_time": stream_time,
+            "tokens_per_second": tokens_per_second,
+            "chunk_gap_p50": percentile(gaps, 0.5),
+            "chunk_gap_p95": percentile(gaps, 0.95),
+            "chunk_gap_max": gaps[-1] if gaps else None,
+            "render_time": render_time
+        }
@@ -0,0 +1,129 @@
+"""
+Content-addressed response cache for Code Inspector Pro
+
+Analyses are keyed on a hash of the action, language, model, sampling
+parameters and the normalized code, and stored in two tiers: a bounded
+in-memory LRU and a directory of JSON files on disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("CODE_INSPECTOR_CACHE_DIR", Path.home() / ".cache" / "code_inspector"))
+
+def normalize_code(code: str) -> str:
+    """Normalize line endings and trailing whitespace so cosmetic edits hit the same entry"""
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+def make_cache_key(action: str, language: str, model: str, temperature: float,
+                   max_tokens: int, code: str) -> str:
+    """Build a stable SHA-256 key for an analysis request"""
+    payload = json.dumps(
+        {
+            "action": action,
+            "language": language,
+            "model": model,
+            "temperature": round(float(temperature), 3),
+            "max_tokens": int(max_tokens),
+            "code": normalize_code(code),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Two-tier (memory LRU + disk) cache of analysis responses"""
+
+    def __init__(self, max_entries: int = 256, directory: Optional[Path] = DEFAULT_CACHE_DIR,
+                 max_age: Optional[float] = None):
+        self.max_entries = max_entries
+        self.directory = Path(directory) / "responses" if directory else None
+        self.max_age = max_age
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.max_age is not None and time.time() - entry.get("stored_at", 0) > self.max_age
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached entry for a key, promoting disk hits into memory"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = None
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+
+        with self._lock:
+            if entry is None or self._expired(entry):
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict):
+        """Store an entry in both tiers"""
+        entry = dict(entry, stored_at=time.time())
+        with self._lock:
+            self._remember(key, entry)
+
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort; the memory tier still serves hits
+            pass
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.directory is None or not self.directory.exists():
+            return
+        for path in self.directory.glob("*/*.json"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of in-memory entries"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._memory)}
@@ -0,0 +1,106 @@
+"""
+Retry policy for transient LLM failures
+
+Exponential backoff with full jitter under a total deadline. Streaming
+callers resume a broken stream by sending the partial response back as an
+assistant turn and asking the model to continue, so text already shown is
+neither lost nor repeated.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from rate_limiter import RateLimitTimeout
+
+# Exception class names raised by groq/openai/httpx for connection-level failures. Rate limits
+# (429 / RateLimitError) are not listed: open_with_limit re-queues them behind the shared limiter
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ConnectError", "ReadError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+    "WriteError", "PoolTimeout", "ConnectionError", "TimeoutError", "ConnectionResetError",
+}
+
+CONTINUE_PROMPT = "Your previous answer was cut off. Continue exactly where you stopped, without repeating anything."
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.5  # Seconds before the first retry (before jitter)
+    max_delay: float = 8.0
+    deadline: float = 120.0  # Total seconds across all attempts and backoff
+
+    def backoff(self, retry_number: int) -> float:
+        """Full-jitter exponential backoff for the nth retry (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry_number - 1)))
+
+@dataclass
+class RetryStats:
+    retries: int = 0
+    backoff_time: float = 0.0
+    last_error: Optional[str] = None
+
+def is_transient(error: Exception) -> bool:
+    """True for network errors, timeouts and 5xx responses; 429s are left to the rate limiter"""
+    if isinstance(error, RateLimitTimeout):
+        return False
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+def _next_delay(policy: RetryPolicy, stats: RetryStats, error: Exception, started: float) -> Optional[float]:
+    """Backoff before the next attempt, or None if the error should propagate"""
+    if not is_transient(error) or stats.retries + 1 >= policy.max_attempts:
+        return None
+    delay = policy.backoff(stats.retries + 1)
+    if time.monotonic() - started + delay > policy.deadline:
+        return None
+    stats.retries += 1
+    stats.backoff_time += delay
+    stats.last_error = str(error)
+    return delay
+
+def call_with_retry(attempt: Callable[[], Any], policy: RetryPolicy, stats: Optional[RetryStats] = None,
+                    on_retry: Optional[Callable[[int, float, Exception], None]] = None) -> Any:
+    """Run attempt() until it succeeds, retrying transient failures with backoff"""
+    stats = stats if stats is not None else RetryStats()
+    started = time.monotonic()
+    while True:
+        try:
+            return attempt()
+        except Exception as e:
+            delay = _next_delay(policy, stats, e, started)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(stats.retries, delay, e)
+            time.sleep(delay)
+
+async def call_with_retry_async(attempt: Callable[[], Awaitable[Any]], policy: RetryPolicy,
+                                stats: Optional[RetryStats] = None,
+                                on_retry: Optional[Callable[[int, float, Exception], None]] = None) -> Any:
+    """Async variant of call_with_retry"""
+    stats = stats if stats is not None else RetryStats()
+    started = time.monotonic()
+    while True:
+        try:
+            return await attempt()
+        except Exception as e:
+            delay = _next_delay(policy, stats, e, started)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(stats.retries, delay, e)
+            await asyncio.sleep(delay)
+
+def continuation_messages(messages: List[Dict[str, str]], partial_response: str) -> List[Dict[str, str]]:
+    """Messages that resume a stream after partial_response, or the originals to restart"""
+    if not partial_response:
+        return messages
+    return messages + [
+        {"role": "assistant", "content": partial_response},
+        {"role": "user", "content": CONTINUE_PROMPT},
+    ]
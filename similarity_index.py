@@ -0,0 +1,154 @@
+"""
+Near-duplicate code index for Code Inspector Pro
+
+Code is reduced to shingles of normalized tokens: comments and layout are
+dropped and identifiers are renamed in order of first appearance, so
+reformatting or renaming variables does not change them. Literals are
+kept as short hashes of their value, so a snippet that only differs in a
+constant or a string is not mistaken for the one analyzed before. Each snippet is
+summarized by a one-permutation MinHash signature (one hash pass, empty
+bins densified from their neighbours) and the signatures are split into
+LSH bands. A lookup probes one bucket per band and verifies only the
+handful of candidates found there, so its cost does not grow with the
+number of indexed analyses.
+"""
+
+import re
+import threading
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from inspector_core import Config
+from prompt_compaction import compact_code
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15  # Multiplier that spreads crc32 bits over 64 bits
+
+_TOKEN_PATTERN = re.compile(
+    r"""[A-Za-z_$][\w$]*|\d[\w.]*|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`[^`]*`|[^\s\w]""",
+    re.DOTALL
+)
+
+# Keywords of the supported languages keep their spelling; every other identifier is renamed
+KEYWORDS = frozenset("""
+    and as assert async await break case catch class const continue def default del do elif else enum except
+    export extends false final finally fn for from func function go if impl implements import in interface is
+    lambda let loop match mod mut new nil none not null or package pass private protected pub public raise
+    return self static struct super switch this throw throws true try type typeof use val var void when where
+    while with yield
+""".split())
+
+@dataclass
+class SimilarMatch:
+    entry_id: int
+    similarity: float
+
+def code_tokens(code: str, language_key: str) -> List[str]:
+    """Tokens with comments removed, literals hashed and identifiers canonically renamed"""
+    names: Dict[str, str] = {}
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(compact_code(code, language_key).text):
+        first = token[0]
+        if first.isalpha() or first in "_$":
+            lowered = token.lower()
+            if lowered in KEYWORDS:
+                tokens.append(lowered)
+            else:
+                tokens.append(names.setdefault(token, f"v{len(names)}"))
+        elif first.isdigit() or first in "\"'`":
+            tokens.append(f"#{zlib.crc32(token.encode('utf-8')):08x}")
+        else:
+            tokens.append(token)
+    return tokens
+
+def minhash_signature(code: str, language_key: str, num_bins: int = Config.SIMILARITY["num_bins"],
+                      shingle_size: int = Config.SIMILARITY["shingle_size"]) -> array:
+    """One-permutation MinHash of the snippet's token shingles"""
+    tokens = code_tokens(code, language_key)
+    shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(max(len(tokens) - shingle_size + 1, 1))}
+    bin_bits = num_bins.bit_length() - 1
+    value_mask = (1 << (64 - bin_bits)) - 1
+    empty = value_mask + 1
+    bins = [empty] * num_bins
+    for shingle in shingles:
+        h = (zlib.crc32(shingle.encode("utf-8")) * _GOLDEN) & _MASK64
+        index, value = h >> (64 - bin_bits), h & value_mask
+        if value < bins[index]:
+            bins[index] = value
+    # Densify: an empty bin borrows the next filled bin's value (circularly),
+    # offset by the distance so borrowed values stay distinct
+    filled = [value != empty for value in bins]
+    if any(filled):
+        source = 0  # Nearest filled position to the right, in the doubled range
+        for position in range(2 * num_bins - 1, -1, -1):
+            i = position % num_bins
+            if filled[i]:
+                source = position
+            elif position < num_bins:
+                bins[i] = (bins[source % num_bins] + (source - position) * _GOLDEN) & value_mask
+    return array("Q", bins)
+
+def estimate_similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+class SimilarityIndex:
+    """In-memory LSH index of MinHash signatures, partitioned by language and action"""
+
+    def __init__(self, num_bins: int = Config.SIMILARITY["num_bins"], bands: int = Config.SIMILARITY["bands"]):
+        if num_bins & (num_bins - 1) or num_bins % bands:
+            raise ValueError("num_bins must be a power of two divisible by bands")
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self._signatures = array("Q")  # Signature of entry n at [n * num_bins, (n + 1) * num_bins)
+        self._ids: List[int] = []
+        self._buckets: List[Dict[Tuple, List[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _band_keys(self, language: str, action: str, signature: array) -> Iterable[Tuple[int, Tuple]]:
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, (language, action) + tuple(signature[start:start + self.rows])
+
+    def add_signature(self, entry_id: int, language: str, action: str, signature: array):
+        with self._lock:
+            slot = len(self._ids)
+            self._ids.append(entry_id)
+            self._signatures.extend(signature)
+            for band, key in self._band_keys(language, action, signature):
+                self._buckets[band].setdefault(key, []).append(slot)
+
+    def add(self, entry_id: int, language: str, action: str, code: str) -> array:
+        """Index code under entry_id and return its signature (for persisting)"""
+        signature = minhash_signature(code, language, self.num_bins)
+        self.add_signature(entry_id, language, action, signature)
+        return signature
+
+    def query(self, language: str, action: str, code: str,
+              threshold: float = Config.SIMILARITY["threshold"], limit: int = 3) -> List[SimilarMatch]:
+        """Indexed entries at least threshold similar to code, most similar (then newest) first"""
+        signature = minhash_signature(code, language, self.num_bins)
+        with self._lock:
+            slots = set()
+            for band, key in self._band_keys(language, action, signature):
+                slots.update(self._buckets[band].get(key, ()))
+            matches = []
+            for slot in slots:
+                stored = self._signatures[slot * self.num_bins:(slot + 1) * self.num_bins]
+                similarity = estimate_similarity(signature, stored)
+                if similarity >= threshold:
+                    matches.append(SimilarMatch(self._ids[slot], similarity))
+        matches.sort(key=lambda match: (match.similarity, match.entry_id), reverse=True)
+        return matches[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._signatures = array("Q")
+            self._ids = []
+            self._buckets = [{} for _ in range(self.bands)]
@@ -0,0 +1,58 @@
+"""
+Static stylesheet loading for the Streamlit front-ends
+
+Streamlit drops every element a rerun does not emit again, so a <style>
+block written with st.markdown has to be resent, and re-parsed by the
+browser, on every widget interaction. Stylesheets are instead served from
+``static/`` (``server.enableStaticServing``) and a small loader adds them
+to the page <head>, which survives reruns. Streamlit serves .css files as
+text/plain with nosniff, which browsers refuse for <link>, so the loader
+fetches the text and inlines it in a <style> element instead. It only
+fetches when the content hash differs from the one already applied, so the
+stylesheet is transferred once per browser session and replaced when it
+changes.
+"""
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+STATIC_DIR = Path(__file__).parent / "static"
+STATIC_URL = "app/static"  # Where Streamlit serves STATIC_DIR, relative to the app URL
+
+@lru_cache(maxsize=32)
+def _content_hash(path: str, mtime: float) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+
+def stylesheet_hash(name: str) -> str:
+    """Content hash of static/<name>, recomputed only when the file changes"""
+    path = STATIC_DIR / name
+    return _content_hash(str(path), path.stat().st_mtime)
+
+def inject_stylesheet(name: str):
+    """Apply static/<name> to the page once per browser session, keyed by its content hash"""
+    digest = stylesheet_hash(name)
+    element_id = f"ci-style-{Path(name).stem}"
+    # The script is identical across reruns while the CSS is unchanged, so the iframe is not reloaded
+    components.html(f"""
+    <script>
+    (function() {{
+        const doc = window.parent.document;
+        const current = doc.getElementById("{element_id}");
+        if (current && current.dataset.hash === "{digest}") return;
+        const url = new URL("{STATIC_URL}/{name}?v={digest}", doc.baseURI);
+        fetch(url)
+            .then(response => response.ok ? response.text() : Promise.reject(response.status))
+            .then(css => {{
+                const style = current || doc.createElement("style");
+                style.id = "{element_id}";
+                style.dataset.hash = "{digest}";
+                style.textContent = css;
+                if (!current) doc.head.appendChild(style);
+            }})
+            .catch(error => console.warn("Could not load stylesheet {name}", error));
+    }})();
+    </script>
+    """, height=0)
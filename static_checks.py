@@ -0,0 +1,178 @@
+"""
+Local static pre-analysis for Python snippets
+
+Runs before the LLM call and takes milliseconds: ``compile`` finds syntax
+errors and compiler warnings, ``symtable`` resolves every scope to find
+names that are never bound, and an ``ast`` pass finds imports that are
+never used. Findings are shown immediately, passed to the model as
+context, and a snippet that does not even parse can skip the model.
+"""
+
+import ast
+import builtins
+import symtable
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+# Names every module can use without binding them
+MODULE_NAMES = set(dir(builtins)) | {"__name__", "__file__", "__doc__", "__builtins__", "__spec__",
+                                    "__loader__", "__package__", "__path__", "__annotations__"}
+
+SEVERITY_ICONS = {"error": "❌", "warning": "⚠️", "info": "ℹ️"}
+
+@dataclass
+class Finding:
+    line: int
+    kind: str  # syntax-error, undefined-name, unused-import, compiler-warning
+    severity: str  # error, warning or info
+    message: str
+
+    def __str__(self) -> str:
+        return f"Line {self.line}: {self.message} ({self.kind})"
+
+@dataclass
+class StaticReport:
+    findings: List[Finding] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def blocking(self) -> bool:
+        """True when the code does not compile, so a model review adds little"""
+        return any(finding.kind == "syntax-error" for finding in self.findings)
+
+    def prompt_context(self, map_line: Optional[Callable[[int], int]] = None) -> Optional[str]:
+        """Findings as plain lines for the model prompt, or None; map_line renumbers them for compacted code"""
+        if not self.findings:
+            return None
+        return "\n".join(
+            f"- {Finding(map_line(finding.line), finding.kind, finding.severity, finding.message) if map_line else finding}"
+            for finding in self.findings
+        )
+
+    def for_lines(self, lines: List[int]) -> "StaticReport":
+        """Findings on the given source lines, renumbered by their position in that list (for a code unit)"""
+        positions = {line: position for position, line in enumerate(lines, start=1)}
+        return StaticReport([
+            Finding(positions[finding.line], finding.kind, finding.severity, finding.message)
+            for finding in self.findings if finding.line in positions
+        ], self.elapsed)
+
+    def markdown(self) -> str:
+        return "\n".join(f"- {SEVERITY_ICONS[finding.severity]} {finding}" for finding in self.findings)
+
+def _module_bindings(table: symtable.SymbolTable, bound: Set[str]):
+    """Collect names bound at module level, including `global` assignments in nested scopes"""
+    for symbol in table.get_symbols():
+        if table.get_type() == "module":
+            if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace() or symbol.is_parameter():
+                bound.add(symbol.get_name())
+        elif symbol.is_declared_global() and symbol.is_assigned():
+            bound.add(symbol.get_name())
+    for child in table.get_children():
+        _module_bindings(child, bound)
+
+def _unbound_references(table: symtable.SymbolTable, bound: Set[str], unbound: Set[str]):
+    """Names referenced in any scope that resolve to a global nobody binds"""
+    for symbol in table.get_symbols():
+        if not symbol.is_referenced() or symbol.get_name() in bound:
+            continue
+        # Module-level references always resolve globally; nested ones only when not local or free
+        if table.get_type() == "module" or symbol.is_global():
+            unbound.add(symbol.get_name())
+    for child in table.get_children():
+        _unbound_references(child, bound, unbound)
+
+def _first_lines(tree: ast.AST, names: Set[str]) -> Dict[str, int]:
+    lines: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id in names:
+            lines[node.id] = min(lines.get(node.id, node.lineno), node.lineno)
+    return lines
+
+def _undefined_names(code: str, tree: ast.AST) -> List[Finding]:
+    if any(isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names)
+           for node in ast.walk(tree)):
+        return []  # Star imports make every name potentially defined
+    table = symtable.symtable(code, "<snippet>", "exec")
+    bound = set(MODULE_NAMES)
+    _module_bindings(table, bound)
+    unbound: Set[str] = set()
+    _unbound_references(table, bound, unbound)
+    lines = _first_lines(tree, unbound)
+    return [
+        Finding(lines.get(name, 1), "undefined-name", "error", f"Name '{name}' is used but never defined")
+        for name in sorted(unbound, key=lambda name: lines.get(name, 1))
+    ]
+
+def _annotations(tree: ast.AST) -> Iterator[ast.AST]:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.arg) and node.annotation is not None:
+            yield node.annotation
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.returns is not None:
+            yield node.returns
+        elif isinstance(node, ast.AnnAssign):
+            yield node.annotation
+
+def _string_annotation_names(tree: ast.AST) -> Set[str]:
+    """Names used inside string (forward reference) annotations such as 'List[int]'"""
+    names: Set[str] = set()
+    pending = list(_annotations(tree))
+    while pending:
+        for node in ast.walk(pending.pop()):
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                try:
+                    pending.append(ast.parse(node.value.strip(), mode="eval"))
+                except SyntaxError:
+                    continue  # A Literal["..."] value rather than a type
+    return names
+
+def _unused_imports(tree: ast.AST) -> List[Finding]:
+    used: Set[str] = _string_annotation_names(tree)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets
+        ):
+            # Names re-exported through __all__ count as used
+            used.update(elt.value for elt in ast.walk(node.value)
+                        if isinstance(elt, ast.Constant) and isinstance(elt.value, str))
+    findings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    continue
+                bound_name = alias.asname or alias.name.split(".")[0]
+                if bound_name not in used:
+                    findings.append(Finding(node.lineno, "unused-import", "info",
+                                            f"'{alias.name}' is imported but never used"))
+    return findings
+
+def analyze_python(code: str) -> StaticReport:
+    """Compile, resolve scopes and scan imports of a Python snippet"""
+    start_time = time.perf_counter()
+    report = StaticReport()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            compile(code, "<snippet>", "exec", dont_inherit=True)
+        except SyntaxError as e:
+            report.findings.append(Finding(e.lineno or 1, "syntax-error", "error", e.msg))
+        except ValueError as e:  # e.g. source containing null bytes
+            report.findings.append(Finding(1, "syntax-error", "error", str(e)))
+    for warning in caught:
+        report.findings.append(Finding(warning.lineno or 1, "compiler-warning", "warning", str(warning.message)))
+    if not report.blocking:
+        tree = ast.parse(code)
+        report.findings.extend(_undefined_names(code, tree))
+        report.findings.extend(_unused_imports(tree))
+        report.findings.sort(key=lambda finding: finding.line)
+    report.elapsed = time.perf_counter() - start_time
+    return report
@@ -0,0 +1,23 @@
+import io
+import json
+from dataclasses import asdict
+
+from history_io import import_history
+from history_store import HistoryStore
+from inspector_core import CodeAnalysis
+
+def make_record(language: str, code: str) -> dict:
+    return asdict(CodeAnalysis(action="review", language=language, code=code, response="ok",
+                               timestamp="2024-01-01 00:00:00", execution_time=1.0, model_used="m",
+                               tokens_used=1))
+
+def archive(*records: dict) -> io.BytesIO:
+    return io.BytesIO("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+
+def test_import_rejects_unknown_languages_and_normalises_case():
+    store = HistoryStore(":memory:")
+    stats = import_history(store, archive(make_record("python", "a = 1"), make_record("Python", "b = 2"),
+                                          make_record("cobol", "c = 3")))
+    assert (stats.imported, stats.invalid) == (2, 1)
+    assert "unknown language 'cobol'" in stats.errors[0]
+    assert {item["language"] for item in store.iter_all()} == {"python"}
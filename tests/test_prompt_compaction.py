@@ -0,0 +1,50 @@
+from prompt_compaction import CompactedCode, compact_code
+
+def make_compacted() -> CompactedCode:
+    # Compacted lines 1, 2 and 3 show original lines 2, 5 and 9
+    return CompactedCode("a\nb\nc", [2, 5, 9], "")
+
+def test_remap_response_rewrites_line_references():
+    compacted = make_compacted()
+    assert compacted.remap_response("See line 2.") == "See line 5."
+    assert compacted.remap_response("Lines 1-3 repeat") == "Lines 2-9 repeat"
+    assert compacted.remap_response("lines 1 to 2 and line 3") == "lines 2 to 5 and line 9"
+    assert compacted.remap_response("at #L2") == "at #L5"
+    assert compacted.remap_response("#L1-L3") == "#L2-L9"
+
+def test_remap_response_leaves_prose_alone():
+    compacted = make_compacted()
+    assert compacted.remap_response("Fits in the L1 cache") == "Fits in the L1 cache"
+    assert compacted.remap_response("Use HTML5 and L2 norms") == "Use HTML5 and L2 norms"
+    assert compacted.remap_response("the pipeline 2 stage") == "the pipeline 2 stage"
+
+def test_remap_response_is_a_no_op_for_an_identity_map():
+    assert CompactedCode.identity("a\nb").remap_response("line 1 and #L2") == "line 1 and #L2"
+
+def test_compact_code_keeps_multiline_strings_verbatim():
+    code = 'def f():\n    x = 1  # note\n\n    return """a  \n\n  b"""\n'
+    compacted = compact_code(code, "python")
+    assert compacted.text == 'def f():\n    x = 1\n    return """a  \n\n  b"""'
+    assert compacted.line_map == [1, 2, 4, 5, 6]
+
+def test_compact_code_keeps_template_literals_verbatim():
+    code = "const q = `select *  \n\nfrom t`; // query\n\nrun(q);"
+    compacted = compact_code(code, "javascript")
+    assert compacted.text == "const q = `select *  \n\nfrom t`;\nrun(q);"
+
+def test_compact_code_keeps_php_attributes():
+    code = "<?php\n#[Route('/users')]\n# a comment\nfunction users() {}"
+    compacted = compact_code(code, "php")
+    assert compacted.text == "<?php\n#[Route('/users')]\nfunction users() {}"
+
+def test_compact_code_keeps_comment_markers_inside_long_single_quoted_strings():
+    js = "const urls = ['https://api.github.com/users/1', 'https://api.github.com/users/2']; // users"
+    assert compact_code(js, "javascript").text == "const urls = ['https://api.github.com/users/1', 'https://api.github.com/users/2'];"
+    php = "<?php\n$u = 'http://example.com/path'; # home\n"
+    assert compact_code(php, "php").text == "<?php\n$u = 'http://example.com/path';"
+    ruby = "puts 'this is a long string # not a comment' # a comment"
+    assert compact_code(ruby, "ruby").text == "puts 'this is a long string # not a comment'"
+
+def test_compact_code_does_not_read_rust_lifetimes_as_strings():
+    rust = "fn f<'a>(s: &'a str) -> &'a str { s } // identity"
+    assert compact_code(rust, "rust").text == "fn f<'a>(s: &'a str) -> &'a str { s }"
@@ -0,0 +1,20 @@
+from static_checks import analyze_python
+
+def unused_imports(code: str):
+    return [finding.message for finding in analyze_python(code).findings if finding.kind == "unused-import"]
+
+def test_names_in_string_annotations_count_as_used():
+    code = (
+        "from collections import OrderedDict\n"
+        "from typing import Dict, List, Tuple\n"
+        "def f() -> 'List[int]':\n"
+        "    return []\n"
+        "cache: \"OrderedDict[str, Tuple[int, float]]\" = OrderedDict()\n"
+        "def g(x: Dict[str, 'List[int]']):\n"
+        "    return x\n"
+    )
+    assert unused_imports(code) == []
+
+def test_unused_imports_are_still_reported():
+    code = "import os\nfrom typing import List\ndef f() -> 'int':\n    return 1\n"
+    assert unused_imports(code) == ["'os' is imported but never used", "'List' is imported but never used"]
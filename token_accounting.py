@@ -0,0 +1,97 @@
+"""
+Token accounting for Code Inspector Pro
+
+Counts come from the ``usage`` block of a streamed completion when the
+provider sends one. Otherwise they fall back to a local tokenizer:
+``tiktoken`` when it is installed, or a fast regex approximation of a
+BPE vocabulary whose per-piece costs are memoized.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Chat formatting overhead per message and for the assistant reply primer
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Splits text the way GPT-style pre-tokenizers do before BPE merges
+_PIECE_PATTERN = re.compile(r"""'(?:[sdmt]|ll|ve|re)| ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+(?!\S)|\s+""")
+
+@dataclass
+class TokenUsage:
+    input_tokens: int
+    output_tokens: int
+    source: str  # "api" or "tokenizer"
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken vocabulary once per process"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+@lru_cache(maxsize=65536)
+def _piece_tokens(piece: str) -> int:
+    """Approximate the BPE token count of a single pre-tokenized piece"""
+    body = piece.lstrip(" ")
+    if not body:
+        return math.ceil(len(piece) / 4)
+    if body.isalpha():
+        return 1 if len(body) <= 6 else math.ceil(len(body) / 4)
+    if body.isdigit() or body[0] == "'":
+        return 1
+    if body.isspace():
+        return 1 if "\n" in body else math.ceil(len(body) / 4)
+    return math.ceil(len(body) / 2)
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the local tokenizer"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(_piece_tokens(piece) for piece in _PIECE_PATTERN.findall(text))
+
+def count_message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """Count prompt tokens for a list of chat messages, including formatting overhead"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get("content", ""))
+    return total
+
+def extract_usage(chunk) -> Optional[TokenUsage]:
+    """Read the usage block from a streamed chunk, if the provider attached one"""
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        x_groq = getattr(chunk, "x_groq", None)
+        usage = getattr(x_groq, "usage", None) if x_groq is not None else None
+    if usage is None:
+        return None
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return TokenUsage(int(prompt_tokens), int(completion_tokens), "api")
+
+def measure_usage(messages: Iterable[Dict[str, str]], response: str,
+                  api_usage: Optional[TokenUsage] = None) -> TokenUsage:
+    """Prefer provider-reported usage, falling back to the local tokenizer"""
+    if api_usage is not None:
+        return api_usage
+    return TokenUsage(count_message_tokens(messages), count_tokens(response), "tokenizer")